@@ -0,0 +1,148 @@
+# mypy: ignore-errors
+"""
+Compare certificate parsing paths of `scripts/parse_organizations.py` on a synthetic registry dump:
+- legacy path: `Certificate.from_xml` (nested models for every certificate) -> filters -> `CertificateOut`
+- compiled path: `parse_certificate` (one pass over children with dispatch tables, filters before any model)
+
+Both extraction alone (on parsed elements) and the whole `iterparse` pipeline are measured: tokenizing XML is the
+same for both paths and takes most of the pipeline time, so the end-to-end gain is much smaller than the extraction one.
+
+Usage: python -m scripts.benchmark_parse_organizations --count 5000 --programs 10
+"""
+
+import io
+import random
+import time
+import xml.etree.ElementTree as ET
+from typing import Any, Callable
+
+from scripts.parse_organizations import (
+    Certificate,
+    CertificateOut,
+    HIGHER_EDUCATION_TYPE,
+    INACTIVE_STATUS,
+    OUTSIDE_RF_REGION,
+    parse_certificate,
+)
+
+
+def make_registry_xml(count: int, programs: int) -> bytes:
+    random.seed(0)
+    out = io.StringIO()
+    out.write('<?xml version="1.0" encoding="utf-8"?>\n<OpenData><Certificates>\n')
+    for i in range(count):
+        type_name = HIGHER_EDUCATION_TYPE if i % 3 else "Общеобразовательная организация"
+        status_name = INACTIVE_STATUS if i % 5 == 0 else "Действующее"
+        region_name = OUTSIDE_RF_REGION if i % 13 == 0 else "Москва"
+        educational_programs = "".join(
+            "<EducationalProgram>"
+            f"<Id>p{i}_{j}</Id><TypeName>Высшее образование</TypeName><EduLevelName>Бакалавриат</EduLevelName>"
+            f"<ProgrammName>Программа {j}</ProgrammName><ProgrammCode>09.03.0{j % 10}</ProgrammCode>"
+            "<UGSName>Информатика и вычислительная техника</UGSName><UGSCode>09.00.00</UGSCode>"
+            "<EduNormativePeriod>4 г</EduNormativePeriod><Qualification>Бакалавр</Qualification>"
+            "<IsAccredited>1</IsAccredited><IsCanceled>0</IsCanceled><IsSuspended>0</IsSuspended>"
+            "</EducationalProgram>"
+            for j in range(random.randint(0, 2 * programs))
+        )
+        out.write(
+            "<Certificate>"
+            f"<Id>c{i}</Id><IsFederal>0</IsFederal><StatusName>{status_name}</StatusName>"
+            "<TypeName>Свидетельство</TypeName><RegionName>Москва</RegionName>"
+            "<FederalDistrictName>Центральный федеральный округ</FederalDistrictName>"
+            f"<RegNumber>{i}</RegNumber><SerialNumber>90А01</SerialNumber><FormNumber>{i:07}</FormNumber>"
+            "<IssueDate>2020-01-01</IssueDate><EndDate/><ControlOrgan>Рособрнадзор</ControlOrgan>"
+            f"<EduOrgFullName>Университет № {i}</EduOrgFullName><EduOrgShortName>У{i}</EduOrgShortName>"
+            f"<EduOrgINN>{i:010}</EduOrgINN><EduOrgOGRN>{i:013}</EduOrgOGRN>"
+            "<ActualEducationOrganization>"
+            f"<Id>o{i}</Id><FullName>Университет № {i}</FullName><ShortName>У{i}</ShortName><HeadEduOrgId/>"
+            "<IsBranch>0</IsBranch><PostAddress>г. Москва</PostAddress><Phone>+7 (000) 000-00-00</Phone><Fax/>"
+            f"<Email>org{i}@example.com</Email><WebSite>org{i}.example.com</WebSite>"
+            f"<OGRN>{i:013}</OGRN><INN>{i:010}</INN><KPP>770101001</KPP><HeadPost>Ректор</HeadPost>"
+            "<HeadName>Иванов Иван Иванович</HeadName><FormName>Государственная</FormName>"
+            f"<KindName>Университет</KindName><TypeName>{type_name}</TypeName><RegionName>{region_name}</RegionName>"
+            "<FederalDistrictShortName>ЦФО</FederalDistrictShortName>"
+            "<FederalDistrictName>Центральный федеральный округ</FederalDistrictName>"
+            "</ActualEducationOrganization>"
+            f"<Supplements><Supplement><Id>s{i}</Id><EducationalPrograms>{educational_programs}"
+            "</EducationalPrograms></Supplement></Supplements>"
+            "</Certificate>\n"
+        )
+    out.write("</Certificates></OpenData>\n")
+    return out.getvalue().encode("utf-8")
+
+
+def legacy_parse_certificate(elem: ET.Element) -> CertificateOut | None:
+    certificate = Certificate.from_xml(elem)
+    if (
+        not certificate.actual_education_organization
+        or certificate.actual_education_organization.type_name != HIGHER_EDUCATION_TYPE
+        or certificate.status_name == INACTIVE_STATUS
+        or certificate.actual_education_organization.region_name == OUTSIDE_RF_REGION
+    ):
+        return None
+    return CertificateOut.model_validate(certificate, from_attributes=True)
+
+
+def iterparse_certificates(xml: bytes, func: Callable[[ET.Element], CertificateOut | None]) -> list[CertificateOut]:
+    # the same loop as `iter_xml`, with the certificate parser given
+    results = []
+    for _, elem in ET.iterparse(io.BytesIO(xml)):
+        if elem.tag == "Certificate":
+            if (certificate := func(elem)) is not None:
+                results.append(certificate)
+            elem.clear()
+    return results
+
+
+def best_time(func: Callable[[], Any], repeat: int) -> tuple[float, Any]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def benchmark(count: int, programs: int, repeat: int) -> None:
+    xml = make_registry_xml(count, programs)
+    elements = ET.fromstring(xml).findall("Certificates/Certificate")
+    print(f"{len(elements)} certificates, {len(xml) / 1024 / 1024:.1f} MiB")
+
+    extraction, pipeline, results = {}, {}, {}
+    for name, func in (("legacy", legacy_parse_certificate), ("compiled", parse_certificate)):
+        extraction[name], results[name] = best_time(
+            lambda: [c for elem in elements if (c := func(elem)) is not None], repeat
+        )
+        pipeline[name], pipeline_results = best_time(lambda: iterparse_certificates(xml, func), repeat)
+        if results[name] != pipeline_results:
+            raise SystemExit(f"Results of {name} path differ between extraction and pipeline")
+        print(
+            f"{name:>8}: extraction {extraction[name] * 1000:8.1f} ms ({len(elements) / extraction[name]:8.0f}"
+            f" elements/s), with XML parsing {pipeline[name] * 1000:8.1f} ms"
+            f" ({len(elements) / pipeline[name]:8.0f} elements/s), {len(results[name])} kept"
+        )
+    tokenizing, _ = best_time(lambda: iterparse_certificates(xml, lambda elem: None), repeat)
+    print(f"XML parsing alone: {tokenizing * 1000:8.1f} ms")
+    print(
+        f"speedup: extraction {extraction['legacy'] / extraction['compiled']:.2f}x,"
+        f" with XML parsing {pipeline['legacy'] / pipeline['compiled']:.2f}x"
+    )
+
+    if results["legacy"] != results["compiled"]:
+        raise SystemExit("Results of the paths differ")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark parsing of organizations registry")
+    parser.add_argument("--count", type=int, default=5000, help="Number of certificates")
+    parser.add_argument("--programs", type=int, default=10, help="Average number of programs per certificate")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of repetitions, best time is reported")
+    args = parser.parse_args()
+
+    benchmark(args.count, args.programs, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
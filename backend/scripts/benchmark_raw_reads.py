@@ -0,0 +1,102 @@
+# mypy: ignore-errors
+"""
+Compare read paths for organizations (fetch + serialization):
+- model path: Motor -> Beanie `Organization` -> response model validation -> ORJSON
+- raw path (trusted read mode): Motor -> `to_response_dict` -> ORJSON
+
+Synthetic organizations are inserted into a scratch database, which is dropped afterwards.
+
+Usage: python -m scripts.benchmark_raw_reads --count 2000 --documents 50 [--mongo-uri mongodb://...]
+"""
+
+import asyncio
+import time
+
+from bson import ObjectId
+
+
+def make_raw_organizations(count: int, documents: int) -> list[dict]:
+    return [
+        {
+            "_id": ObjectId(),
+            "version": 3,
+            "username": f"org-{i}",
+            "name": f"Организация {i}",
+            "full_name": f"Федеральное государственное образовательное учреждение {i}",
+            "contacts": {"email": f"org{i}@example.com", "phone": "+7 (000) 000-00-00", "inn": "1234567890"},
+            "main_scene": ObjectId(),
+            "in_registry_id": str(i),
+            "region_name": "Республика Татарстан",
+            "federal_district_name": "Приволжский федеральный округ",
+            "documents": [
+                {
+                    "title": f"Лицензия на осуществление образовательной деятельности {j}",
+                    "url": f"https://example.com/org-{i}/documents/{j}.pdf",
+                    "issued_at": "2020-01-01",
+                }
+                for j in range(documents)
+            ],
+        }
+        for i in range(count)
+    ]
+
+
+async def benchmark(mongo_uri: str, count: int, documents: int, repeat: int) -> None:
+    from beanie import init_beanie
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import ORJSONResponse
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from pydantic import TypeAdapter
+
+    from src.storages.mongo.models.organization import Organization
+    from src.storages.mongo.raw import RawORJSONResponse, find_raw
+
+    client = AsyncIOMotorClient(mongo_uri)
+    database = client["benchmark_raw_reads"]
+    await init_beanie(database=database, document_models=[Organization])
+    try:
+        await Organization.get_motor_collection().insert_many(make_raw_organizations(count, documents))
+        response_adapter = TypeAdapter(list[Organization])
+
+        async def model_path() -> bytes:
+            objs = await Organization.find_all().to_list()
+            # FastAPI validates and serializes returned objects with the response model
+            validated = response_adapter.validate_python(objs, from_attributes=True)
+            return ORJSONResponse(jsonable_encoder(response_adapter.dump_python(validated, by_alias=True))).body
+
+        async def raw_path() -> bytes:
+            return RawORJSONResponse(await find_raw(Organization)).body
+
+        for name, func in (("model", model_path), ("raw", raw_path)):
+            best = float("inf")
+            size = 0
+            for _ in range(repeat):
+                start = time.perf_counter()
+                size = len(await func())
+                best = min(best, time.perf_counter() - start)
+            print(f"{name:>5}: {best * 1000:8.1f} ms, {count / best:10.0f} docs/s, {size / 1024:8.0f} KiB")
+    finally:
+        await client.drop_database("benchmark_raw_reads")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark raw reads")
+    parser.add_argument("--mongo-uri", help="MongoDB URI (from settings by default)")
+    parser.add_argument("--count", type=int, default=2000, help="Number of organizations")
+    parser.add_argument("--documents", type=int, default=50, help="Number of documents per organization")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of repetitions, best time is reported")
+    args = parser.parse_args()
+
+    mongo_uri = args.mongo_uri
+    if mongo_uri is None:
+        from src.config import settings
+
+        mongo_uri = settings.database.uri.get_secret_value()
+
+    asyncio.run(benchmark(mongo_uri, args.count, args.documents, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
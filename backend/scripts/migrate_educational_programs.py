@@ -0,0 +1,88 @@
+# mypy: ignore-errors
+"""
+Move embedded `educational_programs` of organizations into the separate `EducationalProgram` collection.
+
+Organizations are streamed in batches, so the collection is never loaded into memory. Programs of a batch are first
+deleted from the new collection, then inserted and unset in organizations, so the migration can be re-run after
+interruption. Versions of migrated organizations are bumped (their responses change), and so is the version of the
+organization directory, so running workers rebuild their caches without a restart.
+
+Usage: python -m scripts.migrate_educational_programs [--batch-size 200] [--mongo-uri mongodb://...]
+"""
+
+import time
+
+from pymongo import MongoClient
+
+DIRECTORY_VERSION_ID = "organizations"
+"Same as `src.modules.organization.directory.DIRECTORY_VERSION_ID`"
+
+
+def migrate(mongo_uri: str, batch_size: int) -> None:
+    client = MongoClient(mongo_uri)
+    database = client.get_default_database()
+    organizations = database["Organization"]
+    programs = database["EducationalProgram"]
+
+    total_organizations = 0
+    total_programs = 0
+    start = time.perf_counter()
+    cursor = organizations.find(
+        {"educational_programs": {"$exists": True}}, projection={"educational_programs": 1}, batch_size=batch_size
+    )
+
+    batch: list[dict] = []
+
+    def flush() -> None:
+        nonlocal total_organizations, total_programs
+        ids = [organization["_id"] for organization in batch]
+        documents = [
+            {**{k: v for k, v in program.items() if v is not None}, "organization_id": organization["_id"]}
+            for organization in batch
+            for program in organization.get("educational_programs") or []
+        ]
+        programs.delete_many({"organization_id": {"$in": ids}})
+        if documents:
+            programs.insert_many(documents, ordered=False)
+        organizations.update_many(
+            {"_id": {"$in": ids}}, {"$unset": {"educational_programs": ""}, "$inc": {"version": 1}}
+        )
+        total_organizations += len(batch)
+        total_programs += len(documents)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{total_organizations} organizations, {total_programs} programs, {total_programs / elapsed:.0f} programs/s"
+        )
+        batch.clear()
+
+    for organization in cursor:
+        batch.append(organization)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    if total_organizations:
+        # workers poll the version and rebuild the directory snapshot, search index and facets
+        database["CollectionVersion"].update_one({"_id": DIRECTORY_VERSION_ID}, {"$inc": {"version": 1}}, upsert=True)
+    print(f"Done in {time.perf_counter() - start:.1f}s")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Migrate educational programs to a separate collection")
+    parser.add_argument("--mongo-uri", help="MongoDB URI (from settings by default)")
+    parser.add_argument("--batch-size", type=int, default=200, help="Number of organizations in a batch")
+    args = parser.parse_args()
+
+    mongo_uri = args.mongo_uri
+    if mongo_uri is None:
+        from src.config import settings
+
+        mongo_uri = settings.database.uri.get_secret_value()
+
+    migrate(mongo_uri, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
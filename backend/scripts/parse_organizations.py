@@ -1,12 +1,70 @@
 # mypy: ignore-errors
+"""
+Parse registry of educational organizations (XML from obrnadzor) into JSON dump for import.
+
+Usage: python -m scripts.parse_organizations --input data.xml --output data.json [--workers 8]
+       python -m scripts.parse_organizations --input data.xml.gz --output data.ndjson.zst
+       python -m scripts.parse_organizations --input data.xml --mongo-uri mongodb://.../db [--mode resync]
+"""
+
+import asyncio
+import contextlib
+import functools
+import gzip
+import io
+import os
+import re
+import sys
+import threading
 import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 
 from beanie import PydanticObjectId
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Any, BinaryIO, Generator, Iterable, Iterator, List, Optional
 import xml.etree.ElementTree as ET
 
 
+_NESTED_FIELDS = frozenset(("educational_programs", "individual_entrepreneur", "actual_education_organization"))
+
+
+@functools.cache
+def _fields_by_tag(model: type[BaseModel], by_alias: bool = True) -> dict[str, str]:
+    """
+    Dispatch table: XML tag of a child element -> key in the extracted data (alias or field name).
+    """
+    return {
+        (field.validation_alias or name): (field.validation_alias or name) if by_alias else name
+        for name, field in model.model_fields.items()
+        if name not in _NESTED_FIELDS
+    }
+
+
+@functools.cache
+def _defaults(model: type[BaseModel]) -> dict[str, Any]:
+    """
+    Defaults of optional fields by field name, for building output models from extracted data directly.
+    """
+    return {
+        name: field.default
+        for name, field in model.model_fields.items()
+        if not field.is_required() and name not in _NESTED_FIELDS
+    }
+
+
+def _extract(xml: ET.Element, fields_by_tag: dict[str, str]) -> dict[str, str | None]:
+    """
+    Texts of known children in one pass over them (the first child wins, as with `xml.find`).
+    """
+    data = {}
+    for child in xml:
+        key = fields_by_tag.get(child.tag)
+        if key is not None and key not in data:
+            data[key] = child.text
+    return data
+
+
 # Individual entrepreneur details
 # class IndividualEntrepreneur(BaseModel):
 #     last_name: Optional[str] = Field(None, validation_alias="IndividualEntrepreneurLastName")
@@ -54,11 +112,7 @@ class ActualEducationOrganization(BaseModel):
 
     @classmethod
     def from_xml(cls, xml: ET.Element) -> Optional["ActualEducationOrganization"]:
-        data = {}
-        for key, field in cls.model_fields.items():
-            xml_field = xml.find(field.validation_alias or key)
-            if xml_field is not None:
-                data[field.validation_alias or key] = xml_field.text
+        data = _extract(xml, _fields_by_tag(cls))
         if not data:
             return None
         return cls.model_validate(data)
@@ -105,11 +159,7 @@ class EducationalProgram(BaseModel):
 
     @classmethod
     def from_xml(cls, xml: ET.Element) -> Optional["EducationalProgram"]:
-        data = {}
-        for key, field in cls.model_fields.items():
-            xml_field = xml.find(field.validation_alias or key)
-            if xml_field is not None:
-                data[field.validation_alias or key] = xml_field.text
+        data = _extract(xml, _fields_by_tag(cls))
         if not data:
             return None
         return cls.model_validate(data)
@@ -153,14 +203,7 @@ class Certificate(BaseModel):
 
     @classmethod
     def from_xml(cls, xml: ET.Element) -> Optional["Certificate"]:
-        data = {}
-        for key, field in cls.model_fields.items():
-            if key in ("educational_programs", "individual_entrepreneur", "actual_education_organization"):
-                continue
-
-            xml_field = xml.find(field.validation_alias or key)
-            if xml_field is not None:
-                data[field.validation_alias or key] = xml_field.text
+        data = _extract(xml, _fields_by_tag(cls))
 
         # individual_entrepreneur = xml.find("IndividualEntrepreneur")
         # if individual_entrepreneur is not None:
@@ -199,40 +242,342 @@ class Certificates(BaseModel):
     certificates: List[CertificateOut]
 
 
+HIGHER_EDUCATION_TYPE = "Образовательная организация высшего образования"
+INACTIVE_STATUS = "Недействующее"
+OUTSIDE_RF_REGION = "образовательные учреждения, находящиеся за пределами Российской Федерации"
+
+
+def parse_certificate(elem: ET.Element) -> CertificateOut | None:
+    """
+    Certificate of an active higher education organization inside RF, None for others. Filters are applied to
+    extracted texts before any model is built, the output model is validated once.
+    """
+    data: dict[str, Any] = _extract(elem, _fields_by_tag(Certificate, by_alias=False))
+    if data.get("status_name") == INACTIVE_STATUS:
+        return None
+    actual = elem.find("ActualEducationOrganization")
+    if actual is None:
+        return None
+    actual_data = _extract(actual, _fields_by_tag(ActualEducationOrganization, by_alias=False))
+    # игнорировать организацию если нет программ высшего образования
+    if (
+        not actual_data
+        or actual_data.get("type_name") != HIGHER_EDUCATION_TYPE
+        or actual_data.get("region_name") == OUTSIDE_RF_REGION
+    ):
+        return None
+    data["actual_education_organization"] = _defaults(ActualEducationOrganization) | actual_data
+
+    program_fields = _fields_by_tag(EducationalProgram, by_alias=False)
+    program_defaults = _defaults(EducationalProgram)
+    data["educational_programs"] = [
+        program_defaults | _extract(program, program_fields) for program in elem.iter("EducationalProgram")
+    ]
+    return CertificateOut.model_validate(data)
+
+
+def iter_xml(source) -> Iterator[CertificateOut]:
+    for event, elem in ET.iterparse(source):
+        if elem.tag == "Certificate":
+            certificate = parse_certificate(elem)
+            if certificate is not None:
+                yield certificate
+            elem.clear()
+
+
+def parse_xml(source) -> list[CertificateOut]:
+    return list(iter_xml(source))
+
+
+# --- Parallel parsing: the file is split into byte ranges at <Certificate> boundaries --- #
+
+RANGE_SIZE = 32 * 1024 * 1024
+"Target size of a range, ranges are small enough to balance load between processes"
+SCAN_WINDOW = 1024 * 1024
+
+_certificate_start_re = re.compile(rb"<Certificate[\s>]")
+_CERTIFICATE_END = b"</Certificate>"
+
+
+def _find_certificate_start(f, offset: int, size: int) -> int:
+    """
+    Offset of the first <Certificate> start tag at or after `offset`, `size` if there is none.
+    Tags can not appear inside text (`<` is escaped), and there are no nested certificates.
+    """
+    while offset < size:
+        f.seek(offset)
+        # windows overlap, so a tag on the border is not missed
+        window = f.read(SCAN_WINDOW + 16)
+        match = _certificate_start_re.search(window)
+        if match is not None:
+            return offset + match.start()
+        offset += SCAN_WINDOW
+    return size
+
+
+def _find_last_certificate_end(f, size: int) -> int:
+    end = size
+    while end > 0:
+        start = max(0, end - SCAN_WINDOW)
+        f.seek(start)
+        window = f.read(end - start + len(_CERTIFICATE_END))
+        position = window.rfind(_CERTIFICATE_END)
+        if position != -1:
+            return start + position + len(_CERTIFICATE_END)
+        end = start
+    return 0
+
+
+def _read_prolog(f) -> bytes:
+    """
+    BOM and XML declaration (with encoding), prepended to each range.
+    """
+    f.seek(0)
+    head = f.read(4096)
+    prolog = b"\xef\xbb\xbf" if head.startswith(b"\xef\xbb\xbf") else b""
+    rest = head[len(prolog) :].lstrip()
+    if rest.startswith(b"<?xml"):
+        prolog += rest[: rest.index(b"?>") + 2]
+    return prolog
+
+
+def split_ranges(path: str, count: int) -> tuple[bytes, list[tuple[int, int]]]:
+    """
+    Split the file into at most `count` byte ranges, each containing only whole <Certificate> elements.
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        prolog = _read_prolog(f)
+        last_end = _find_last_certificate_end(f, size)
+        boundaries = [_find_certificate_start(f, 0, size)]
+        for i in range(1, count):
+            boundaries.append(min(_find_certificate_start(f, size * i // count, size), last_end))
+        boundaries.append(last_end)
+    boundaries = sorted(set(boundaries))
+    return prolog, [(start, end) for start, end in zip(boundaries, boundaries[1:]) if start < end]
+
+
+def _parse_range(path: str, start: int, end: int, prolog: bytes) -> list[CertificateOut]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    # ranges contain a sequence of elements, wrap them into a root element
+    return parse_xml(io.BytesIO(prolog + b"<Certificates>" + data + b"</Certificates>"))
+
+
+def iter_xml_parallel(path: str, workers: int) -> Iterator[CertificateOut]:
+    """
+    Same result as `iter_xml`, ranges are parsed in a process pool and yielded in the original order. Only a few
+    ranges per process are in flight, so memory does not grow with the file.
+    """
+    count = max(workers * 4, os.path.getsize(path) // RANGE_SIZE + 1)
+    prolog, ranges = split_ranges(path, count)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures: deque[Future[list[CertificateOut]]] = deque()
+        for start, end in ranges:
+            futures.append(executor.submit(_parse_range, path, start, end, prolog))
+            if len(futures) > workers * 2:
+                yield from futures.popleft().result()
+        while futures:
+            yield from futures.popleft().result()
+
+
+def parse_xml_parallel(path: str, workers: int) -> list[CertificateOut]:
+    return list(iter_xml_parallel(path, workers))
+
+
+# --- Compressed input and output: gzip (stdlib) or zstd (`zstandard` package) --- #
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+NDJSON_SUFFIXES = (".ndjson", ".jsonl")
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise SystemExit("zstd compression requires `zstandard` package: pip install zstandard")
+    return zstandard
+
+
+def open_input(f: BinaryIO) -> BinaryIO:
+    """
+    Decompressing reader if the input is compressed (detected by magic bytes), the input itself otherwise.
+    """
+    head = f.peek(len(_ZSTD_MAGIC))[: len(_ZSTD_MAGIC)]
+    if head.startswith(_GZIP_MAGIC):
+        return gzip.GzipFile(fileobj=f, mode="rb")
+    if head.startswith(_ZSTD_MAGIC):
+        return _zstandard().ZstdDecompressor().stream_reader(f, read_across_frames=True)
+    return f
+
+
+def open_output(name: str) -> BinaryIO:
+    """
+    Binary writer for the output, compressed by suffix of the name (`.gz` or `.zst`), "-" is stdout.
+    """
+    if name == "-":
+        return sys.stdout.buffer
+    if name.endswith(".gz"):
+        return gzip.open(name, "wb")
+    if name.endswith(".zst"):
+        return _zstandard().ZstdCompressor().stream_writer(open(name, "wb"), closefd=True)
+    return open(name, "wb")
+
+
+def is_ndjson(name: str) -> bool:
+    return name.removesuffix(".gz").removesuffix(".zst").endswith(NDJSON_SUFFIXES)
+
+
+def write_json(certificates: Iterable[CertificateOut], output: BinaryIO) -> int:
+    """
+    Single JSON object `{"certificates": [...]}`, certificates are collected in memory.
+    """
+    certificates = list(certificates)
+    output.write(Certificates(certificates=certificates).model_dump_json(indent=2).encode())
+    return len(certificates)
+
+
+def write_ndjson(certificates: Iterable[CertificateOut], output: BinaryIO) -> int:
+    """
+    One certificate per line, written as soon as parsed.
+    """
+    count = 0
+    for certificate in certificates:
+        output.write(certificate.model_dump_json().encode() + b"\n")
+        count += 1
+    return count
+
+
+# --- Direct loading: certificates are imported into MongoDB while the registry is parsed --- #
+
+QUEUE_SIZE = 2000
+"Certificates parsed ahead of the importer, bounds memory when the database is slower than the parser"
+
+
+async def load_to_mongo(
+    certificates: Generator[CertificateOut, None, None], mongo_uri: str, mode: str, batch_size: int
+):
+    """
+    Import certificates with `OrganizationImporter` (same mapping and batched upserts as the import endpoint). The
+    parser runs in a thread and feeds the importer through a bounded queue, so parsing and writing overlap.
+    """
+    from beanie import init_beanie
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    from src.modules.organization.importer import ImportMode, organization_importer
+    from src.storages.mongo import document_models
+
+    client = AsyncIOMotorClient(mongo_uri)
+    await init_beanie(database=client.get_default_database(), document_models=document_models)
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+    stop = threading.Event()
+    done = object()
+
+    def produce() -> None:
+        with contextlib.closing(certificates):
+            try:
+                for certificate in certificates:
+                    if stop.is_set():
+                        return
+                    # blocks the parser while the queue is full
+                    asyncio.run_coroutine_threadsafe(queue.put(certificate), loop).result()
+                end = done
+            except BaseException as e:
+                end = e
+            if not stop.is_set():
+                asyncio.run_coroutine_threadsafe(queue.put(end), loop).result()
+
+    async def consume():
+        while (item := await queue.get()) is not done:
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    producer = loop.run_in_executor(None, produce)
+    try:
+        return await organization_importer.run(consume(), batch_size=batch_size, mode=ImportMode(mode))
+    finally:
+        stop.set()
+        while not producer.done():
+            # unblock the parser waiting for space in the queue
+            while not queue.empty():
+                queue.get_nowait()
+            await asyncio.wait([producer], timeout=0.1)
+        client.close()
+
+
 def main():
     import argparse
 
     parser = argparse.ArgumentParser(description="Parse organizations")
     parser.add_argument(
         "--input",
-        type=argparse.FileType("r"),
-        help="Input file from https://obrnadzor.gov.ru/otkrytoe-pravitelstvo/opendata/7701537808-raoo/",
+        type=argparse.FileType("rb"),
+        help="Input file from https://obrnadzor.gov.ru/otkrytoe-pravitelstvo/opendata/7701537808-raoo/ "
+        "(may be compressed with gzip or zstd)",
         default="data.xml",
     )
-    parser.add_argument("--output", type=argparse.FileType("w"), help="Output file", default="data.json")
+    parser.add_argument(
+        "--output",
+        help="Output file: JSON, or NDJSON (one certificate per line) if the name ends with .ndjson or .jsonl; "
+        "compressed if the name ends with .gz or .zst (e.g. data.ndjson.zst)",
+        default="data.json",
+    )
+    parser.add_argument(
+        "--mongo-uri",
+        help="Import certificates directly into MongoDB (URI with the database name) instead of writing --output",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=["create", "resync"],
+        default="create",
+        help="Import mode for --mongo-uri: create - only add missing organizations, resync - also update changed ones",
+    )
+    parser.add_argument("--batch-size", type=int, default=500, help="Certificates per bulk write for --mongo-uri")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes for parsing (0 - number of CPUs), 1 - parse in the current process",
+    )
     _start = time.perf_counter()
     args = parser.parse_args()
 
-    certificates = []
-    for event, elem in ET.iterparse(args.input):
-        if elem.tag == "Certificate":
-            certificate = Certificate.from_xml(elem)
-            # игнорировать организацию если нет программ высшего образования
-            if (
-                not certificate.actual_education_organization
-                or certificate.actual_education_organization.type_name
-                != "Образовательная организация высшего образования"
-                or certificate.status_name == "Недействующее"
-                or certificate.actual_education_organization.region_name
-                == "образовательные учреждения, находящиеся за пределами Российской Федерации"
-            ):
-                elem.clear()
-                continue
-
-            certificates.append(CertificateOut.model_validate(certificate, from_attributes=True))
-            elem.clear()
-
-    args.output.write(Certificates(certificates=certificates).model_dump_json(indent=2))
+    workers = args.workers or os.cpu_count() or 1
+    source = open_input(args.input)
+    if workers > 1:
+        if args.input.name == "<stdin>" or source is not args.input:
+            parser.error("--workers requires --input to be an uncompressed file")
+        args.input.close()
+        certificates = iter_xml_parallel(args.input.name, workers)
+    else:
+        certificates = iter_xml(source)
+
+    if args.mongo_uri:
+        report = asyncio.run(load_to_mongo(certificates, args.mongo_uri, args.mode, args.batch_size))
+        elapsed = time.perf_counter() - _start
+        print(
+            f"Imported {report.processed} certificates in {elapsed:.1f}s ({report.processed / elapsed:.0f} rows/s): "
+            f"created={report.created} changed={report.changed} skipped={report.skipped} failed={report.failed} "
+            f"revoked={report.revoked}",
+            file=sys.stderr,
+        )
+        for error in report.errors:
+            print(f"  {error}", file=sys.stderr)
+        return
+
+    write = write_ndjson if is_ndjson(args.output) else write_json
+    output = open_output(args.output)
+    try:
+        count = write(certificates, output)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+    print(f"Parsed {count} certificates in {time.perf_counter() - _start:.1f}s", file=sys.stderr)
 
 
 if __name__ == "__main__":
@@ -9,10 +9,13 @@ from starlette.responses import RedirectResponse
 
 import src.logging_  # noqa: F401
 from src.api import docs
+from src.api.compression_middleware import CompressionMiddleware
 from src.api.docs import generate_unique_operation_id
 from src.api.lifespan import lifespan
 from src.api.routers import routers
+from src.api.session_middleware import ServerSideSessionMiddleware
 from src.config import settings
+from src.modules.sessions.repository import session_backend, SESSION_MAX_AGE
 
 # App definition
 app = FastAPI(
@@ -41,19 +44,34 @@ if settings.cors_allow_origins:
         allow_origin_regex=".*" if settings.wildcard_allow_origin_regex else None,
     )
 
+# Compression of large JSON responses
+app.add_middleware(CompressionMiddleware)
+
 # Authorization
 same_site = "lax"
 session_cookie = "__Secure-abitura-session" if settings.secure_prefix_cookie else "abitura-session"
-# noinspection PyTypeChecker
-app.add_middleware(
-    SessionMiddleware,
-    secret_key=settings.auth.session_secret_key.get_secret_value(),
-    session_cookie=session_cookie,
-    max_age=14 * 24 * 60 * 60,  # 14 days, in seconds
-    same_site=same_site,
-    https_only=settings.https_only_cookie,
-    domain=None,
-)
+if session_backend is None:
+    # noinspection PyTypeChecker
+    app.add_middleware(
+        SessionMiddleware,
+        secret_key=settings.auth.session_secret_key.get_secret_value(),
+        session_cookie=session_cookie,
+        max_age=SESSION_MAX_AGE,
+        same_site=same_site,
+        https_only=settings.https_only_cookie,
+        domain=None,
+    )
+else:
+    # noinspection PyTypeChecker
+    app.add_middleware(
+        ServerSideSessionMiddleware,
+        backend=session_backend,
+        session_cookie=session_cookie,
+        max_age=SESSION_MAX_AGE,
+        same_site=same_site,
+        https_only=settings.https_only_cookie,
+        domain=None,
+    )
 
 # Static files
 if settings.static_files is not None:
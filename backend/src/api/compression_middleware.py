@@ -0,0 +1,159 @@
+__all__ = ["CompressionMiddleware", "available_encodings"]
+
+import gzip
+from typing import Callable
+
+import brotli
+import zstandard
+from anyio import to_thread
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.cache import TTLCache
+from src.modules.metrics.repository import metrics_repository
+
+MINIMUM_SIZE = 1024  # bytes, smaller bodies do not benefit from compression
+THREAD_SIZE = 256 * 1024  # bytes, bigger bodies are compressed in a thread to not block the event loop
+COMPRESSED_CACHE_MAXSIZE = 256
+COMPRESSED_CACHE_TTL = 10 * 60  # seconds
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml", "image/svg+xml")
+
+# levels are tuned for latency, not for ratio
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+ZSTD_LEVEL = 3
+
+_zstd_compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+
+_compressors: dict[str, Callable[[bytes], bytes]] = {
+    "br": lambda body: brotli.compress(body, quality=BROTLI_QUALITY),
+    "zstd": _zstd_compressor.compress,
+    "gzip": lambda body: gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0),
+}
+
+
+def available_encodings() -> list[str]:
+    """
+    Supported encodings in order of preference.
+    """
+    return list(_compressors)
+
+
+def _negotiate(accept_encoding: str) -> str | None:
+    """
+    Choose encoding from `Accept-Encoding`: the highest q-value, ties are resolved by server preference.
+    """
+    accepted: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                continue
+        accepted[coding] = q
+
+    best: str | None = None
+    best_q = 0.0
+    for encoding in _compressors:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with brotli, zstd or gzip negotiated from `Accept-Encoding`. Bodies of responses with ETag are
+    cached in compressed form, so hot payloads are not compressed again. Streaming responses are passed as is.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = MINIMUM_SIZE) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache: TTLCache[tuple[str, str, str], bytes] = TTLCache(
+            maxsize=COMPRESSED_CACHE_MAXSIZE, ttl=COMPRESSED_CACHE_TTL
+        )
+        metrics_repository.register("compression", self.stats)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = _negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message | None = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, passthrough
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                if (
+                    "content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                    or message["status"] in (204, 304)
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message  # postpone until the body is known
+                return
+
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            assert start_message is not None
+            body: bytes = message.get("body", b"")
+            if message.get("more_body", False) or len(body) < self.minimum_size:
+                # streaming or small response
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            headers = MutableHeaders(scope=start_message)
+            compressed = await self._compress(body, encoding, scope, headers.get("etag"))
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag is not None and not etag.startswith("W/"):
+                # compressed representation is not byte-identical, so strong ETag becomes weak
+                headers["ETag"] = "W/" + etag
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _compress(self, body: bytes, encoding: str, scope: Scope, etag: str | None) -> bytes:
+        cache_key = None
+        if etag is not None:
+            target = scope["path"] + "?" + scope.get("query_string", b"").decode("latin-1")
+            cache_key = (target, etag, encoding)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        compress = _compressors[encoding]
+        if len(body) >= THREAD_SIZE:
+            compressed = await to_thread.run_sync(compress, body)
+        else:
+            compressed = compress(body)
+
+        if cache_key is not None:
+            self.cache.set(cache_key, compressed)
+        return compressed
+
+    def stats(self) -> dict[str, int | float | list[str]]:
+        return {"encodings": available_encodings(), **self.cache.stats()}
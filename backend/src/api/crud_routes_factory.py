@@ -3,18 +3,37 @@
 __all__ = ["setup_based_on_methods"]
 
 import inspect
+import typing
+from functools import lru_cache
 from typing import Optional, Any
+from zlib import crc32
 
-from fastapi import APIRouter
+from beanie import PydanticObjectId
+from fastapi import APIRouter, Query, Body, Request, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.params import Depends
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field, create_model
 from pymongo.errors import DuplicateKeyError
 
-from src.exceptions import ObjectNotFound
+from src.api.etag import make_etag, is_not_modified, not_modified_response, set_etag
+from src.exceptions import ObjectNotFound, InvalidCursor, InvalidFields
 from src.exceptions import AlreadyExists
+from src.storages.mongo.crud import InvalidCursorError
+from src.storages.mongo.raw import RawORJSONResponse
 from src.typing_ import make_not_optional
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+MAX_BATCH_SIZE = 1000
+
 DEFAULT_ROUTES = {
     "create": "/",
+    "read_page": "/page",
+    "read_many": "/batch/read",
+    "bulk_create": "/batch",
+    "bulk_update": "/batch",
+    "bulk_delete": "/batch",
     "read_by": "/by",
     "read": "/{id}",
     "read_all": "/",
@@ -24,9 +43,31 @@ DEFAULT_ROUTES = {
 
 DEFAULT_RESPONSES: dict[str, dict[int | str, dict[str, Any]]] = {
     "create": {201: {"description": "Объект успешно создан"}, **AlreadyExists.responses},
-    "read_by": {200: {"description": "Возвращён объект по фильтру"}, **ObjectNotFound.responses},
-    "read": {200: {"description": "Возвращён объект"}, **ObjectNotFound.responses},
-    "read_all": {200: {"description": "Возвращены список всех объектов"}},
+    "read_by": {
+        200: {"description": "Возвращён объект по фильтру"},
+        **ObjectNotFound.responses,
+        **InvalidFields.responses,
+    },
+    "read": {
+        200: {"description": "Возвращён объект"},
+        304: {"description": "Объект не изменился (If-None-Match)"},
+        **ObjectNotFound.responses,
+        **InvalidFields.responses,
+    },
+    "read_all": {
+        200: {"description": "Возвращены список всех объектов"},
+        304: {"description": "Список не изменился (If-None-Match)"},
+        **InvalidFields.responses,
+    },
+    "read_page": {
+        200: {"description": "Возвращена страница объектов"},
+        **InvalidCursor.responses,
+        **InvalidFields.responses,
+    },
+    "read_many": {200: {"description": "Возвращены объекты в порядке запроса (null, если объект не найден)"}},
+    "bulk_create": {200: {"description": "Результат создания для каждого объекта"}},
+    "bulk_update": {200: {"description": "Результат обновления для каждого объекта"}},
+    "bulk_delete": {200: {"description": "Результат удаления для каждого объекта"}},
     "update": {200: {"description": "Объект успешно обновлён"}, **ObjectNotFound.responses, **AlreadyExists.responses},
     "delete": {200: {"description": "Объект успешно удалён"}, **ObjectNotFound.responses},
 }
@@ -39,6 +80,9 @@ def setup_based_on_methods(
     responses: Optional[dict[str, dict[int | str, dict[str, Any]]]] = None,
     dependencies: Optional[dict[str, list[Depends] | Depends]] = None,
 ):
+    # model with all fields, used to validate `fields=` query parameter
+    full_model = _get_full_model(crud)
+
     routes = DEFAULT_ROUTES if routes is None else DEFAULT_ROUTES | routes
     responses = DEFAULT_RESPONSES if responses is None else DEFAULT_RESPONSES | responses
     dependencies = dependencies or {}
@@ -65,16 +109,61 @@ def setup_based_on_methods(
             status_code=201,
         )
 
+    # check if crud has `read_page` method (keyset pagination), must be registered before `/{id}`
+    if hasattr(crud, "read_page") and not inspect.isabstract(crud.read_page):
+
+        async def _read_page(
+            limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Размер страницы"),
+            after: str | None = Query(None, description="Курсор `next_cursor` из предыдущей страницы"),
+            **kwargs,
+        ) -> Any:
+            fields = _pop_projection(kwargs, full_model)
+            try:
+                page = await crud.read_page(limit=limit, after=after, **kwargs)
+            except InvalidCursorError as e:
+                raise InvalidCursor(str(e))
+            return _respond(page, fields)
+
+        _read_page.__signature__ = _with_fields_parameter(
+            inspect.signature(_read_page), inspect.signature(crud.read_page)
+        )
+
+        router.add_api_route(
+            path=routes["read_page"],
+            endpoint=_read_page,
+            responses=responses["read_page"],
+            dependencies=dependencies.get("read_page", []),
+            methods=["GET"],
+            response_model=inspect.signature(crud.read_page).return_annotation,
+        )
+
+    # batch methods, must be registered before `/{id}`; use dependencies of single-object methods by default
+    for batch_method, single_method, http_method in (
+        ("read_many", "read", "POST"),
+        ("bulk_create", "create", "POST"),
+        ("bulk_update", "update", "PATCH"),
+        ("bulk_delete", "delete", "DELETE"),
+    ):
+        if hasattr(crud, batch_method) and not inspect.isabstract(getattr(crud, batch_method)):
+            router.add_api_route(
+                path=routes[batch_method],
+                endpoint=_batch_endpoint(getattr(crud, batch_method)),
+                responses=responses[batch_method],
+                dependencies=dependencies.get(batch_method, dependencies.get(single_method, [])),
+                methods=[http_method],
+            )
+
     # check if crud has `read_by` method and not abstract
     if hasattr(crud, "read_by") and not inspect.isabstract(crud.read_by):
 
         async def _read_by(*args, **kwargs) -> Any:
+            fields = _pop_projection(kwargs, full_model)
             obj = await crud.read_by(*args, **kwargs)
             if obj is None:
                 raise ObjectNotFound()
-            return obj
+            return _respond(obj, fields)
 
-        _read_by.__signature__ = _make_not_optional_return(inspect.signature(crud.read_by))
+        _read_by.__signature__ = _with_fields_parameter(_make_not_optional_return(inspect.signature(crud.read_by)))
         router.add_api_route(
             path=routes["read_by"],
             endpoint=_read_by,
@@ -85,14 +174,37 @@ def setup_based_on_methods(
 
     # check if crud has `read` method
     if hasattr(crud, "read") and not inspect.isabstract(crud.read):
+        # versioned objects are served with ETag and conditional GET support
+        versioned = hasattr(crud, "read_version")
+        id_name = next(iter(inspect.signature(crud.read).parameters))
 
         async def _read(*args, **kwargs) -> Any:
+            request: Request | None = kwargs.pop("request", None)
+            response: Response | None = kwargs.pop("response", None)
+            fields = _pop_projection(kwargs, full_model)
+            fields_tag = _fields_etag_part(kwargs.get("projection_model"))
+
+            if request is not None and request.headers.get("if-none-match"):
+                # answer with 304 using only (cached) version, without reading the whole object
+                version = await crud.read_version(kwargs[id_name])
+                if version is None:
+                    raise ObjectNotFound()
+                etag = make_etag(kwargs[id_name], version, fields_tag)
+                if is_not_modified(request, etag):
+                    return not_modified_response(etag)
+
             obj = await crud.read(*args, **kwargs)
             if obj is None:
                 raise ObjectNotFound()
-            return obj
+            result = _respond(obj, fields)
+            if response is not None:
+                etag = make_etag(obj.id, obj.version, fields_tag)
+                set_etag(result if isinstance(result, Response) else response, etag)
+            return result
 
-        _read.__signature__ = _make_not_optional_return(inspect.signature(crud.read))
+        _read.__signature__ = _with_fields_parameter(_make_not_optional_return(inspect.signature(crud.read)))
+        if versioned:
+            _read.__signature__ = _with_request_parameters(_read.__signature__)
         router.add_api_route(
             path=routes["read"],
             endpoint=_read,
@@ -104,9 +216,34 @@ def setup_based_on_methods(
 
     # check if crud has `read_all` method
     if hasattr(crud, "read_all") and not inspect.isabstract(crud.read_all):
+        # lists are served in trusted read mode (raw documents, no model validation) if crud supports it
+        raw = hasattr(crud, "read_all_raw")
+        # or from in-memory snapshot with pre-serialized body (for the default representation)
+        snapshot = hasattr(crud, "read_all_snapshot")
+
+        async def _read_all(*args, **kwargs) -> Any:
+            request: Request | None = kwargs.pop("request", None)
+            kwargs.pop("response", None)
+            fields = _pop_projection(kwargs, full_model)
+            if snapshot and fields is None and request is not None:
+                current = await crud.read_all_snapshot()
+                if is_not_modified(request, current.etag):
+                    return not_modified_response(current.etag)
+                response = Response(current.body, media_type="application/json")
+                set_etag(response, current.etag)
+                return response
+            if raw:
+                return RawORJSONResponse(await crud.read_all_raw(*args, **kwargs))
+            objs = await crud.read_all(*args, **kwargs)
+            return _respond(objs, fields)
+
+        _read_all.__signature__ = _with_fields_parameter(inspect.signature(crud.read_all))
+        if snapshot:
+            _read_all.__signature__ = _with_request_parameters(_read_all.__signature__)
+
         router.add_api_route(
             path=routes["read_all"],
-            endpoint=crud.read_all,
+            endpoint=_read_all,
             responses=responses["read_all"],
             dependencies=dependencies.get("read_all", []),
             methods=["GET"],
@@ -163,3 +300,113 @@ def _make_not_optional_return(signature: inspect.Signature) -> inspect.Signature
         signature_to_set = signature.replace(return_annotation=return_annotation)
 
     return signature_to_set or signature
+
+
+def _batch_endpoint(method: Any) -> Any:
+    async def _batch(*args, **kwargs) -> Any:
+        return await method(*args, **kwargs)
+
+    # batch is passed as request body (lists are query parameters by default)
+    signature = inspect.signature(method)
+    parameters = [
+        p.replace(default=Body(..., max_length=MAX_BATCH_SIZE)) if p.default is inspect.Parameter.empty else p
+        for p in signature.parameters.values()
+    ]
+    _batch.__signature__ = signature.replace(parameters=parameters)
+    _batch.__name__ = method.__name__
+    return _batch
+
+
+def _get_full_model(crud: Any) -> type[BaseModel] | None:
+    """
+    Full model of the objects is the return annotation of `read` (or of `read_all` items).
+    """
+    for method_name in ("read", "read_by", "read_all"):
+        if not hasattr(crud, method_name):
+            continue
+        annotation = make_not_optional(inspect.signature(getattr(crud, method_name)).return_annotation)
+        if typing.get_origin(annotation) is list:
+            annotation = typing.get_args(annotation)[0]
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            return annotation
+    return None
+
+
+def _with_fields_parameter(
+    signature: inspect.Signature, crud_signature: inspect.Signature | None = None
+) -> inspect.Signature:
+    """
+    Replace `projection_model` parameter of the crud method with `fields` query parameter.
+    """
+    crud_signature = crud_signature or signature
+    parameters = [
+        p
+        for name, p in signature.parameters.items()
+        if name != "projection_model" and p.kind != inspect.Parameter.VAR_KEYWORD
+    ]
+    if "projection_model" not in crud_signature.parameters:
+        return signature.replace(parameters=parameters)
+    parameters.append(
+        inspect.Parameter(
+            "fields",
+            inspect.Parameter.KEYWORD_ONLY,
+            default=Query(
+                None, description="Список полей через запятую, которые нужно вернуть (`id` и `version` всегда)"
+            ),
+            annotation=str | None,
+        )
+    )
+    return signature.replace(parameters=parameters)
+
+
+def _with_request_parameters(signature: inspect.Signature) -> inspect.Signature:
+    """
+    Add `request` and `response` parameters, needed for conditional requests and ETag header.
+    """
+    parameters = list(signature.parameters.values())
+    parameters.append(inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY, annotation=Request))
+    parameters.append(inspect.Parameter("response", inspect.Parameter.KEYWORD_ONLY, annotation=Response))
+    return signature.replace(parameters=parameters)
+
+
+def _fields_etag_part(projection_model: type[BaseModel] | None) -> str | None:
+    # different field sets are different representations, so they need different ETags
+    if projection_model is None:
+        return None
+    return f"{crc32(','.join(sorted(projection_model.model_fields)).encode()):08x}"
+
+
+def _pop_projection(kwargs: dict[str, Any], full_model: type[BaseModel] | None) -> str | None:
+    fields = kwargs.pop("fields", None)
+    if fields is not None and full_model is not None:
+        requested = frozenset(field.strip() for field in fields.split(",") if field.strip()) - {"id"}
+        unknown = requested - full_model.model_fields.keys()
+        if unknown:
+            raise InvalidFields(f"Неизвестные поля: {', '.join(sorted(unknown))}")
+        if "version" in full_model.model_fields:
+            # version is needed for ETag
+            requested |= {"version"}
+        kwargs["projection_model"] = _fields_projection_model(full_model, requested)
+    return fields
+
+
+@lru_cache(maxsize=256)
+def _fields_projection_model(full_model: type[BaseModel], fields: frozenset[str]) -> type[BaseModel]:
+    """
+    Build (and cache per field set) projection model with only requested fields of the full model.
+    """
+    definitions: dict[str, Any] = {
+        name: (full_model.model_fields[name].annotation, full_model.model_fields[name]) for name in sorted(fields)
+    }
+    definitions["id"] = (
+        PydanticObjectId,
+        Field(..., description="MongoDB document ObjectID", validation_alias="_id", serialization_alias="id"),
+    )
+    return create_model(f"{full_model.__name__}Fields", **definitions)
+
+
+def _respond(obj: Any, fields: str | None) -> Any:
+    # projected objects do not match `response_model`, so skip response validation for them
+    if fields is None:
+        return obj
+    return ORJSONResponse(jsonable_encoder(obj, by_alias=True))
@@ -4,6 +4,7 @@ from typing import Annotated
 from fastapi import Request, Depends
 
 from src.exceptions import NotEnoughPermissionsException, UnauthorizedException
+from src.modules.sessions.repository import session_backend
 from src.modules.user.repository import user_repository
 from src.storages.mongo.models.user import User
 from beanie import PydanticObjectId
@@ -21,19 +22,41 @@ async def _get_optional_uid_from_session(request: Request) -> PydanticObjectId |
 
     if uid is None:
         return None
-    uid = PydanticObjectId(uid)
-    exists = await user_repository.exists(uid)
-    if not exists:
+
+    # server-side sessions are revoked when the user is deleted (broadcast to all workers within
+    # `REVOCATIONS_POLL_INTERVAL`), no need to check that the user exists
+    if session_backend is not None:
+        return PydanticObjectId(uid)
+
+    user = await _get_optional_user_from_session(request)
+    if user is None:
+        return None
+    return user.id
+
+
+async def _get_optional_user_from_session(request: Request) -> User | None:
+    uid = request.session.get("uid")
+
+    if uid is None:
+        return None
+
+    # request-scoped cache: one request may resolve the user by several dependencies
+    user: User | None = getattr(request.state, "user", None)
+    if user is not None and str(user.id) == uid:
+        return user
+
+    user = await user_repository.read_cached(PydanticObjectId(uid))
+    if user is None:
         request.session.clear()
         raise UnauthorizedException("Пользователь не найден")
-    return uid
+    request.state.user = user
+    return user
 
 
 async def get_user(request: Request) -> User:
-    user_id = await _get_uid_from_session(request)
-    user = await user_repository.read(user_id)
+    user = await _get_optional_user_from_session(request)
     if user is None:
-        raise UnauthorizedException(detail="Пользователь не найден")
+        raise UnauthorizedException("Отсутствует сессия")
     return user
 
 
@@ -0,0 +1,46 @@
+__all__ = ["make_etag", "make_list_etag", "is_not_modified", "not_modified_response", "set_etag"]
+
+from typing import Any
+from zlib import crc32
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    Strong ETag from parts (e.g. document id, version and representation parameters). None parts are skipped.
+    """
+    values = [str(part) for part in parts if part is not None]
+    return '"' + "-".join(values) + '"'
+
+
+def make_list_etag(pairs: list[tuple[Any, int]], *parts: Any) -> str:
+    """
+    Strong ETag for a list of documents from (id, version) pairs.
+    """
+    digest = crc32(";".join(f"{id}:{version}" for id, version in pairs).encode())
+    return make_etag(len(pairs), f"{digest:08x}", *parts)
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # weak comparison, as required for If-None-Match
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in candidates
+
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    # allow caching, but always revalidate with If-None-Match
+    response.headers["Cache-Control"] = "no-cache"
+
+
+def not_modified_response(etag: str) -> Response:
+    response = Response(status_code=304)
+    set_etag(response, etag)
+    return response
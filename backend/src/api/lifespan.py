@@ -1,6 +1,8 @@
 __all__ = ["lifespan"]
 
+import asyncio
 import json
+import time
 import httpx
 from contextlib import asynccontextmanager
 from typing import TYPE_CHECKING
@@ -12,7 +14,6 @@ from pymongo import timeout
 from pymongo.errors import ConnectionFailure
 from starlette.datastructures import State
 
-from scripts.parse_organizations import Certificates
 from src.config import settings
 from src.logging_ import logger
 from src.storages.mongo import document_models
@@ -41,22 +42,66 @@ async def setup_database() -> AsyncIOMotorClient:
 
 
 async def setup_predefined() -> None:
+    """
+    Seed the database with predefined data. Each phase is skipped if its source data has not changed since the last
+    run and the seeded data is still in the database (see `SeedRepository`), phases depending on other phases are
+    re-run when those change. Concurrently starting workers run each phase once.
+    """
     from src.modules.user.repository import user_repository
     from src.modules.files.repository import files_repository
-    from src.modules.organization.repository import organization_repository, parse_certificates_to_organizations
+    from src.modules.organization.repository import organization_repository
+    from src.modules.organization.importer import organization_importer
+    from src.modules.organization.stream import is_ndjson, iter_certificates, read_file_chunks
     from src.modules.scene.repository import scene_repository
+    from src.modules.seed.repository import seed_repository, fingerprint_data, fingerprint_directory, fingerprint_file
+
+    start = time.perf_counter()
+    predefined = settings.predefined
+
+    async def seed_files():
+        await files_repository.insert_all_existing_files()
+        await files_repository.check_existing_files()
+
+    async def seed_organizations():
+        if organizations_file := predefined.organizations_file:
+            await organization_importer.run(
+                iter_certificates(read_file_chunks(organizations_file), ndjson=is_ndjson(organizations_file))
+            )
+
+    async def organizations_present():
+        # the dump is not re-read to check every organization, only that the collection has not been emptied
+        return predefined.organizations_file is None or await organization_repository.any_exist()
+
+    files = await seed_repository.run_phase(
+        "files",
+        lambda: fingerprint_directory(settings.static_files.directory),
+        seed_files,
+        files_repository.existing_files_inserted,
+    )
+    organizations = await seed_repository.run_phase(
+        "organizations",
+        lambda: fingerprint_file(predefined.organizations_file),
+        seed_organizations,
+        organizations_present,
+    )
+
+    # users and scenes refer to organizations (and scenes to files) by username
+    async def users_fingerprint():
+        return fingerprint_data([user.model_dump(mode="json") for user in predefined.users], organizations)
 
-    await files_repository.insert_all_existing_files()
-    await files_repository.check_existing_files()
+    async def scenes_fingerprint():
+        return fingerprint_data([scene.model_dump(mode="json") for scene in predefined.scenes], organizations, files)
 
-    if settings.predefined.organizations_file:
-        with open(settings.predefined.organizations_file) as f:
-            organizations = Certificates.model_validate_json(f.read())
-            _create = await parse_certificates_to_organizations(organizations)
-            if _create:
-                await organization_repository.create_many(_create)
-    await user_repository.create_predefined_users()
-    await scene_repository.create_predefined_scenes()
+    await seed_repository.run_phase(
+        "users", users_fingerprint, user_repository.create_predefined_users, user_repository.predefined_users_exist
+    )
+    await seed_repository.run_phase(
+        "scenes",
+        scenes_fingerprint,
+        scene_repository.create_predefined_scenes,
+        scene_repository.predefined_scenes_exist,
+    )
+    logger.info(f"Seeding finished in {time.perf_counter() - start:.2f}s")
 
 
 @asynccontextmanager
@@ -70,8 +115,24 @@ async def lifespan(app: FastAPI):
 
     app.state.httpx_client = httpx.AsyncClient()
 
+    from src.modules.organization.directory import organization_directory
+    from src.modules.sessions.repository import session_backend
+
+    await organization_directory.refresh()
+    directory_polling = asyncio.create_task(organization_directory.poll_forever())
+    revocations_polling = asyncio.create_task(session_backend.poll_forever()) if session_backend is not None else None
+
+    from src.modules.jobs.runner import job_runner
+
+    jobs_sweeping = asyncio.create_task(job_runner.sweep_forever())
+
     yield
 
     # Application shutdown
+    jobs_sweeping.cancel()
+    await job_runner.shutdown()
+    directory_polling.cancel()
+    if revocations_polling is not None:
+        revocations_polling.cancel()
     motor_client.close()
     await app.state.httpx_client.aclose()
@@ -6,6 +6,8 @@ from src.modules.scene.router import router as router_scene
 from src.modules.online.router import router as router_online
 from src.modules.chatting.router import router as router_chatting
 from src.modules.review.router import router as router_reviews
+from src.modules.metrics.router import router as router_metrics
+from src.modules.jobs.router import router as router_jobs
 
 routers = [
     router_providers,
@@ -16,6 +18,8 @@ routers = [
     router_online,
     router_chatting,
     router_reviews,
+    router_metrics,
+    router_jobs,
 ]
 
 __all__ = ["routers"]
@@ -0,0 +1,83 @@
+__all__ = ["ServerSideSessionMiddleware"]
+
+from typing import Literal
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.modules.sessions.repository import SessionBackend
+
+
+class ServerSideSessionMiddleware:
+    """
+    Drop-in replacement for `starlette.middleware.sessions.SessionMiddleware`: `request.session` is loaded from
+    the session backend by opaque session id from the cookie. Session id is rotated on every change of the session,
+    cleared session is revoked on the server.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        backend: SessionBackend,
+        session_cookie: str = "session",
+        max_age: int | None = 14 * 24 * 60 * 60,  # 14 days, in seconds
+        path: str = "/",
+        same_site: Literal["lax", "strict", "none"] = "lax",
+        https_only: bool = False,
+        domain: str | None = None,
+    ) -> None:
+        self.app = app
+        self.backend = backend
+        self.session_cookie = session_cookie
+        self.max_age = max_age
+        self.path = path
+        self.security_flags = "httponly; samesite=" + same_site
+        if https_only:  # Secure flag can be used with HTTPS only
+            self.security_flags += "; secure"
+        if domain is not None:
+            self.security_flags += f"; domain={domain}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):  # pragma: no cover
+            await self.app(scope, receive, send)
+            return
+
+        connection = HTTPConnection(scope)
+        session_id = connection.cookies.get(self.session_cookie)
+        initial_session = {}
+        stale_cookie = False
+
+        if session_id:
+            loaded = await self.backend.load(session_id)
+            if loaded is None:
+                stale_cookie = True
+                session_id = None
+            else:
+                initial_session = loaded
+
+        scope["session"] = dict(initial_session)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                session = scope["session"]
+                headers = MutableHeaders(scope=message)
+                if session != initial_session:
+                    if session_id is not None:
+                        await self.backend.delete(session_id)
+                    if session:
+                        new_session_id = self.backend.generate_id()
+                        await self.backend.save(new_session_id, session)
+                        headers.append("Set-Cookie", self._cookie(new_session_id, self.max_age))
+                    else:
+                        headers.append("Set-Cookie", self._cookie("null", 0))
+                elif stale_cookie:
+                    headers.append("Set-Cookie", self._cookie("null", 0))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _cookie(self, value: str, max_age: int | None) -> str:
+        expires = "expires=Thu, 01 Jan 1970 00:00:00 GMT; " if max_age == 0 else ""
+        max_age_attr = f"Max-Age={max_age}; " if max_age is not None else ""
+        return f"{self.session_cookie}={value}; path={self.path}; {max_age_attr}{expires}{self.security_flags}"
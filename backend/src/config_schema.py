@@ -15,6 +15,12 @@ class Environment(StrEnum):
     TESTING = "testing"
 
 
+class SessionStorage(StrEnum):
+    COOKIE = "cookie"
+    MEMORY = "memory"
+    MONGO = "mongo"
+
+
 class SettingsEntityModel(BaseModel):
     model_config = ConfigDict(use_attribute_docstrings=True, extra="forbid")
 
@@ -24,6 +30,8 @@ class Authentication(SettingsEntityModel):
     "Allowed domains for redirecting after authentication"
     session_secret_key: SecretStr
     "Secret key for sessions. Use 'openssl rand -hex 32' to generate keys"
+    session_storage: SessionStorage = SessionStorage.COOKIE
+    "Where to store sessions: signed cookie (`cookie`), process memory (`memory`, single worker only) or MongoDB (`mongo`)"
 
 
 class StaticFiles(SettingsEntityModel):
@@ -77,7 +85,7 @@ class Predefined(SettingsEntityModel):
     scenes: list[PredefinedScene] = []
     "Predefined scenes"
     organizations_file: Path | None = None
-    "Path to the organizations file (output of `parse_organizations.py`)"
+    "Path to the organizations file (output of `parse_organizations.py`: JSON or NDJSON, optionally gzip/zstd-compressed)"
 
 
 class Telegram(SettingsEntityModel):
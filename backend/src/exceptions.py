@@ -57,6 +57,36 @@ class InvalidTelegramWidgetHash(CustomHTTPException):
 # --- Object exceptions ---- #
 
 
+class InvalidCursor(CustomHTTPException):
+    """
+    HTTP_400_BAD_REQUEST
+    Некорректный курсор пагинации
+    """
+
+    def __init__(self, detail: str | None = None):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=detail or self.responses[400]["description"],
+        )
+
+    responses = {400: {"description": "Некорректный курсор пагинации"}}
+
+
+class InvalidFields(CustomHTTPException):
+    """
+    HTTP_400_BAD_REQUEST
+    Запрошены несуществующие поля
+    """
+
+    def __init__(self, detail: str | None = None):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=detail or self.responses[400]["description"],
+        )
+
+    responses = {400: {"description": "Запрошены несуществующие поля"}}
+
+
 class ObjectNotFound(CustomHTTPException):
     """
     HTTP_404_NOT_FOUND
@@ -86,6 +116,24 @@ class AlreadyExists(CustomHTTPException):
     responses = {409: {"description": "Объект уже существует"}}
 
 
+# --- Server exceptions ---- #
+
+
+class ServiceUnavailable(CustomHTTPException):
+    """
+    HTTP_503_SERVICE_UNAVAILABLE
+    Сервер перегружен
+    """
+
+    def __init__(self, detail: str | None = None):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail or self.responses[503]["description"],
+        )
+
+    responses = {503: {"description": "Сервер временно перегружен, повторите запрос позже"}}
+
+
 def unwrap_duplicate_error(e: Exception) -> Exception:
     duplicate_key_error: DuplicateKeyError | None = None
     if isinstance(e, DuplicateKeyError):
@@ -0,0 +1,66 @@
+__all__ = ["EducationalProgramRepository", "educational_program_repository"]
+
+from typing import Any, cast
+
+from beanie import PydanticObjectId
+
+from src.storages.mongo.crud import crud_factory, CRUD, Page
+from src.storages.mongo.models.educational_program import EducationalProgram, EducationalProgramSchema
+
+crud: CRUD[EducationalProgram, EducationalProgramSchema, EducationalProgramSchema] = crud_factory(EducationalProgram)
+
+
+# noinspection PyMethodMayBeStatic
+class EducationalProgramRepository:
+    async def read_page_for_organization(
+        self,
+        organization_id: PydanticObjectId,
+        limit: int,
+        after: str | None = None,
+        *,
+        ugs_code: str | None = None,
+        edu_level_name: str | None = None,
+    ) -> Page[EducationalProgram]:
+        filter_: dict[str, Any] = {"organization_id": organization_id}
+        if ugs_code is not None:
+            filter_["ugs_code"] = ugs_code
+        if edu_level_name is not None:
+            filter_["edu_level_name"] = edu_level_name
+        return cast(Page[EducationalProgram], await crud.read_page(limit, after, filter_=filter_))
+
+    async def read_fields_by_organization(
+        self, fields: list[str], organization_ids: list[PydanticObjectId] | None = None
+    ) -> dict[PydanticObjectId, list[dict[str, Any]]]:
+        """
+        Only `fields` of programs (raw dicts), grouped by organization. All organizations if `organization_ids` is None.
+        """
+        filter_ = {"organization_id": {"$in": organization_ids}} if organization_ids is not None else {}
+        projection = {"_id": 0, "organization_id": 1, **{field: 1 for field in fields}}
+        cursor = EducationalProgram.get_motor_collection().find(filter_, projection=projection)
+        grouped: dict[PydanticObjectId, list[dict[str, Any]]] = {}
+        async for raw in cursor:
+            grouped.setdefault(raw.pop("organization_id"), []).append(raw)
+        return grouped
+
+    async def replace_for_organizations(self, programs: dict[PydanticObjectId, list[EducationalProgramSchema]]) -> None:
+        """
+        Replace all programs of the given organizations.
+        """
+        if not programs:
+            return
+        collection = EducationalProgram.get_motor_collection()
+        await collection.delete_many({"organization_id": {"$in": list(programs)}})
+        documents = [
+            {**program.model_dump(exclude_none=True), "organization_id": organization_id}
+            for organization_id, organization_programs in programs.items()
+            for program in organization_programs
+        ]
+        if documents:
+            await collection.insert_many(documents, ordered=False)
+
+    async def delete_for_organizations(self, organization_ids: list[PydanticObjectId]) -> None:
+        if organization_ids:
+            await EducationalProgram.get_motor_collection().delete_many({"organization_id": {"$in": organization_ids}})
+
+
+educational_program_repository: EducationalProgramRepository = EducationalProgramRepository()
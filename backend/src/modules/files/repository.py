@@ -2,11 +2,12 @@ __all__ = ["FileRepository", "files_repository", "upload_file_from_fastapi"]
 
 import datetime
 from pathlib import Path
+from typing import Any
 
 import magic
 import pyvips
 from anyio import open_file
-from beanie import PydanticObjectId
+from beanie import PydanticObjectId, UpdateResponse
 from beanie.odm.operators.find.comparison import Eq
 from fastapi import UploadFile
 
@@ -15,24 +16,43 @@ from src.exceptions import ObjectNotFound
 from src.logging_ import logger
 from src.modules.files.schemas import UpdateFile
 from src.storages.mongo.models.file import File
+from src.storages.mongo.raw import find_raw
+from src.storages.mongo.versions import VersionCache
 
 
 # noinspection PyMethodMayBeStatic
 class FileRepository:
+    versions: VersionCache
+
+    def __init__(self):
+        self.versions = VersionCache(File)
+
     async def get(self, obj_id: PydanticObjectId) -> File | None:
         obj = await File.find_one(File.id == obj_id)
+        if obj is not None:
+            self.versions.remember(obj_id, obj.version)
         return obj
 
+    async def read_version(self, obj_id: PydanticObjectId) -> int | None:
+        return await self.versions.read(obj_id)
+
     async def get_all(self) -> list[File]:
         return await File.all().to_list()
 
+    async def get_all_raw(self) -> list[dict[str, Any]]:
+        return await find_raw(File)
+
     async def get_all_for_cars(self) -> list[File]:
         return await File.find(Eq(File.must_be_uploaded, True)).to_list()
 
     async def update(self, obj_id: PydanticObjectId, data: UpdateFile) -> File | None:
-        return await File.find(File.id == obj_id).update({"$set": data.model_dump()})
+        self.versions.forget(obj_id)
+        return await File.find_one(File.id == obj_id).update(
+            {"$set": data.model_dump(), "$inc": {"version": 1}}, response_type=UpdateResponse.NEW_DOCUMENT
+        )
 
     async def delete(self, obj_id: PydanticObjectId) -> bool:
+        self.versions.forget(obj_id)
         result = await File.find(File.id == obj_id).delete()
         if not result:
             return False
@@ -75,8 +95,20 @@ class FileRepository:
                     if obj.type != type_ or obj.size != size:
                         logger.info(f"Updating file {path}")
                         await File.find(File.id == id_).update(
-                            {"$set": {"type": type_, "size": size, "file_updated_at": file_updated_at}}
+                            {
+                                "$set": {"type": type_, "size": size, "file_updated_at": file_updated_at},
+                                "$inc": {"version": 1},
+                            }
                         )
+                        self.versions.forget(id_)
+
+    async def existing_files_inserted(self) -> bool:
+        """
+        Whether all files of the static directory are in the database (they may have been deleted since the last
+        seeding).
+        """
+        ids = {PydanticObjectId(path.stem) for path in settings.static_files.directory.rglob("*") if path.is_file()}
+        return await File.find({"_id": {"$in": list(ids)}}).count() == len(ids)
 
     async def check_existing_files(self) -> None:
         from_database = await self.get_all()
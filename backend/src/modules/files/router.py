@@ -7,14 +7,16 @@ __all__ = ["router"]
 import os
 
 from beanie import PydanticObjectId
-from fastapi import UploadFile, BackgroundTasks
+from fastapi import UploadFile, BackgroundTasks, Request, Response
 
 from src.api.custom_router_class import EnsureAuthenticatedAPIRouter
+from src.api.etag import make_etag, is_not_modified, not_modified_response, set_etag
 from src.exceptions import ObjectNotFound
 from src.config import settings
 from src.modules.files.repository import files_repository, upload_file_from_fastapi
 from src.modules.files.schemas import UpdateFile
 from src.storages.mongo import File
+from src.storages.mongo.raw import RawORJSONResponse
 
 router = EnsureAuthenticatedAPIRouter(prefix="/files", tags=["Files"])
 
@@ -37,24 +39,37 @@ async def get_all_files() -> list[File]:
     Получить список всех файлов.
     """
 
-    files = await files_repository.get_all()
-    return files
+    files = await files_repository.get_all_raw()
+    return RawORJSONResponse(files)  # type: ignore[return-value]
 
 
 @router.get(
     "/{obj_id}",
-    responses={200: {"description": "Файл"}, **ObjectNotFound.responses},
+    responses={
+        200: {"description": "Файл"},
+        304: {"description": "Файл не изменился (If-None-Match)"},
+        **ObjectNotFound.responses,
+    },
     status_code=200,
 )
-async def get_file(obj_id: PydanticObjectId) -> File:
+async def get_file(obj_id: PydanticObjectId, request: Request, response: Response) -> File:
     """
     Получить файл по его id.
     """
 
+    if request.headers.get("if-none-match"):
+        version = await files_repository.read_version(obj_id)
+        if version is None:
+            raise ObjectNotFound("File not found")
+        etag = make_etag(obj_id, version)
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)  # type: ignore[return-value]
+
     file = await files_repository.get(obj_id)
     if file is None:
         raise ObjectNotFound("File not found")
 
+    set_etag(response, make_etag(file.id, file.version))
     return file
 
 
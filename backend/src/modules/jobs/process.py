@@ -0,0 +1,52 @@
+"""
+Entry point of a job process started by `JobRunner`: connects to the database, runs the job function and reports
+progress, result or error to the job document.
+
+Usage: python -m src.modules.jobs.process <job_id> <module:function> <JSON list of arguments>
+"""
+
+import asyncio
+import importlib
+import json
+import sys
+
+from beanie import PydanticObjectId, init_beanie
+from motor.motor_asyncio import AsyncIOMotorClient
+from pydantic import BaseModel
+
+from src.config import settings
+from src.logging_ import logger
+from src.modules.jobs.repository import job_repository
+from src.storages.mongo import document_models
+
+
+async def run(id: PydanticObjectId, work_path: str, args: list) -> None:
+    module_name, function_name = work_path.split(":")
+    work = getattr(importlib.import_module(module_name), function_name)
+
+    client = AsyncIOMotorClient(settings.database.uri.get_secret_value())
+    await init_beanie(database=client.get_default_database(), document_models=document_models)
+    try:
+
+        async def on_progress(progress: BaseModel) -> None:
+            await job_repository.set_progress(id, progress.model_dump(mode="json"))
+
+        try:
+            result = await work(on_progress, *args)
+        except Exception as e:
+            logger.exception(f"Job {id} failed")
+            await job_repository.fail(id, f"{type(e).__name__}: {e}")
+            return
+        await job_repository.finish(id, result.model_dump(mode="json"))
+        logger.info(f"Job {id} succeeded")
+    finally:
+        client.close()
+
+
+def main():
+    id, work_path, args = sys.argv[1:]
+    asyncio.run(run(PydanticObjectId(id), work_path, json.loads(args)))
+
+
+if __name__ == "__main__":
+    main()
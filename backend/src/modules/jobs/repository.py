@@ -0,0 +1,96 @@
+__all__ = ["JobRepository", "job_repository", "STALE_AFTER"]
+
+import datetime
+from typing import Any
+
+from beanie import PydanticObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from src.storages.mongo.models.job import Job, JobKind, JobStatus
+from src.utils import aware_utcnow
+
+STALE_AFTER = datetime.timedelta(minutes=5)
+"Queued or running job without heartbeat for this long is considered dead (e.g. its worker was killed)"
+
+
+# noinspection PyMethodMayBeStatic
+class JobRepository:
+    async def create(self, kind: JobKind, created_by: PydanticObjectId | None = None) -> Job:
+        now = aware_utcnow()
+        return await Job(kind=kind, created_by=created_by, created_at=now, heartbeat_at=now).insert()
+
+    async def read(self, id: PydanticObjectId) -> Job | None:
+        return await Job.get(id)
+
+    async def try_start(self, id: PydanticObjectId) -> Job | None:
+        """
+        Move queued job to running. None if another job of the same kind is running (unique index) or the job is not
+        queued anymore.
+        """
+        now = aware_utcnow()
+        try:
+            raw = await Job.get_motor_collection().find_one_and_update(
+                {"_id": id, "status": JobStatus.QUEUED},
+                {"$set": {"status": JobStatus.RUNNING, "started_at": now, "heartbeat_at": now}},
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            return None
+        return Job.model_validate(raw) if raw is not None else None
+
+    async def read_active_ids(self, ids: list[PydanticObjectId]) -> set[PydanticObjectId]:
+        """
+        Ids of queued or running jobs among `ids`.
+        """
+        cursor = Job.get_motor_collection().find(
+            {"_id": {"$in": ids}, "status": {"$in": [JobStatus.QUEUED, JobStatus.RUNNING]}}, projection={"_id": 1}
+        )
+        return {raw["_id"] async for raw in cursor}
+
+    async def fail_stale(self) -> int:
+        """
+        Fail queued and running jobs without heartbeat for `STALE_AFTER` (their worker is dead), so they do not block
+        the queue and are not shown as queued forever.
+        """
+        result = await Job.get_motor_collection().update_many(
+            {
+                "status": {"$in": [JobStatus.QUEUED, JobStatus.RUNNING]},
+                "heartbeat_at": {"$lt": aware_utcnow() - STALE_AFTER},
+            },
+            {
+                "$set": {
+                    "status": JobStatus.FAILED,
+                    "finished_at": aware_utcnow(),
+                    "error": "Задача прервана: копия сервера, выполнявшая её, перестала отвечать. Запустите задачу снова",
+                }
+            },
+        )
+        return result.modified_count
+
+    async def set_progress(self, id: PydanticObjectId, progress: dict[str, Any]) -> None:
+        await Job.get_motor_collection().update_one(
+            {"_id": id, "status": JobStatus.RUNNING},
+            {"$set": {"progress": progress, "heartbeat_at": aware_utcnow()}},
+        )
+
+    async def heartbeat(self, id: PydanticObjectId) -> None:
+        await Job.get_motor_collection().update_one(
+            {"_id": id, "status": {"$in": [JobStatus.QUEUED, JobStatus.RUNNING]}},
+            {"$set": {"heartbeat_at": aware_utcnow()}},
+        )
+
+    async def finish(self, id: PydanticObjectId, result: dict[str, Any]) -> None:
+        await Job.get_motor_collection().update_one(
+            {"_id": id},
+            {"$set": {"status": JobStatus.SUCCEEDED, "finished_at": aware_utcnow(), "result": result}},
+        )
+
+    async def fail(self, id: PydanticObjectId, error: str) -> None:
+        await Job.get_motor_collection().update_one(
+            {"_id": id},
+            {"$set": {"status": JobStatus.FAILED, "finished_at": aware_utcnow(), "error": error}},
+        )
+
+
+job_repository: JobRepository = JobRepository()
@@ -0,0 +1,33 @@
+__all__ = ["router"]
+
+from beanie import PydanticObjectId
+from fastapi import APIRouter
+
+from src.api.dependencies import UserDep
+from src.exceptions import ObjectNotFound, NotEnoughPermissionsException, UnauthorizedException
+from src.modules.jobs.repository import job_repository
+from src.storages.mongo.models.job import Job
+from src.storages.mongo.schemas import UserRole
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+@router.get(
+    "/{job_id}",
+    responses={
+        200: {"description": "Состояние задачи"},
+        **ObjectNotFound.responses,
+        **NotEnoughPermissionsException.responses,
+        **UnauthorizedException.responses,
+    },
+)
+async def get_job(job_id: PydanticObjectId, user: UserDep) -> Job:
+    """
+    Получить состояние фоновой задачи (очередь, выполнение, прогресс, результат или ошибка)
+    """
+    job = await job_repository.read(job_id)
+    if job is None:
+        raise ObjectNotFound("Задача не найдена")
+    if user.role != UserRole.ADMIN and job.created_by != user.id:
+        raise NotEnoughPermissionsException("У вас нет доступа к этой задаче")
+    return job
@@ -0,0 +1,162 @@
+__all__ = ["JobRunner", "job_runner", "JobWork", "JOB_FILES_DIRECTORY"]
+
+import asyncio
+import json
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from beanie import PydanticObjectId
+from bson.errors import InvalidId
+from pydantic import BaseModel
+
+from src.logging_ import logger
+from src.modules.jobs.repository import job_repository
+from src.modules.metrics.repository import metrics_repository
+from src.storages.mongo.models.job import Job, JobKind, JobStatus
+
+QUEUE_POLL_INTERVAL = 5  # seconds, how often a queued job checks whether it may start
+HEARTBEAT_INTERVAL = 30  # seconds, should be much less than `STALE_AFTER`
+SWEEP_INTERVAL = 60  # seconds, how often stale jobs are failed and files of finished jobs are removed
+TERMINATE_TIMEOUT = 10  # seconds, then the job process is killed
+
+JOB_FILES_DIRECTORY = Path(tempfile.gettempdir()) / "jobs"
+"Input files of jobs (e.g. uploaded dumps), named by job id and removed when the job is finished"
+
+JobWork = Callable[..., Awaitable[BaseModel]]
+"""
+Module-level coroutine function doing the job: receives progress callback and JSON-serializable arguments given to
+`submit`, returns result. It runs in a separate process (see `src.modules.jobs.process`).
+"""
+
+
+class JobRunner:
+    """
+    Runs jobs in child processes, so CPU-bound work does not block request handling of the worker, independently of
+    the request that submitted them. Jobs of one kind run one at a time in the whole deployment: a job waits in the
+    queue until the running one finishes (enforced by the unique index on running jobs).
+
+    Queued and running jobs report heartbeats; jobs of dead workers are failed by the periodic sweep of any worker.
+    """
+
+    _tasks: dict[PydanticObjectId, asyncio.Task]
+
+    def __init__(self):
+        self._tasks = {}
+
+    def file_path(self, id: PydanticObjectId) -> Path:
+        """
+        Path for the input file of the job, it is removed when the job is finished in any way.
+        """
+        JOB_FILES_DIRECTORY.mkdir(parents=True, exist_ok=True)
+        return JOB_FILES_DIRECTORY / str(id)
+
+    def submit(self, job: Job, work: JobWork, *args: Any) -> None:
+        """
+        Run `work(on_progress, *args)` for the queued `job` in a child process.
+        """
+        task = asyncio.create_task(self._run(job.id, job.kind, work, args), name=f"job-{job.id}")
+        self._tasks[job.id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.id, None))
+
+    async def _run(self, id: PydanticObjectId, kind: JobKind, work: JobWork, args: tuple[Any, ...]) -> None:
+        process = None
+        try:
+            while await job_repository.try_start(id) is None:
+                job = await job_repository.read(id)
+                if job is None or job.status != JobStatus.QUEUED:
+                    return
+                await job_repository.heartbeat(id)
+                await asyncio.sleep(QUEUE_POLL_INTERVAL)
+
+            process = await asyncio.create_subprocess_exec(
+                sys.executable,
+                "-m",
+                "src.modules.jobs.process",
+                str(id),
+                f"{work.__module__}:{work.__qualname__}",
+                json.dumps(args),
+            )
+            heartbeat = asyncio.create_task(self._heartbeat(id))
+            try:
+                returncode = await process.wait()
+            finally:
+                heartbeat.cancel()
+            # the process reports result or error itself, unless it has crashed
+            if returncode != 0:
+                await job_repository.fail(id, f"Процесс задачи завершился с кодом {returncode}")
+        except asyncio.CancelledError:
+            if process is not None and process.returncode is None:
+                await self._terminate(process)
+            await job_repository.fail(id, "Задача прервана остановкой сервера")
+            raise
+        except Exception as e:
+            logger.exception(f"Job {id} ({kind}) failed")
+            await job_repository.fail(id, f"{type(e).__name__}: {e}")
+        finally:
+            self._remove_files(id)
+
+    async def _terminate(self, process: asyncio.subprocess.Process) -> None:
+        process.terminate()
+        try:
+            await asyncio.wait_for(process.wait(), TERMINATE_TIMEOUT)
+        except TimeoutError:
+            process.kill()
+
+    async def _heartbeat(self, id: PydanticObjectId) -> None:
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            await job_repository.heartbeat(id)
+
+    def _remove_files(self, id: PydanticObjectId) -> None:
+        (JOB_FILES_DIRECTORY / str(id)).unlink(missing_ok=True)
+
+    async def sweep(self) -> None:
+        """
+        Fail stale jobs (their worker is dead) and remove files left by jobs that are not active anymore.
+        """
+        if failed := await job_repository.fail_stale():
+            logger.warning(f"Failed {failed} stale jobs")
+        if not JOB_FILES_DIRECTORY.exists():
+            return
+        ids = []
+        for path in JOB_FILES_DIRECTORY.iterdir():
+            try:
+                ids.append(PydanticObjectId(path.name))
+            except InvalidId:
+                continue
+        if not ids:
+            return
+        active = await job_repository.read_active_ids(ids)
+        for id in ids:
+            if id not in active:
+                logger.info(f"Removing file of finished job {id}")
+                self._remove_files(id)
+
+    async def sweep_forever(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Failed to sweep jobs: {e}")
+            await asyncio.sleep(SWEEP_INTERVAL)
+
+    async def shutdown(self) -> None:
+        """
+        Cancel jobs of this worker (job processes are terminated), they are marked as failed (imports are idempotent
+        and may be submitted again).
+        """
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict[str, Any]:
+        return {"active": len(self._tasks)}
+
+
+job_runner: JobRunner = JobRunner()
+metrics_repository.register("jobs", job_runner.stats)
@@ -0,0 +1,19 @@
+__all__ = ["MetricsRepository", "metrics_repository"]
+
+from typing import Any, Callable
+
+
+class MetricsRepository:
+    _sources: dict[str, Callable[[], dict[str, Any]]]
+
+    def __init__(self):
+        self._sources = {}
+
+    def register(self, name: str, source: Callable[[], dict[str, Any]]) -> None:
+        self._sources[name] = source
+
+    def collect(self) -> dict[str, dict[str, Any]]:
+        return {name: source() for name, source in self._sources.items()}
+
+
+metrics_repository: MetricsRepository = MetricsRepository()
@@ -0,0 +1,30 @@
+"""
+Модуль для получения внутренних метрик приложения (кэши, пулы и т.д.).
+"""
+
+__all__ = ["router"]
+
+from typing import Any
+
+from fastapi import APIRouter
+
+from src.api.dependencies import ModeratorDep
+from src.exceptions import NotEnoughPermissionsException, UnauthorizedException
+from src.modules.metrics.repository import metrics_repository
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@router.get(
+    "/",
+    responses={
+        200: {"description": "Метрики текущего процесса"},
+        **NotEnoughPermissionsException.responses,
+        **UnauthorizedException.responses,
+    },
+)
+async def get_metrics(_moder: ModeratorDep) -> dict[str, dict[str, Any]]:
+    """
+    Получить метрики текущего процесса (счётчики кэшей, пулов и т.д.)
+    """
+    return metrics_repository.collect()
@@ -0,0 +1,206 @@
+__all__ = ["DirectorySnapshot", "OrganizationDirectory", "organization_directory", "ChangeListener", "RatingListener"]
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+from zlib import crc32
+
+from beanie import PydanticObjectId
+from pymongo import ReturnDocument
+
+from src.api.etag import make_etag
+from src.logging_ import logger
+from src.modules.metrics.repository import metrics_repository
+from src.modules.organization.schemas import CompactOrganization
+from src.storages.mongo.models.collection_version import CollectionVersion
+from src.storages.mongo.models.organization import Organization
+from src.storages.mongo.raw import RawORJSONResponse, find_raw
+
+DIRECTORY_VERSION_ID = "organizations"
+RATINGS_VERSION_ID = "organization_ratings"
+RATING_CHANGES_KEPT = 1000  # ids of recently rated organizations, a worker lagging behind re-reads all ratings
+POLL_INTERVAL = 2  # seconds, changes made by other workers are picked up with this delay
+
+ChangeListener = Callable[[list[PydanticObjectId], int, int], Awaitable[None]]
+"Called with (changed ids, previous version, new version) after writes made by this worker"
+
+RatingListener = Callable[[dict[PydanticObjectId, dict[str, Any] | None]], Awaitable[None]]
+"Called with new ratings (stored `rating` subdocuments) of organizations after they are applied to the snapshot"
+
+
+@dataclass(frozen=True)
+class DirectorySnapshot:
+    version: int
+    "Версия коллекции организаций, из которой построен снимок"
+    items: list[dict[str, Any]]
+    "Компактные организации (не изменять)"
+    body: bytes
+    "Сериализованный JSON список компактных организаций"
+    etag: str
+    "ETag ответа"
+    built_at: float
+    "Время построения (time.time())"
+    ratings_version: int = 0
+    "Версия изменений рейтингов, учтённых в снимке"
+
+
+class OrganizationDirectory:
+    """
+    Immutable in-memory snapshot of the compact organization list with pre-serialized body. The snapshot is replaced
+    atomically after writes (`invalidate`) and refreshed in every worker by polling version of the collection.
+
+    Ratings change with every review, so they do not bump the version (which rebuilds snapshots and derived indexes
+    in all workers): ids of rated organizations are published separately (`ratings_changed`), and every worker
+    patches ratings of those organizations in its snapshot and notifies rating listeners.
+    """
+
+    snapshot: DirectorySnapshot | None
+    rebuilds: int
+    rating_updates: int
+    _lock: asyncio.Lock
+    _listeners: list[ChangeListener]
+    _rating_listeners: list[RatingListener]
+
+    def __init__(self):
+        self.snapshot = None
+        self.rebuilds = 0
+        self.rating_updates = 0
+        self._lock = asyncio.Lock()
+        self._listeners = []
+        self._rating_listeners = []
+
+    def subscribe(self, listener: ChangeListener) -> None:
+        """
+        Subscribe to writes made by this worker, e.g. for incremental update of derived indexes.
+        """
+        self._listeners.append(listener)
+
+    def subscribe_ratings(self, listener: RatingListener) -> None:
+        """
+        Subscribe to rating changes made by any worker (the snapshot is already patched when listeners are called).
+        """
+        self._rating_listeners.append(listener)
+
+    async def get(self) -> DirectorySnapshot:
+        snapshot = self.snapshot
+        if snapshot is None:
+            return await self.refresh()
+        return snapshot
+
+    async def invalidate(self, ids: list[PydanticObjectId]) -> None:
+        """
+        Mark collection as changed for all workers and rebuild snapshot in this worker. Call it after every write that
+        changes fields of `CompactOrganization` (or indexed fields), `ids` are ids of changed organizations.
+        """
+        updated = await CollectionVersion.get_motor_collection().find_one_and_update(
+            {"_id": DIRECTORY_VERSION_ID}, {"$inc": {"version": 1}}, upsert=True, return_document=ReturnDocument.AFTER
+        )
+        version = updated["version"]
+        await self.refresh()
+        for listener in self._listeners:
+            await listener(ids, version - 1, version)
+
+    async def refresh(self) -> DirectorySnapshot:
+        """
+        Rebuild snapshot if version of the collection has changed.
+        """
+        async with self._lock:
+            version = await self._read_version()
+            snapshot = self.snapshot
+            if snapshot is not None and snapshot.version == version:
+                return snapshot
+            # versions are read before the data, so the snapshot may only be newer than its versions
+            ratings_version, _ = await self._read_rating_changes()
+            items = await find_raw(Organization, model=CompactOrganization)
+            snapshot = self._make_snapshot(version, items, ratings_version)
+            self.snapshot = snapshot
+            self.rebuilds += 1
+            return snapshot
+
+    def _make_snapshot(self, version: int, items: list[dict[str, Any]], ratings_version: int) -> DirectorySnapshot:
+        body = RawORJSONResponse(items).body
+        return DirectorySnapshot(
+            version=version,
+            items=items,
+            body=body,
+            etag=make_etag(DIRECTORY_VERSION_ID, version, f"{crc32(body):08x}"),
+            built_at=time.time(),
+            ratings_version=ratings_version,
+        )
+
+    async def ratings_changed(self, ids: list[PydanticObjectId]) -> None:
+        """
+        Publish rating changes of organizations to all workers and apply them in this worker. Call it instead of
+        `invalidate` after writes that change only `rating`.
+        """
+        if not ids:
+            return
+        # version counts published ids, so a worker knows how many last ids it has not applied yet
+        await CollectionVersion.get_motor_collection().update_one(
+            {"_id": RATINGS_VERSION_ID},
+            {"$inc": {"version": len(ids)}, "$push": {"changed": {"$each": ids, "$slice": -RATING_CHANGES_KEPT}}},
+            upsert=True,
+        )
+        await self.sync_ratings()
+
+    async def sync_ratings(self) -> None:
+        """
+        Patch ratings published since the snapshot was built or last patched. Stored ratings are re-read, so the
+        order in which workers publish changes does not matter.
+        """
+        async with self._lock:
+            snapshot = self.snapshot
+            if snapshot is None:
+                return
+            ratings_version, changed = await self._read_rating_changes()
+            behind = ratings_version - snapshot.ratings_version
+            if behind == 0:
+                return
+            # all ratings if too far behind
+            filter_ = {"_id": {"$in": changed[-behind:]}} if 0 < behind <= len(changed) else {}
+            cursor = Organization.get_motor_collection().find(filter_, projection={"rating": 1})
+            ratings = {raw["_id"]: raw.get("rating") async for raw in cursor}
+            items = [
+                {**item, "rating": ratings[item["id"]]} if item["id"] in ratings else item for item in snapshot.items
+            ]
+            self.snapshot = self._make_snapshot(snapshot.version, items, ratings_version)
+            self.rating_updates += 1
+        for listener in self._rating_listeners:
+            await listener(ratings)
+
+    async def poll_forever(self) -> None:
+        while True:
+            await asyncio.sleep(POLL_INTERVAL)
+            try:
+                await self.refresh()
+                await self.sync_ratings()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Failed to refresh organization directory: {e}")
+
+    async def _read_version(self) -> int:
+        raw = await CollectionVersion.get_motor_collection().find_one({"_id": DIRECTORY_VERSION_ID})
+        return raw["version"] if raw is not None else 0
+
+    async def _read_rating_changes(self) -> tuple[int, list[PydanticObjectId]]:
+        raw = await CollectionVersion.get_motor_collection().find_one({"_id": RATINGS_VERSION_ID})
+        return (raw["version"], raw.get("changed", [])) if raw is not None else (0, [])
+
+    def stats(self) -> dict[str, Any]:
+        snapshot = self.snapshot
+        if snapshot is None:
+            return {"version": None, "rebuilds": self.rebuilds, "rating_updates": self.rating_updates}
+        return {
+            "version": snapshot.version,
+            "items": len(snapshot.items),
+            "size": len(snapshot.body),
+            "age": time.time() - snapshot.built_at,
+            "rebuilds": self.rebuilds,
+            "rating_updates": self.rating_updates,
+        }
+
+
+organization_directory: OrganizationDirectory = OrganizationDirectory()
+metrics_repository.register("organization_directory", organization_directory.stats)
@@ -0,0 +1,235 @@
+"""
+Faceted filtering of organizations with precomputed bitmaps (Python ints, bit `i` is organization in slot `i`).
+"""
+
+__all__ = ["FACET_FIELDS", "OrganizationFacets", "organization_facets"]
+
+import asyncio
+from typing import Any, cast
+
+from beanie import PydanticObjectId
+
+from src.modules.educational_program.repository import educational_program_repository
+from src.modules.metrics.repository import metrics_repository
+from src.modules.organization.directory import organization_directory
+from src.modules.organization.schemas import CompactOrganization, FacetedResults, FacetValue, CatalogSort, RatingSchema
+from src.storages.mongo.models.organization import Organization
+from src.storages.mongo.raw import find_raw
+
+ORGANIZATION_FACETS = ("federal_district_name", "region_name")
+PROGRAM_FACETS = ("edu_level_name", "ugs_code", "qualification")
+FACET_FIELDS = ORGANIZATION_FACETS + PROGRAM_FACETS
+
+_PROJECTION = {"username": 1, "name": 1, "logo": 1, "rating": 1, **{name: 1 for name in ORGANIZATION_FACETS}}
+
+
+def _facet_values(raw: dict[str, Any], programs: list[dict[str, Any]]) -> dict[str, set[str]]:
+    values: dict[str, set[str]] = {}
+    for name in ORGANIZATION_FACETS:
+        values[name] = {raw[name]} if raw.get(name) else set()
+    for name in PROGRAM_FACETS:
+        values[name] = {program[name] for program in programs if program.get(name)}
+    return values
+
+
+class OrganizationFacets:
+    """
+    Bitmaps of organizations for each facet value. Writes of this worker are applied incrementally, changes made by
+    other workers (new version of the organization directory) lead to full rebuild. Rating changes of any worker are
+    patched in place.
+    """
+
+    version: int | None
+    _slots: dict[PydanticObjectId, int]
+    _compacts: list[CompactOrganization | None]
+    _values: list[dict[str, set[str]]]
+    _bitmaps: dict[str, dict[str, int]]
+    _alive: int
+    _orders: dict[CatalogSort, list[int]]
+    "slots in each order, computed on demand"
+    _lock: asyncio.Lock
+    rebuilds: int
+    incremental_updates: int
+
+    def __init__(self):
+        self.version = None
+        self._reset()
+        self._lock = asyncio.Lock()
+        self.rebuilds = 0
+        self.incremental_updates = 0
+        organization_directory.subscribe(self._on_change)
+        organization_directory.subscribe_ratings(self._on_ratings)
+
+    def _reset(self) -> None:
+        self._slots = {}
+        self._compacts = []
+        self._values = []
+        self._bitmaps = {name: {} for name in FACET_FIELDS}
+        self._alive = 0
+        self._orders = {}
+
+    async def refresh(self) -> None:
+        version = (await organization_directory.get()).version
+        if self.version == version:
+            return
+        async with self._lock:
+            if self.version == version:
+                return
+            raws = await find_raw(Organization, projection=_PROJECTION)
+            programs = await educational_program_repository.read_fields_by_organization(list(PROGRAM_FACETS))
+            self._reset()
+            for raw in raws:
+                self._upsert(raw, programs.get(raw["id"], []))
+            self.version = version
+            self.rebuilds += 1
+
+    async def _on_change(self, ids: list[PydanticObjectId], previous_version: int, version: int) -> None:
+        async with self._lock:
+            if self.version != previous_version:
+                # index is stale anyway, it will be rebuilt on the next query
+                return
+            raws = {
+                raw["id"]: raw for raw in await find_raw(Organization, {"_id": {"$in": ids}}, projection=_PROJECTION)
+            }
+            programs = await educational_program_repository.read_fields_by_organization(list(PROGRAM_FACETS), ids)
+            for id in ids:
+                if id in raws:
+                    self._upsert(raws[id], programs.get(id, []))
+                else:
+                    self._remove(id)
+            self.version = version
+            self.incremental_updates += 1
+
+    async def _on_ratings(self, ratings: dict[PydanticObjectId, dict[str, Any] | None]) -> None:
+        # the lock makes it wait for a rebuild in progress, which may have read older ratings
+        async with self._lock:
+            for id, rating in ratings.items():
+                slot = self._slots.get(id)
+                if slot is None:
+                    continue
+                compact = cast(CompactOrganization, self._compacts[slot])
+                self._compacts[slot] = compact.model_copy(
+                    update={"rating": RatingSchema.model_validate(rating) if rating is not None else None}
+                )
+            self._orders.pop(CatalogSort.RATING, None)
+
+    def _upsert(self, raw: dict[str, Any], programs: list[dict[str, Any]]) -> None:
+        id = raw["id"]
+        slot = self._slots.get(id)
+        if slot is None:
+            slot = len(self._compacts)
+            self._slots[id] = slot
+            self._compacts.append(None)
+            self._values.append({})
+        else:
+            self._clear_bits(slot)
+        compact = {name: raw.get(name) for name in CompactOrganization.model_fields if name != "id"}
+        self._compacts[slot] = CompactOrganization.model_validate({"_id": id, **compact})
+        self._values[slot] = values = _facet_values(raw, programs)
+        bit = 1 << slot
+        for name, facet_values in values.items():
+            bitmaps = self._bitmaps[name]
+            for value in facet_values:
+                bitmaps[value] = bitmaps.get(value, 0) | bit
+        self._alive |= bit
+        self._orders = {}
+
+    def _remove(self, id: PydanticObjectId) -> None:
+        slot = self._slots.pop(id, None)
+        if slot is None:
+            return
+        self._clear_bits(slot)
+        self._compacts[slot] = None
+        self._values[slot] = {}
+        self._alive &= ~(1 << slot)
+        self._orders = {}
+
+    def _clear_bits(self, slot: int) -> None:
+        mask = ~(1 << slot)
+        for name, facet_values in self._values[slot].items():
+            bitmaps = self._bitmaps[name]
+            for value in facet_values:
+                bitmap = bitmaps[value] & mask
+                if bitmap:
+                    bitmaps[value] = bitmap
+                else:
+                    del bitmaps[value]
+
+    def _filter_bitmap(self, filters: dict[str, list[str]], exclude: str | None = None) -> int:
+        """
+        Organizations matching all facets (values of one facet are combined with OR), except `exclude` facet.
+        """
+        result = self._alive
+        for name, values in filters.items():
+            if name == exclude or not values:
+                continue
+            bitmaps = self._bitmaps[name]
+            any_of = 0
+            for value in values:
+                any_of |= bitmaps.get(value, 0)
+            result &= any_of
+        return result
+
+    def _order(self, sort: CatalogSort) -> list[int]:
+        order = self._orders.get(sort)
+        if order is None:
+            compacts = cast(list[CompactOrganization], self._compacts)
+            if sort == CatalogSort.RATING:
+                # organizations without reviews go last
+                def key(slot: int) -> tuple:
+                    rating = compacts[slot].rating
+                    if rating is None or rating.average is None:
+                        return True, 0.0, 0, compacts[slot].name
+                    return False, -rating.average, -rating.count, compacts[slot].name
+
+                order = sorted(self._slots.values(), key=key)
+            else:
+                order = sorted(self._slots.values(), key=lambda slot: compacts[slot].name)
+            self._orders[sort] = order
+        return order
+
+    async def query(
+        self, filters: dict[str, list[str]], limit: int, offset: int = 0, sort: CatalogSort = CatalogSort.NAME
+    ) -> FacetedResults:
+        await self.refresh()
+        matching = self._filter_bitmap(filters)
+
+        # disjunctive counts: for each facet, filters of other facets are applied
+        facets: dict[str, list[FacetValue]] = {}
+        for name in FACET_FIELDS:
+            base = self._filter_bitmap(filters, exclude=name) if filters.get(name) else matching
+            counts = [(value, (bitmap & base).bit_count()) for value, bitmap in self._bitmaps[name].items()]
+            selected = set(filters.get(name) or [])
+            facets[name] = [
+                FacetValue(value=value, count=count)
+                for value, count in sorted(counts, key=lambda item: (-item[1], item[0]))
+                if count > 0 or value in selected
+            ]
+
+        # bits of matching organizations as a string, least significant bit first
+        bits = bin(matching)[:1:-1]
+        items = []
+        skipped = 0
+        for slot in self._order(sort):
+            if slot < len(bits) and bits[slot] == "1":
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                items.append(self._compacts[slot])
+                if len(items) == limit:
+                    break
+        return FacetedResults(items=items, total=matching.bit_count(), facets=facets)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "version": self.version,
+            "organizations": self._alive.bit_count(),
+            "slots": len(self._compacts),
+            "values": {name: len(bitmaps) for name, bitmaps in self._bitmaps.items()},
+            "rebuilds": self.rebuilds,
+            "incremental_updates": self.incremental_updates,
+        }
+
+
+organization_facets: OrganizationFacets = OrganizationFacets()
+metrics_repository.register("organization_facets", organization_facets.stats)
@@ -0,0 +1,352 @@
+"""
+Streaming import of organizations from the registry dump (result of `scripts/parse_organizations.py`).
+"""
+
+__all__ = [
+    "ImportMode",
+    "ImportDiff",
+    "ImportReport",
+    "BatchProgress",
+    "OrganizationImporter",
+    "organization_importer",
+    "certificate_to_organization",
+    "registry_hash",
+    "IMPORT_BATCH_SIZE",
+]
+
+import hashlib
+import time
+from enum import StrEnum
+from typing import Any, AsyncIterable, Awaitable, Callable, Iterable
+
+import orjson
+from beanie import PydanticObjectId
+from beanie.odm.utils.dump import get_dict
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from scripts.parse_organizations import CertificateOut
+from src.custom_pydantic import CustomModel
+from src.logging_ import logger
+from src.modules.educational_program.repository import educational_program_repository
+from src.modules.organization.directory import organization_directory
+from src.modules.organization.repository import organization_repository
+from src.modules.organization.schemas import CreateOrganization
+from src.storages.mongo.models.educational_program import EducationalProgramSchema
+from src.storages.mongo.models.organization import Organization, ContactsSchema
+
+IMPORT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+MAX_DIFF_ENTRIES = 1000
+
+REGISTRY_FIELDS = ("in_registry_id", "name", "full_name", "contacts", "region_name", "federal_district_name")
+"Fields owned by the registry: overwritten by re-sync, other fields (username, logo, scenes...) are kept"
+
+
+def certificate_to_organization(certificate: CertificateOut) -> CreateOrganization | None:
+    """
+    Map certificate from the registry to organization, None if there is no actual organization in the certificate.
+    """
+    actual = certificate.actual_education_organization
+    if actual is None:
+        return None
+    return CreateOrganization(
+        logo=certificate.logo,
+        in_registry_id=certificate.in_registry_id,
+        username=certificate.in_registry_id,
+        name=actual.short_name or actual.full_name,
+        full_name=actual.full_name,
+        contacts=ContactsSchema(
+            email=actual.email,
+            phone=actual.phone,
+            website=actual.website,
+            fax=actual.fax,
+            post_address=actual.post_address,
+            inn=actual.inn,
+            kpp=actual.kpp,
+            ogrn=actual.ogrn,
+        ),
+        region_name=certificate.region_name,
+        federal_district_name=certificate.federal_district_name,
+        educational_programs=[
+            EducationalProgramSchema(
+                in_registry_id=program.in_registry_id,
+                edu_level_name=program.edu_level_name,
+                program_name=program.program_name,
+                program_code=program.program_code,
+                ugs_name=program.ugs_name,
+                ugs_code=program.ugs_code,
+                edu_normative_period=program.edu_normative_period,
+                qualification=program.qualification,
+            )
+            for program in certificate.educational_programs
+        ],
+    )
+
+
+def registry_hash(organization: CreateOrganization) -> str:
+    """
+    Stable hash of the registry data of the organization (registry fields and educational programs).
+    """
+    data = organization.model_dump(mode="json", include={*REGISTRY_FIELDS, "educational_programs"})
+    return hashlib.blake2b(orjson.dumps(data, option=orjson.OPT_SORT_KEYS), digest_size=16).hexdigest()
+
+
+class ImportMode(StrEnum):
+    CREATE = "create"
+    "Only add organizations missing in the database"
+    RESYNC = "resync"
+    "Also update organizations whose registry data has changed and report ones missing in the dump"
+
+
+class BatchProgress(CustomModel):
+    batch: int
+    "Номер пачки (с 1)"
+    processed: int
+    "Обработано сертификатов всего"
+    created: int
+    "Создано организаций всего"
+    changed: int = 0
+    "Обновлено организаций (изменились данные в реестре) всего"
+    skipped: int
+    "Пропущено (уже существуют и не изменились или нет актуальной организации) всего"
+    failed: int
+    "Ошибок всего"
+    revoked: int = 0
+    "Организаций, отсутствующих в реестре (только при пересинхронизации, не удаляются)"
+    elapsed: float
+    "Прошло времени, секунд"
+    throughput: float
+    "Сертификатов в секунду"
+
+
+class ImportDiff(CustomModel):
+    added: list[str] = []
+    "Идентификаторы в реестре добавленных организаций (первые 1000)"
+    changed: list[str] = []
+    "Идентификаторы в реестре обновлённых организаций (первые 1000)"
+    revoked: list[str] = []
+    "Идентификаторы в реестре организаций, отсутствующих в дампе (первые 1000)"
+
+
+class ImportReport(BatchProgress):
+    mode: ImportMode = ImportMode.CREATE
+    "Режим импорта"
+    errors: list[str] = []
+    "Описания ошибок (первые 100)"
+    diff: ImportDiff = ImportDiff()
+    "Изменения относительно базы данных"
+
+
+ProgressCallback = Callable[[BatchProgress], Awaitable[None]]
+CertificateItem = CertificateOut | dict[str, Any]
+"Validated certificate or raw one from the stream (validated by the importer)"
+
+
+def _registry_id(item: CertificateItem) -> str:
+    if isinstance(item, CertificateOut):
+        return item.in_registry_id
+    return str(item.get("in_registry_id")) if isinstance(item, dict) else repr(item)[:100]
+
+
+def _describe(e: ValidationError) -> str:
+    error = e.errors()[0]
+    location = ".".join(map(str, error["loc"]))
+    return f"{location}: {error['msg']}" if location else error["msg"]
+
+
+def _append_capped(entries: list[str], entry: str) -> None:
+    if len(entries) < MAX_DIFF_ENTRIES:
+        entries.append(entry)
+
+
+class OrganizationImporter:
+    """
+    Certificates are processed in fixed-size batches: organizations that already exist (by `in_registry_id` or
+    `username`) are found with one indexed query, the rest is upserted with one unordered `bulk_write`.
+    Re-running on the same dump costs only the existence queries.
+
+    In re-sync mode stored `registry_hash` of existing organizations is compared with hash of the incoming data, and
+    only organizations whose registry data has changed are updated (in the same `bulk_write`).
+    """
+
+    async def run(
+        self,
+        certificates: Iterable[CertificateItem] | AsyncIterable[CertificateItem],
+        batch_size: int = IMPORT_BATCH_SIZE,
+        on_progress: ProgressCallback | None = None,
+        mode: ImportMode = ImportMode.CREATE,
+    ) -> ImportReport:
+        report = ImportReport(
+            batch=0, processed=0, created=0, skipped=0, failed=0, elapsed=0.0, throughput=0.0, mode=mode
+        )
+        written_ids: list[PydanticObjectId] = []
+        # registry ids present in the dump, to find revoked organizations
+        seen: set[str] | None = set() if mode == ImportMode.RESYNC else None
+        start = time.perf_counter()
+
+        async def flush(batch: list[CertificateItem]) -> None:
+            written_ids.extend(await self._import_batch(batch, report, seen))
+            report.batch += 1
+            report.processed += len(batch)
+            report.elapsed = time.perf_counter() - start
+            report.throughput = report.processed / report.elapsed if report.elapsed else 0.0
+            logger.info(
+                f"Import batch {report.batch}: processed={report.processed} created={report.created} "
+                f"changed={report.changed} skipped={report.skipped} failed={report.failed} "
+                f"({report.throughput:.0f} certificates/s)"
+            )
+            if on_progress is not None:
+                await on_progress(
+                    BatchProgress.model_validate(report.model_dump(include=set(BatchProgress.model_fields)))
+                )
+            batch.clear()
+
+        batch: list[CertificateItem] = []
+        if isinstance(certificates, AsyncIterable):
+            async for certificate in certificates:
+                batch.append(certificate)
+                if len(batch) >= batch_size:
+                    await flush(batch)
+        else:
+            for certificate in certificates:
+                batch.append(certificate)
+                if len(batch) >= batch_size:
+                    await flush(batch)
+        if batch:
+            await flush(batch)
+
+        if seen is not None:
+            await self._find_revoked(seen, report)
+        if written_ids:
+            await organization_directory.invalidate(written_ids)
+        report.elapsed = time.perf_counter() - start
+        return report
+
+    async def _import_batch(
+        self, batch: list[CertificateItem], report: ImportReport, seen: set[str] | None
+    ) -> list[PydanticObjectId]:
+        organizations: dict[str, CreateOrganization] = {}
+        for item in batch:
+            try:
+                certificate = item if isinstance(item, CertificateOut) else CertificateOut.model_validate(item)
+                organization = certificate_to_organization(certificate)
+            except ValidationError as e:
+                if seen is not None and isinstance(item, dict) and isinstance(item.get("in_registry_id"), str):
+                    # do not report organization as revoked because of invalid certificate
+                    seen.add(item["in_registry_id"])
+                self._fail(report, f"{_registry_id(item)}: {_describe(e)}")
+                continue
+            if seen is not None:
+                seen.add(certificate.in_registry_id)
+            if organization is None or certificate.in_registry_id in organizations:
+                report.skipped += 1
+                continue
+            organizations[certificate.in_registry_id] = organization
+
+        hashes = {registry_id: registry_hash(organization) for registry_id, organization in organizations.items()}
+        collection = Organization.get_motor_collection()
+        registry_ids = list(organizations)
+        existing = collection.find(
+            {"$or": [{"in_registry_id": {"$in": registry_ids}}, {"username": {"$in": registry_ids}}]},
+            projection={"_id": 1, "in_registry_id": 1, "username": 1, "registry_hash": 1},
+        )
+        changes: list[tuple[PydanticObjectId, CreateOrganization]] = []
+        async for raw in existing:
+            registry_id = raw.get("in_registry_id")
+            if seen is not None and registry_id in organizations:
+                organization = organizations.pop(registry_id)
+                if raw.get("registry_hash") == hashes[registry_id]:
+                    report.skipped += 1
+                else:
+                    changes.append((raw["_id"], organization))
+            for key in (registry_id, raw.get("username")):
+                if organizations.pop(key, None) is not None:
+                    report.skipped += 1
+        if not organizations and not changes:
+            return []
+
+        new = list(organizations.values())
+        operations = []
+        for organization in new:
+            document = self._document(organization)
+            document["registry_hash"] = hashes[organization.in_registry_id]  # type: ignore[index]
+            # upsert keeps the import idempotent even if the same organization is imported concurrently
+            operations.append(
+                UpdateOne({"in_registry_id": organization.in_registry_id}, {"$setOnInsert": document}, upsert=True)
+            )
+        for id, organization in changes:
+            document = self._document(organization)
+            update: dict[str, Any] = {
+                "$set": {
+                    **{name: document[name] for name in REGISTRY_FIELDS if document.get(name) is not None},
+                    "registry_hash": hashes[organization.in_registry_id],  # type: ignore[index]
+                },
+                "$inc": {"version": 1},
+            }
+            if unset := {name: "" for name in REGISTRY_FIELDS if document.get(name) is None}:
+                update["$unset"] = unset
+            operations.append(UpdateOne({"_id": id}, update))
+
+        failed_operations: set[int] = set()
+        try:
+            result = await collection.bulk_write(operations, ordered=False)
+            upserted = result.upserted_ids
+        except BulkWriteError as e:
+            upserted = {item["index"]: item["_id"] for item in e.details.get("upserted", [])}
+            for write_error in e.details.get("writeErrors", []):
+                index = write_error["index"]
+                failed_operations.add(index)
+                organization = new[index] if index < len(new) else changes[index - len(new)][1]
+                self._fail(report, f"{organization.in_registry_id}: {write_error.get('errmsg')}")
+
+        created = {new[index].in_registry_id: id for index, id in upserted.items()}
+        updated = [
+            (id, organization)
+            for index, (id, organization) in enumerate(changes, start=len(new))
+            if index not in failed_operations
+        ]
+        # matched, but not upserted: created concurrently after the existence query
+        report.skipped += len(new) - len(created) - len(failed_operations & set(range(len(new))))
+        report.created += len(created)
+        report.changed += len(updated)
+        for registry_id in created:
+            _append_capped(report.diff.added, registry_id)  # type: ignore[arg-type]
+        for _, organization in updated:
+            _append_capped(report.diff.changed, organization.in_registry_id)  # type: ignore[arg-type]
+
+        await educational_program_repository.replace_for_organizations(
+            {id: new[index].educational_programs for index, id in upserted.items()}
+            | {id: organization.educational_programs for id, organization in updated}
+        )
+        organization_repository.forget_versions([id for id, _ in updated])
+        return list(upserted.values()) + [id for id, _ in updated]
+
+    def _document(self, organization: CreateOrganization) -> dict[str, Any]:
+        document = get_dict(
+            Organization.model_validate(organization, from_attributes=True), to_db=True, keep_nulls=False
+        )
+        document.pop("_id", None)
+        return document
+
+    async def _find_revoked(self, seen: set[str], report: ImportReport) -> None:
+        """
+        Organizations from the registry which are missing in the dump. They are only reported: organizations may have
+        scenes, reviews and users.
+        """
+        existing = Organization.get_motor_collection().find(
+            {"in_registry_id": {"$ne": None}}, projection={"_id": 0, "in_registry_id": 1}
+        )
+        async for raw in existing:
+            if raw["in_registry_id"] not in seen:
+                report.revoked += 1
+                _append_capped(report.diff.revoked, raw["in_registry_id"])
+
+    def _fail(self, report: ImportReport, error: str) -> None:
+        report.failed += 1
+        if len(report.errors) < MAX_REPORTED_ERRORS:
+            report.errors.append(error)
+
+
+organization_importer: OrganizationImporter = OrganizationImporter()
@@ -0,0 +1,20 @@
+"""
+Background jobs of organizations, run in job processes by `JobRunner`.
+"""
+
+__all__ = ["import_organizations", "repair_ratings"]
+
+from src.modules.organization.importer import ImportMode, ImportReport, ProgressCallback, organization_importer
+from src.modules.organization.repository import organization_repository
+from src.modules.organization.schemas import RatingRepairReport
+from src.modules.organization.stream import iter_certificates, read_file_chunks
+
+
+async def import_organizations(on_progress: ProgressCallback, path: str, ndjson: bool, mode: str) -> ImportReport:
+    return await organization_importer.run(
+        iter_certificates(read_file_chunks(path), ndjson=ndjson), on_progress=on_progress, mode=ImportMode(mode)
+    )
+
+
+async def repair_ratings(on_progress: ProgressCallback) -> RatingRepairReport:
+    return await organization_repository.repair_ratings()
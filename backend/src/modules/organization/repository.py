@@ -1,106 +1,277 @@
-__all__ = ["OrganizationRepository", "organization_repository", "parse_certificates_to_organizations"]
+__all__ = ["OrganizationRepository", "organization_repository"]
 
-from typing import cast
+from typing import cast, Any
 
 from beanie import PydanticObjectId
+from pydantic import BaseModel
+from pymongo import ReturnDocument, UpdateOne
 
-from scripts.parse_organizations import Certificates
-from src.modules.organization.schemas import CreateOrganization, UpdateOrganization, CompactOrganization
-from src.storages.mongo.models.organization import Organization, ContactsSchema, EducationalProgramSchema
-from src.storages.mongo.crud import crud_factory, CRUD
+from src.modules.educational_program.repository import educational_program_repository
+from src.modules.organization.directory import organization_directory, DirectorySnapshot
+from src.modules.organization.usernames import username_resolver
+from src.modules.organization.schemas import (
+    CreateOrganization,
+    UpdateOrganization,
+    CompactOrganization,
+    RatingRepairReport,
+)
+from src.storages.mongo.models.organization import Organization, RatingSchema
+from src.storages.mongo.models.review import Review
+from src.storages.mongo.crud import crud_factory, CRUD, Page, BatchItemResult, BatchUpdateItem
+from src.storages.mongo.raw import find_one_raw
 
 crud: CRUD[Organization, CreateOrganization, UpdateOrganization] = crud_factory(Organization)
 
+# fields of `CompactOrganization` and fields used in search, changes of other fields do not invalidate the directory
+DIRECTORY_FIELDS = frozenset(CompactOrganization.model_fields) - {"id"} | {
+    "full_name",
+    "region_name",
+    "educational_programs",
+}
+
+
+def _without_programs(data: UpdateOrganization) -> UpdateOrganization:
+    # programs are stored in a separate collection
+    if "educational_programs" not in data.model_fields_set:
+        return data
+    return UpdateOrganization.model_validate(data.model_dump(exclude_unset=True, exclude={"educational_programs"}))
+
+
+RATING_REPAIR_BATCH_SIZE = 500
+
+
+def _normalized_rating(raw: dict[str, Any] | None) -> RatingSchema:
+    rating = RatingSchema.model_validate(raw or {})
+    # histogram entries decremented to zero are equivalent to missing ones
+    rating.histogram = {rate: count for rate, count in rating.histogram.items() if count}
+    return rating
+
 
 # noinspection PyMethodMayBeStatic
 class OrganizationRepository:
     async def create(self, data: CreateOrganization) -> Organization:
-        return await crud.create(data)
+        created = await crud.create(data)
+        await educational_program_repository.replace_for_organizations({created.id: data.educational_programs})
+        await organization_directory.invalidate([created.id])
+        return created
 
-    async def read(self, id: PydanticObjectId) -> Organization | None:
-        return await crud.read(id)
+    async def read(
+        self, id: PydanticObjectId, *, projection_model: type[BaseModel] | None = None
+    ) -> Organization | None:
+        return cast(Organization | None, await crud.read(id, projection_model=projection_model))
 
-    async def read_all(self) -> list[CompactOrganization]:
-        compacts = await crud.read_all(projection_model=CompactOrganization)
+    async def read_all(self, *, projection_model: type[BaseModel] | None = None) -> list[CompactOrganization]:
+        compacts = await crud.read_all(projection_model=projection_model or CompactOrganization)
         return cast(list[CompactOrganization], compacts)
 
+    async def read_all_raw(self, *, projection_model: type[BaseModel] | None = None) -> list[dict[str, Any]]:
+        return await crud.read_all_raw(projection_model=projection_model or CompactOrganization)
+
+    async def read_all_snapshot(self) -> DirectorySnapshot:
+        return await organization_directory.get()
+
+    async def read_page(
+        self, limit: int, after: str | None = None, *, projection_model: type[BaseModel] | None = None
+    ) -> Page[CompactOrganization]:
+        page = await crud.read_page(
+            limit, after, sort_by="name", projection_model=projection_model or CompactOrganization
+        )
+        return cast(Page[CompactOrganization], page)
+
+    async def read_version(self, id: PydanticObjectId) -> int | None:
+        return await crud.read_version(id)
+
+    async def read_version_by_username(self, username: str) -> tuple[PydanticObjectId, int] | None:
+        id = await username_resolver.resolve(username)
+        if id is None:
+            return None
+        version = await crud.read_version(id)
+        if version is None:
+            return None
+        return id, version
+
     async def update(self, id: PydanticObjectId, data: UpdateOrganization) -> Organization | None:
-        return await crud.update(id, data)
+        updated = await crud.update(id, _without_programs(data))
+        if updated is not None and data.educational_programs is not None:
+            await educational_program_repository.replace_for_organizations({id: data.educational_programs})
+        if updated is not None and data.model_fields_set & DIRECTORY_FIELDS:
+            await organization_directory.invalidate([id])
+        return updated
+
+    async def set_registry_hash(self, id: PydanticObjectId, registry_hash: str) -> None:
+        # internal field, not part of responses, so the version is not bumped
+        await Organization.get_motor_collection().update_one({"_id": id}, {"$set": {"registry_hash": registry_hash}})
 
     async def delete(self, id: PydanticObjectId) -> bool:
-        return await crud.delete(id)
+        deleted = await crud.delete(id)
+        if deleted:
+            await educational_program_repository.delete_for_organizations([id])
+            await organization_directory.invalidate([id])
+        return deleted
+
+    async def read_many(self, ids: list[PydanticObjectId]) -> list[Organization | None]:
+        mapping = await crud.read_many(ids)
+        return [mapping[id] for id in ids]
+
+    async def bulk_create(self, data: list[CreateOrganization]) -> list[BatchItemResult]:
+        results = await crud.bulk_create(data)
+        programs = {
+            result.id: item.educational_programs for item, result in zip(data, results) if result.ok and result.id
+        }
+        await educational_program_repository.replace_for_organizations(programs)
+        if programs:
+            await organization_directory.invalidate(list(programs))
+        return results
+
+    async def bulk_update(self, items: list[BatchUpdateItem[UpdateOrganization]]) -> list[BatchItemResult]:
+        results = await crud.bulk_update(
+            [BatchUpdateItem[UpdateOrganization](id=item.id, data=_without_programs(item.data)) for item in items]
+        )
+        programs = {
+            item.id: item.data.educational_programs
+            for item, result in zip(items, results)
+            if result.ok and item.data.educational_programs is not None
+        }
+        await educational_program_repository.replace_for_organizations(programs)
+        changed = [
+            item.id
+            for item, result in zip(items, results)
+            if result.ok and item.data.model_fields_set & DIRECTORY_FIELDS
+        ]
+        if changed:
+            await organization_directory.invalidate(changed)
+        return results
+
+    async def bulk_delete(self, ids: list[PydanticObjectId]) -> list[BatchItemResult]:
+        results = await crud.bulk_delete(ids)
+        deleted = [result.id for result in results if result.ok and result.id]
+        if deleted:
+            await educational_program_repository.delete_for_organizations(deleted)
+            await organization_directory.invalidate(deleted)
+        return results
+
+    async def any_exist(self) -> bool:
+        return await Organization.get_motor_collection().find_one({}, projection={"_id": 1}) is not None
 
     async def read_by_username(self, username: str) -> Organization | None:
-        return await Organization.find_one({"username": username})
+        id = await username_resolver.resolve(username)
+        if id is None:
+            return None
+        # username is checked as well, cached id may be stale for up to the directory polling interval
+        organization = await Organization.find_one({"_id": id, "username": username})
+        if organization is None:
+            username_resolver.forget(username)
+            return await Organization.find_one({"username": username})
+        return organization
+
+    async def read_by_username_raw(self, username: str) -> dict[str, Any] | None:
+        id = await username_resolver.resolve(username)
+        if id is None:
+            return None
+        raw = await find_one_raw(Organization, {"_id": id, "username": username})
+        if raw is None:
+            username_resolver.forget(username)
+            return await find_one_raw(Organization, {"username": username})
+        return raw
 
     async def read_id_by_username(self, username: str) -> PydanticObjectId | None:
-        org = await Organization.find({"username": username}).aggregate([{"$project": {"_id": 1}}]).to_list()
-        return org[0]["_id"] if org else None
+        return await username_resolver.resolve(username)
 
-    async def get_id_registry_mapping(self) -> dict[PydanticObjectId, str]:
-        organizations = await Organization.find().aggregate([{"$project": {"_id": 1, "in_registry_id": 1}}]).to_list()
-        return {org["_id"]: org["in_registry_id"] for org in organizations}
+    async def create_many(self, data: list[CreateOrganization]) -> list[PydanticObjectId]:
+        ids = await crud.create_many(data)
+        await educational_program_repository.replace_for_organizations(
+            {id: item.educational_programs for id, item in zip(ids, data)}
+        )
+        if ids:
+            await organization_directory.invalidate(ids)
+        return ids
 
-    async def get_username_mapping(self) -> dict[str, PydanticObjectId]:
-        organizations = await Organization.find().aggregate([{"$project": {"_id": 1, "username": 1}}]).to_list()
-        return {org["username"]: org["_id"] for org in organizations}
+    def forget_versions(self, ids: list[PydanticObjectId]) -> None:
+        """
+        Forget cached versions after writes made directly through the collection (e.g. by the importer).
+        """
+        assert crud.versions is not None
+        for id in ids:
+            crud.versions.forget(id)
 
-    async def create_many(self, data: list[CreateOrganization]) -> list[PydanticObjectId]:
-        return await crud.create_many(data)
+    async def add_review_rate(self, id: PydanticObjectId, rate: int, delta: int) -> None:
+        """
+        Account created (`delta=1`) or removed (`delta=-1`) review in materialized rating of the organization.
+        """
+        collection = Organization.get_motor_collection()
+        raw = await collection.find_one_and_update(
+            {"_id": id},
+            {
+                "$inc": {
+                    "rating.count": delta,
+                    "rating.sum": delta * rate,
+                    f"rating.histogram.{rate}": delta,
+                    "version": 1,
+                }
+            },
+            projection={"rating": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if raw is None:
+            return
+        count, sum_ = raw["rating"]["count"], raw["rating"]["sum"]
+        # average can not be maintained by `$inc`; it is set only if counters have not changed since,
+        # otherwise the later writer sets it
+        await collection.update_one(
+            {"_id": id, "rating.count": count, "rating.sum": sum_},
+            {"$set": {"rating.average": sum_ / count if count > 0 else None}},
+        )
+        self.forget_versions([id])
+        await organization_directory.ratings_changed([id])
+
+    async def repair_ratings(self) -> RatingRepairReport:
+        """
+        Recompute ratings of all organizations from reviews (e.g. after a failure between writing a review and
+        updating the rating), only organizations with wrong aggregates are written.
+        """
+        ratings: dict[PydanticObjectId, RatingSchema] = {}
+        reviews = 0
+        rows = Review.get_motor_collection().aggregate(
+            [{"$group": {"_id": {"organization_id": "$organization_id", "rate": "$rate"}, "count": {"$sum": 1}}}]
+        )
+        async for row in rows:
+            rating = ratings.setdefault(row["_id"]["organization_id"], RatingSchema())
+            rate, count = row["_id"]["rate"], row["count"]
+            rating.count += count
+            rating.sum += rate * count
+            rating.histogram[str(rate)] = count
+            reviews += count
+        for rating in ratings.values():
+            rating.average = rating.sum / rating.count
+
+        organizations = 0
+        repaired: list[PydanticObjectId] = []
+        operations: list[UpdateOne] = []
+        async for raw in Organization.get_motor_collection().find({}, projection={"rating": 1}):
+            organizations += 1
+            expected = ratings.get(raw["_id"], RatingSchema())
+            if _normalized_rating(raw.get("rating")) == expected:
+                continue
+            repaired.append(raw["_id"])
+            operations.append(
+                UpdateOne({"_id": raw["_id"]}, {"$set": {"rating": expected.model_dump()}, "$inc": {"version": 1}})
+            )
+            if len(operations) >= RATING_REPAIR_BATCH_SIZE:
+                await Organization.get_motor_collection().bulk_write(operations, ordered=False)
+                operations = []
+        if operations:
+            await Organization.get_motor_collection().bulk_write(operations, ordered=False)
+        if repaired:
+            self.forget_versions(repaired)
+            await organization_directory.ratings_changed(repaired)
+        return RatingRepairReport(organizations=organizations, reviews=reviews, repaired=len(repaired))
 
     async def set_main_scene(self, organization_id: PydanticObjectId, scene_id: PydanticObjectId) -> None:
         await Organization.find({"_id": organization_id}).update(
-            {"$set": {"main_scene": scene_id}},
+            {"$set": {"main_scene": scene_id}, "$inc": {"version": 1}},
         )
+        assert crud.versions is not None
+        crud.versions.forget(organization_id)
 
 
 organization_repository: OrganizationRepository = OrganizationRepository()
-
-
-async def parse_certificates_to_organizations(organizations: Certificates) -> list[CreateOrganization]:
-    id_registry_mapping = await organization_repository.get_id_registry_mapping()
-    username_mapping = await organization_repository.get_username_mapping()
-    not_existing_ids = []
-
-    for org in organizations.certificates:
-        if org.in_registry_id not in id_registry_mapping and org.in_registry_id not in username_mapping:
-            not_existing_ids.append(org.in_registry_id)
-
-    not_existing_organizations = (org for org in organizations.certificates if org.in_registry_id in not_existing_ids)
-    create_ = (
-        CreateOrganization(
-            logo=org.logo,
-            in_registry_id=org.in_registry_id,
-            username=org.in_registry_id,
-            name=org.actual_education_organization.short_name or org.actual_education_organization.full_name,
-            full_name=org.actual_education_organization.full_name,
-            contacts=ContactsSchema(
-                email=org.actual_education_organization.email,
-                phone=org.actual_education_organization.phone,
-                website=org.actual_education_organization.website,
-                fax=org.actual_education_organization.fax,
-                post_address=org.actual_education_organization.post_address,
-                inn=org.actual_education_organization.inn,
-                kpp=org.actual_education_organization.kpp,
-                ogrn=org.actual_education_organization.ogrn,
-            ),
-            region_name=org.region_name,
-            federal_district_name=org.federal_district_name,
-            educational_programs=[
-                EducationalProgramSchema(
-                    in_registry_id=_.in_registry_id,
-                    edu_level_name=_.edu_level_name,
-                    program_name=_.program_name,
-                    program_code=_.program_code,
-                    ugs_name=_.ugs_name,
-                    ugs_code=_.ugs_code,
-                    edu_normative_period=_.edu_normative_period,
-                    qualification=_.qualification,
-                )
-                for _ in org.educational_programs
-            ],
-        )
-        for org in not_existing_organizations
-        if org.actual_education_organization
-    )
-    return list(create_)
@@ -1,20 +1,43 @@
 __all__ = ["router"]
 
 from beanie import PydanticObjectId
-from fastapi import Depends, APIRouter, UploadFile
+from fastapi import Depends, APIRouter, UploadFile, Request, Query
 
-from scripts.parse_organizations import Certificates, CertificateOut
+from scripts.parse_organizations import CertificateOut
 from src.api.crud_routes_factory import setup_based_on_methods
+from src.api.etag import make_etag, is_not_modified, not_modified_response, set_etag
 
 from src.api.dependencies import get_moderator, UserDep, OptionalUserIdDep
-from src.exceptions import ObjectNotFound, NotEnoughPermissionsException, UnauthorizedException
+from src.exceptions import (
+    ObjectNotFound,
+    NotEnoughPermissionsException,
+    UnauthorizedException,
+    InvalidCursor,
+)
+from src.storages.mongo.raw import RawORJSONResponse
 from src.modules.anonymize.repository import anonym_repository
-from src.modules.organization.repository import organization_repository, parse_certificates_to_organizations
-from src.modules.organization.schemas import UpdateOrganization, PostReview
+from src.modules.jobs.repository import job_repository
+from src.modules.jobs.runner import job_runner
+from src.modules.educational_program.repository import educational_program_repository
+from src.modules.organization.importer import certificate_to_organization, ImportMode, registry_hash
+from src.modules.organization.repository import organization_repository
+from src.modules.organization.facets import organization_facets
+from src.modules.organization.schemas import (
+    UpdateOrganization,
+    PostReview,
+    SearchResults,
+    FacetedResults,
+    CatalogSort,
+)
+from src.modules.organization.search import organization_search_index
+from src.modules.organization import jobs as organization_jobs
+from src.modules.organization.stream import is_ndjson, read_upload_chunks, spool_to_file
 from src.modules.review.repository import review_repository
 from src.modules.review.schemas import CreateReview, AnonymousReview
 from src.storages.mongo import Organization
-from src.storages.mongo.models.organization import ContactsSchema, EducationalProgramSchema
+from src.storages.mongo.crud import Page, InvalidCursorError
+from src.storages.mongo.models.educational_program import EducationalProgram
+from src.storages.mongo.models.job import Job, JobKind
 from src.storages.mongo.models.review import Review
 from src.storages.mongo.schemas import UserRole
 
@@ -22,6 +45,45 @@ router = APIRouter(prefix="/organizations", tags=["Organizations"])
 
 _moder_dep = Depends(get_moderator)
 
+
+# must be registered before generated `/{id}` route
+@router.get("/search", responses={200: {"description": "Результаты поиска"}})
+async def search_organizations(
+    q: str = Query(..., min_length=1, max_length=200, description="Поисковый запрос"),
+    limit: int = Query(20, ge=1, le=100, description="Размер страницы"),
+    offset: int = Query(0, ge=0, description="Смещение"),
+) -> SearchResults:
+    """
+    Поиск организаций по названию, полному названию, региону и названиям образовательных программ
+    """
+    return await organization_search_index.search(q, limit=limit, offset=offset)
+
+
+# must be registered before generated `/{id}` route
+@router.get("/catalog", responses={200: {"description": "Организации и количества по фасетам"}})
+async def get_catalog(
+    federal_district_name: list[str] = Query([], description="Федеральные округа"),
+    region_name: list[str] = Query([], description="Регионы"),
+    edu_level_name: list[str] = Query([], description="Уровни образования программ"),
+    ugs_code: list[str] = Query([], description="Коды направлений подготовки программ"),
+    qualification: list[str] = Query([], description="Квалификации выпускников программ"),
+    sort: CatalogSort = Query(CatalogSort.NAME, description="Порядок организаций"),
+    limit: int = Query(50, ge=1, le=500, description="Размер страницы"),
+    offset: int = Query(0, ge=0, description="Смещение"),
+) -> FacetedResults:
+    """
+    Фильтрация организаций по фасетам. Значения одного фасета объединяются через ИЛИ, разных фасетов - через И.
+    """
+    filters = {
+        "federal_district_name": federal_district_name,
+        "region_name": region_name,
+        "edu_level_name": edu_level_name,
+        "ugs_code": ugs_code,
+        "qualification": qualification,
+    }
+    return await organization_facets.query(filters, limit=limit, offset=offset, sort=sort)
+
+
 setup_based_on_methods(
     router,
     crud=organization_repository,
@@ -34,13 +96,28 @@ setup_based_on_methods(
 
 
 @router.get(
-    "/by-username/{username}", responses={200: {"description": "Organization info"}, **ObjectNotFound.responses}
+    "/by-username/{username}",
+    responses={
+        200: {"description": "Organization info"},
+        304: {"description": "Организация не изменилась (If-None-Match)"},
+        **ObjectNotFound.responses,
+    },
 )
-async def get_by_username(username: str) -> Organization:
-    organization = await organization_repository.read_by_username(username)
+async def get_by_username(username: str, request: Request) -> Organization:
+    if request.headers.get("if-none-match"):
+        id_version = await organization_repository.read_version_by_username(username)
+        if id_version is None:
+            raise ObjectNotFound(f"Организация с username={username} не найдена")
+        etag = make_etag(*id_version)
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)  # type: ignore[return-value]
+
+    organization = await organization_repository.read_by_username_raw(username)
     if organization is None:
         raise ObjectNotFound(f"Организация с username={username} не найдена")
-    return organization
+    response = RawORJSONResponse(organization)
+    set_etag(response, make_etag(organization["id"], organization["version"]))
+    return response  # type: ignore[return-value]
 
 
 @router.post(
@@ -56,8 +133,7 @@ async def post_review(data: PostReview, user: UserDep, organization_id: Pydantic
     """
     Оставить отзыв организации
     """
-    organization = await organization_repository.read(organization_id)
-    if organization is None:
+    if await organization_repository.read_version(organization_id) is None:
         raise ObjectNotFound(f"Организация с id={organization_id} не найдена")
     # check approvement
     if not user.is_approved(organization_id):
@@ -78,35 +154,89 @@ async def get_reviews(organization_id: PydanticObjectId, user_id: OptionalUserId
     """
     Получить отзывы об организации
     """
-    organization = await organization_repository.read(organization_id)
-    if organization is None:
+    if await organization_repository.read_version(organization_id) is None:
         raise ObjectNotFound(f"Организация с id={organization_id} не найдена")
     reviews = await review_repository.read_for_organization(organization_id)
     return [anonym_repository.anonymize_review(review, user_id) for review in reviews]
 
 
+@router.get(
+    "/{organization_id}/programs",
+    responses={
+        200: {"description": "Страница образовательных программ"},
+        **ObjectNotFound.responses,
+        **InvalidCursor.responses,
+    },
+)
+async def get_programs(
+    organization_id: PydanticObjectId,
+    limit: int = Query(50, ge=1, le=500, description="Размер страницы"),
+    after: str | None = Query(None, description="Курсор `next_cursor` из предыдущей страницы"),
+    ugs_code: str | None = Query(None, description="Код направления подготовки"),
+    edu_level_name: str | None = Query(None, description="Уровень образования"),
+) -> Page[EducationalProgram]:
+    """
+    Получить образовательные программы организации (постранично)
+    """
+    if await organization_repository.read_version(organization_id) is None:
+        raise ObjectNotFound(f"Организация с id={organization_id} не найдена")
+    try:
+        return await educational_program_repository.read_page_for_organization(
+            organization_id, limit, after, ugs_code=ugs_code, edu_level_name=edu_level_name
+        )
+    except InvalidCursorError as e:
+        raise InvalidCursor(str(e))
+
+
 @router.post(
     "/import",
     responses={
-        201: {"description": "Организации успешно созданы, если не существовали"},
+        202: {"description": "Задача импорта поставлена в очередь, состояние доступно по `/jobs/{job_id}`"},
         **NotEnoughPermissionsException.responses,
     },
-    status_code=201,
+    status_code=202,
 )
-async def import_organizations(upload_file_obj: UploadFile, user: UserDep) -> list[PydanticObjectId]:
+async def import_organizations(upload_file_obj: UploadFile, user: UserDep, mode: ImportMode = ImportMode.CREATE) -> Job:
     """
-    Импортировать организации из JSON дампа (результат скрипта `parse_organizations.py`)
+    Импортировать организации из дампа (результат скрипта `parse_organizations.py`) в фоновой задаче.
+    Дамп в формате JSON или NDJSON (по одной организации в строке, файлы `.ndjson`/`.jsonl`), может быть сжат gzip или
+    zstd.
+    Существующие организации (по `in_registry_id` или `username`) пропускаются, повторный импорт ничего не меняет.
+    В режиме `resync` также обновляются организации, данные которых в реестре изменились (сравниваются хэши), а в
+    отчёте перечисляются добавленные, изменённые и отсутствующие в дампе организации.
+    Одновременно выполняется не больше одного импорта, остальные ждут в очереди
     """
     if user.role != UserRole.ADMIN:
         raise NotEnoughPermissionsException("У вас недостаточно прав для загрузки организаций")
 
-    bytes_ = await upload_file_obj.read()
-    organizations = Certificates.model_validate_json(bytes_)
+    job = await job_repository.create(JobKind.ORGANIZATION_IMPORT, created_by=user.id)
+    path = job_runner.file_path(job.id)
+    # if saving fails, the queued job and the file are cleaned up by the sweep of stale jobs
+    await spool_to_file(read_upload_chunks(upload_file_obj), path)
+    job_runner.submit(
+        job, organization_jobs.import_organizations, str(path), is_ndjson(upload_file_obj.filename or ""), mode
+    )
+    return job
+
 
-    create_ = await parse_certificates_to_organizations(organizations)
-    if create_:
-        return await organization_repository.create_many(create_)
-    return []
+@router.post(
+    "/ratings/repair",
+    responses={
+        202: {"description": "Задача пересчёта рейтингов поставлена в очередь, состояние доступно по `/jobs/{job_id}`"},
+        **NotEnoughPermissionsException.responses,
+    },
+    status_code=202,
+)
+async def repair_ratings(user: UserDep) -> Job:
+    """
+    Пересчитать рейтинги всех организаций по отзывам в фоновой задаче
+    """
+    if user.role != UserRole.ADMIN:
+        raise NotEnoughPermissionsException("У вас недостаточно прав для пересчёта рейтингов")
+
+    job = await job_repository.create(JobKind.RATING_REPAIR, created_by=user.id)
+    job_runner.submit(job, organization_jobs.repair_ratings)
+    return job
 
 
 @router.post(
@@ -126,39 +256,14 @@ async def import_specific_organization(
     if user.role != UserRole.ADMIN:
         raise NotEnoughPermissionsException("У вас недостаточно прав для загрузки организаций")
 
-    if org.actual_education_organization is None:
+    create_ = certificate_to_organization(org)
+    if create_ is None:
         raise ObjectNotFound("Не найдена актуальная организация")
+    # only fields mapped from the registry are overwritten (logo, scenes and documents are kept)
+    update_ = UpdateOrganization.model_validate(create_.model_dump(exclude_unset=True, exclude={"logo"}))
 
-    update_ = UpdateOrganization(
-        in_registry_id=org.in_registry_id,
-        username=org.in_registry_id,
-        name=org.actual_education_organization.short_name or org.actual_education_organization.full_name,
-        full_name=org.actual_education_organization.full_name,
-        contacts=ContactsSchema(
-            email=org.actual_education_organization.email,
-            phone=org.actual_education_organization.phone,
-            website=org.actual_education_organization.website,
-            fax=org.actual_education_organization.fax,
-            post_address=org.actual_education_organization.post_address,
-            inn=org.actual_education_organization.inn,
-            kpp=org.actual_education_organization.kpp,
-            ogrn=org.actual_education_organization.ogrn,
-        ),
-        region_name=org.region_name,
-        federal_district_name=org.federal_district_name,
-        educational_programs=[
-            EducationalProgramSchema(
-                in_registry_id=_.in_registry_id,
-                edu_level_name=_.edu_level_name,
-                program_name=_.program_name,
-                program_code=_.program_code,
-                ugs_name=_.ugs_name,
-                ugs_code=_.ugs_code,
-                edu_normative_period=_.edu_normative_period,
-                qualification=_.qualification,
-            )
-            for _ in org.educational_programs
-        ],
-    )
-
-    return await organization_repository.update(organization_id, update_)
+    updated = await organization_repository.update(organization_id, update_)
+    if updated is not None:
+        # so the next re-sync does not treat the organization as changed
+        await organization_repository.set_registry_hash(organization_id, registry_hash(create_))
+    return updated
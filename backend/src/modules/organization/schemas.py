@@ -1,4 +1,5 @@
 # mypy: disable-error-code="assignment"
+from enum import StrEnum
 from typing import Any
 
 from beanie import PydanticObjectId
@@ -6,11 +7,13 @@ from pydantic import Field
 
 from src.custom_pydantic import CustomModel
 from src.storages.mongo.models.__base__ import MongoDbId
-from src.storages.mongo.models.organization import OrganizationSchema, ContactsSchema, EducationalProgramSchema
+from src.storages.mongo.models.educational_program import EducationalProgramSchema
+from src.storages.mongo.models.organization import OrganizationSchema, ContactsSchema, RatingSchema
 
 
 class CreateOrganization(OrganizationSchema):
-    pass
+    educational_programs: list[EducationalProgramSchema] = []
+    "Образовательные программы организации (хранятся в отдельной коллекции)"
 
 
 class UpdateOrganization(OrganizationSchema):
@@ -35,7 +38,7 @@ class UpdateOrganization(OrganizationSchema):
     federal_district_name: str | None = None
     "Наименование федерального округа"
     educational_programs: list[EducationalProgramSchema] | None = None
-    "Образовательные программы организации"
+    "Образовательные программы организации (заменяют существующие)"
 
 
 class CompactOrganization(CustomModel):
@@ -48,8 +51,58 @@ class CompactOrganization(CustomModel):
     "Наименование организации"
     logo: PydanticObjectId | None = None
     "Логотип организации"
+    rating: RatingSchema | None = None
+    "Агрегаты оценок из отзывов"
+
+
+class SearchHit(CustomModel):
+    organization: CompactOrganization
+    "Найденная организация"
+    score: float
+    "Релевантность"
+    highlights: dict[str, list[str]]
+    "Совпавшие тексты по полям (`name`, `full_name`, `region_name`, `programs`), совпадения выделены `<mark>`"
+
+
+class SearchResults(CustomModel):
+    items: list[SearchHit]
+    "Результаты поиска (страница)"
+    total: int
+    "Общее количество найденных организаций"
+
+
+class FacetValue(CustomModel):
+    value: str
+    "Значение"
+    count: int
+    "Количество организаций с этим значением (с учётом фильтров по остальным фасетам)"
+
+
+class CatalogSort(StrEnum):
+    NAME = "name"
+    "По алфавиту"
+    RATING = "rating"
+    "По средней оценке, затем по количеству отзывов"
+
+
+class FacetedResults(CustomModel):
+    items: list[CompactOrganization]
+    "Организации (страница, в выбранном порядке)"
+    total: int
+    "Общее количество подходящих организаций"
+    facets: dict[str, list[FacetValue]]
+    "Значения фасетов с количествами, по убыванию количества"
 
 
 class PostReview(CustomModel):
     text: str
     rate: int = Field(..., ge=1, le=5)
+
+
+class RatingRepairReport(CustomModel):
+    organizations: int
+    "Проверено организаций"
+    reviews: int
+    "Учтено отзывов"
+    repaired: int
+    "Исправлено организаций (агрегаты не совпадали с отзывами)"
@@ -0,0 +1,248 @@
+"""
+In-process inverted index for ranked search over organizations and their educational programs.
+"""
+
+__all__ = ["OrganizationSearchIndex", "organization_search_index", "tokenize", "stem"]
+
+import asyncio
+import html
+import re
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Any
+
+from anyio import to_thread
+
+from src.logging_ import logger
+from src.modules.educational_program.repository import educational_program_repository
+from src.modules.metrics.repository import metrics_repository
+from src.modules.organization.directory import organization_directory
+from src.modules.organization.schemas import CompactOrganization, SearchHit, SearchResults
+from src.storages.mongo.models.organization import Organization
+from src.storages.mongo.raw import find_raw
+
+FIELD_WEIGHTS = {"name": 5.0, "full_name": 3.0, "region_name": 2.0, "programs": 1.0}
+PREFIX_PENALTY = 0.5  # prefix match of a term is worth less than exact match of the stem
+MIN_PREFIX_LENGTH = 2
+MAX_PREFIX_EXPANSIONS = 64
+MAX_HIGHLIGHTS_PER_FIELD = 3
+
+_word_re = re.compile(r"\w+", re.UNICODE)
+
+# longest endings go first; light stemming, stem is never shorter than 3 letters
+_ENDINGS = sorted(
+    (
+        "иями ями ами ость ости остью иях ях ах ого его ому ему ыми ими ией ей ой ий ый ая яя ое ее ую юю ых их "
+        "ам ям ов ев ом ем ия ие ью ь а я о е ы и у ю"
+    ).split(),
+    key=len,
+    reverse=True,
+)
+
+
+def stem(word: str) -> str:
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= 3:
+            return word[: -len(ending)]
+    return word
+
+
+def tokenize(text: str) -> list[str]:
+    return [stem(word) for word in _word_re.findall(text.lower().replace("ё", "е"))]
+
+
+@dataclass
+class _Document:
+    compact: dict[str, Any]
+    texts: dict[str, list[str]]
+
+
+@dataclass
+class _Index:
+    version: int | None = None
+    documents: list[_Document] = field(default_factory=list)
+    positions: dict[Any, int] = field(default_factory=dict)
+    "organization id -> document index"
+    postings: dict[str, dict[int, float]] = field(default_factory=dict)
+    "term -> {document index -> weight}"
+    vocabulary: list[str] = field(default_factory=list)
+    "sorted terms, for prefix matching"
+
+
+def _build(raws: list[dict[str, Any]], programs: dict[Any, list[dict[str, Any]]], version: int) -> _Index:
+    index = _Index(version=version)
+    for i, raw in enumerate(raws):
+        texts = {
+            "name": [raw["name"]] if raw.get("name") else [],
+            "full_name": [raw["full_name"]] if raw.get("full_name") else [],
+            "region_name": [raw["region_name"]] if raw.get("region_name") else [],
+            "programs": sorted({p["program_name"] for p in programs.get(raw["id"], []) if p.get("program_name")}),
+        }
+        compact = {name: raw.get(name) for name in CompactOrganization.model_fields if name != "id"}
+        compact["_id"] = raw["id"]
+        index.positions[raw["id"]] = len(index.documents)
+        index.documents.append(_Document(compact=compact, texts=texts))
+        # weight of a term in a document is the sum of weights of fields where it occurs (once per field)
+        for field_name, values in texts.items():
+            weight = FIELD_WEIGHTS[field_name]
+            for term in {term for value in values for term in tokenize(value)}:
+                postings = index.postings.setdefault(term, {})
+                postings[i] = postings.get(i, 0.0) + weight
+    index.vocabulary = sorted(index.postings)
+    return index
+
+
+class OrganizationSearchIndex:
+    """
+    Inverted index over `name`, `full_name`, `region_name` and names of educational programs. It is rebuilt
+    when version of the organization directory changes (after imports and edits, in every worker).
+
+    Rebuilds run in a background task while searches use the previous index, the new one replaces it at once when
+    ready. Only the very first build is awaited by searches. Rating changes are patched in place.
+    """
+
+    _index: _Index
+    _rebuild_task: asyncio.Task | None
+    _pending_ratings: dict[Any, dict[str, Any] | None]
+    "rating changes during the rebuild, applied to the new index"
+    built_in: float
+
+    def __init__(self):
+        self._index = _Index()
+        self._rebuild_task = None
+        self._pending_ratings = {}
+        self.built_in = 0.0
+        organization_directory.subscribe_ratings(self._on_ratings)
+
+    async def refresh(self) -> None:
+        version = (await organization_directory.get()).version
+        if self._index.version == version:
+            return
+        # one rebuild at a time, a version changed during the rebuild is picked up by a later search
+        if self._rebuild_task is None or self._rebuild_task.done():
+            self._rebuild_task = asyncio.create_task(self._rebuild(version))
+            self._rebuild_task.add_done_callback(_log_failure)
+        if self._index.version is None:
+            await asyncio.shield(self._rebuild_task)
+
+    async def _rebuild(self, version: int) -> None:
+        start = time.perf_counter()
+        self._pending_ratings = {}
+        raws = await find_raw(
+            Organization,
+            projection={"username": 1, "name": 1, "logo": 1, "rating": 1, "full_name": 1, "region_name": 1},
+        )
+        programs = await educational_program_repository.read_fields_by_organization(["program_name"])
+        # building is CPU-bound, so do not block the event loop
+        index = await to_thread.run_sync(_build, raws, programs, version)
+        _patch_ratings(index, self._pending_ratings)
+        self._pending_ratings = {}
+        self._index = index
+        self.built_in = time.perf_counter() - start
+
+    async def _on_ratings(self, ratings: dict[Any, dict[str, Any] | None]) -> None:
+        _patch_ratings(self._index, ratings)
+        if self._rebuild_task is not None and not self._rebuild_task.done():
+            self._pending_ratings.update(ratings)
+
+    async def search(self, query: str, limit: int, offset: int = 0) -> SearchResults:
+        await self.refresh()
+        index = self._index
+        terms = tokenize(query)
+        if not terms:
+            return SearchResults(items=[], total=0)
+
+        scores: dict[int, float] | None = None
+        matched_terms: set[str] = set()
+        for term in terms:
+            # every query term must match (exactly or as a prefix of an indexed term)
+            term_scores: dict[int, float] = {}
+            for indexed_term, factor in self._expand(index, term):
+                matched_terms.add(indexed_term)
+                for doc, weight in index.postings[indexed_term].items():
+                    term_scores[doc] = max(term_scores.get(doc, 0.0), weight * factor)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {doc: score + term_scores[doc] for doc, score in scores.items() if doc in term_scores}
+            if not scores:
+                return SearchResults(items=[], total=0)
+
+        assert scores is not None
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], index.documents[item[0]].compact["name"] or ""))
+        items = [
+            SearchHit(
+                organization=CompactOrganization.model_validate(index.documents[doc].compact),
+                score=score,
+                highlights=_highlights(index.documents[doc], matched_terms),
+            )
+            for doc, score in ranked[offset : offset + limit]
+        ]
+        return SearchResults(items=items, total=len(ranked))
+
+    def _expand(self, index: _Index, term: str) -> list[tuple[str, float]]:
+        expanded = []
+        if term in index.postings:
+            expanded.append((term, 1.0))
+        if len(term) >= MIN_PREFIX_LENGTH:
+            start = bisect_left(index.vocabulary, term)
+            for indexed_term in index.vocabulary[start : start + MAX_PREFIX_EXPANSIONS + 1]:
+                if not indexed_term.startswith(term):
+                    break
+                if indexed_term != term:
+                    expanded.append((indexed_term, PREFIX_PENALTY))
+        return expanded
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "version": self._index.version,
+            "documents": len(self._index.documents),
+            "terms": len(self._index.vocabulary),
+            "built_in": self.built_in,
+            "rebuilding": self._rebuild_task is not None and not self._rebuild_task.done(),
+        }
+
+
+def _patch_ratings(index: _Index, ratings: dict[Any, dict[str, Any] | None]) -> None:
+    for id, rating in ratings.items():
+        position = index.positions.get(id)
+        if position is not None:
+            index.documents[position].compact["rating"] = rating
+
+
+def _log_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and (e := task.exception()) is not None:
+        logger.error(f"Failed to rebuild organization search index: {e!r}")
+
+
+def _highlights(document: _Document, matched_terms: set[str]) -> dict[str, list[str]]:
+    """
+    Texts of fields with matched words wrapped in `<mark>`.
+    """
+
+    highlights: dict[str, list[str]] = {}
+    for field_name, values in document.texts.items():
+        marked = []
+        for value in values:
+            parts = []
+            position = 0
+            found = False
+            for match in _word_re.finditer(value):
+                if stem(match.group(0).lower().replace("ё", "е")) in matched_terms:
+                    parts.append(html.escape(value[position : match.start()]))
+                    parts.append(f"<mark>{html.escape(match.group(0))}</mark>")
+                    position = match.end()
+                    found = True
+            if found:
+                parts.append(html.escape(value[position:]))
+                marked.append("".join(parts))
+            if len(marked) == MAX_HIGHLIGHTS_PER_FIELD:
+                break
+        if marked:
+            highlights[field_name] = marked
+    return highlights
+
+
+organization_search_index: OrganizationSearchIndex = OrganizationSearchIndex()
+metrics_repository.register("organization_search", organization_search_index.stats)
@@ -0,0 +1,288 @@
+"""
+Incremental reading of the registry dump (result of `scripts/parse_organizations.py`): certificates are decoded one
+by one, so memory does not depend on the size of the dump.
+
+The dump is either a JSON object `{"certificates": [...]}` or NDJSON (one certificate per line, `.ndjson`/`.jsonl`),
+optionally compressed with gzip or zstd (detected by magic bytes).
+"""
+
+__all__ = [
+    "iter_certificates",
+    "iter_json_array",
+    "iter_ndjson",
+    "decompress_chunks",
+    "is_ndjson",
+    "read_upload_chunks",
+    "read_file_chunks",
+    "spool_to_file",
+    "JSONStreamError",
+]
+
+import codecs
+import json
+import re
+import zlib
+from os import PathLike
+from pathlib import Path
+from typing import Any, AsyncIterable, AsyncIterator, Callable
+
+import anyio
+import orjson
+import zstandard
+from fastapi import UploadFile
+
+CHUNK_SIZE = 64 * 1024
+MAX_VALUE_SIZE = 16 * 1024 * 1024
+"""
+Max size of one value of the array or of an NDJSON line (characters or bytes). Certificates are much smaller, so a
+longer value is malformed or unterminated; it is rejected instead of buffering the rest of the upload.
+"""
+
+NDJSON_SUFFIXES = (".ndjson", ".jsonl")
+COMPRESSION_SUFFIXES = (".gz", ".zst")
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+_BOM = codecs.BOM_UTF8
+
+_whitespace_re = re.compile(r"[ \t\n\r]*")
+_decoder = json.JSONDecoder()
+
+
+class JSONStreamError(ValueError):
+    """
+    Stream is not a valid JSON object with the expected array.
+    """
+
+
+async def read_upload_chunks(upload_file_obj: UploadFile, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    while chunk := await upload_file_obj.read(chunk_size):
+        yield chunk
+
+
+async def read_file_chunks(path: str | PathLike[str], chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    async with await anyio.open_file(path, "rb") as f:
+        while chunk := await f.read(chunk_size):
+            yield chunk
+
+
+async def spool_to_file(chunks: AsyncIterable[bytes], path: Path) -> None:
+    """
+    Save stream to a file (e.g. upload processed after the request), the caller should remove it.
+    """
+    async with await anyio.open_file(path, "wb") as f:
+        async for chunk in chunks:
+            await f.write(chunk)
+
+
+def is_ndjson(name: str | PathLike[str]) -> bool:
+    """
+    Whether the dump is NDJSON by its file name (e.g. `organizations.ndjson.gz`).
+    """
+    path = Path(name)
+    if path.suffix in COMPRESSION_SUFFIXES:
+        path = path.with_suffix("")
+    return path.suffix in NDJSON_SUFFIXES
+
+
+def _decompressor_factory(head: bytes) -> Callable[[], Any] | None:
+    if head.startswith(_GZIP_MAGIC):
+        return lambda: zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+    if head.startswith(_ZSTD_MAGIC):
+        return zstandard.ZstdDecompressor().decompressobj
+    return None
+
+
+async def decompress_chunks(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """
+    Decompress gzip or zstd stream (concatenated members/frames too), other streams are passed as is.
+    """
+    chunks = aiter(chunks)
+    head = b""
+    async for chunk in chunks:
+        head += chunk
+        if len(head) >= len(_ZSTD_MAGIC):
+            break
+    factory = _decompressor_factory(head)
+    if factory is None:
+        if head:
+            yield head
+        async for chunk in chunks:
+            yield chunk
+        return
+
+    decompressor = factory()
+    chunk = head
+    while True:
+        try:
+            while chunk:
+                if data := decompressor.decompress(chunk):
+                    yield data
+                # next member of concatenated stream (e.g. `cat a.gz b.gz`)
+                chunk = decompressor.unused_data if decompressor.eof else b""
+                if chunk:
+                    decompressor = factory()
+        except (zlib.error, zstandard.ZstdError) as e:
+            raise JSONStreamError(f"Invalid compressed stream: {e}") from e
+        try:
+            chunk = await anext(chunks)
+        except StopAsyncIteration:
+            break
+    if not decompressor.eof:
+        raise JSONStreamError("Compressed stream is truncated")
+
+
+class _Reader:
+    """
+    Window over the stream: `buffer[position:]` is not consumed yet.
+    """
+
+    def __init__(self, chunks: AsyncIterable[bytes]):
+        self._chunks = aiter(chunks)
+        self._text_decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    async def fill(self, at_least: int = 1) -> bool:
+        """
+        Read at least `at_least` more characters (unless the stream ends), False if nothing was read.
+        """
+        if self.eof:
+            return False
+        if self.position:
+            # drop consumed part, so the buffer holds only the current value
+            self.buffer = self.buffer[self.position :]
+            self.position = 0
+        target = len(self.buffer) + at_least
+        read = False
+        while len(self.buffer) < target:
+            try:
+                chunk = await anext(self._chunks)
+            except StopAsyncIteration:
+                self.buffer += self._text_decoder.decode(b"", final=True)
+                self.eof = True
+                break
+            self.buffer += self._text_decoder.decode(chunk)
+            read = True
+        return read
+
+    async def peek(self) -> str:
+        """
+        Skip whitespace and return the next character ("" at the end of the stream).
+        """
+        while True:
+            self.position = _whitespace_re.match(self.buffer, self.position).end()  # type: ignore
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not await self.fill():
+                return ""
+
+    async def expect(self, *characters: str) -> str:
+        character = await self.peek()
+        if character not in characters:
+            raise JSONStreamError(f"Expected {' or '.join(map(repr, characters))}, got {character or 'end of file'!r}")
+        self.position += 1
+        return character
+
+    async def value(self) -> Any:
+        await self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError as e:
+                size = len(self.buffer) - self.position
+                if size >= MAX_VALUE_SIZE:
+                    raise JSONStreamError(f"Value is longer than {MAX_VALUE_SIZE} characters or malformed: {e}") from e
+                # value is probably truncated by the chunk boundary, read as much again (amortized linear)
+                if await self.fill(min(max(size, CHUNK_SIZE), MAX_VALUE_SIZE - size)):
+                    continue
+                raise JSONStreamError(str(e)) from e
+            # number at the end of the buffer may continue in the next chunk
+            if end == len(self.buffer) and await self.fill():
+                continue
+            self.position = end
+            return value
+
+
+async def iter_json_array(chunks: AsyncIterable[bytes], key: str) -> AsyncIterator[Any]:
+    """
+    Yield items of the array `key` of the top-level JSON object one by one. Other keys are decoded and dropped.
+    """
+    reader = _Reader(chunks)
+    await reader.expect("{")
+    if await reader.peek() == "}":
+        return
+    while True:
+        name = await reader.value()
+        if not isinstance(name, str):
+            raise JSONStreamError(f"Expected key of the object, got {name!r}")
+        await reader.expect(":")
+        if name == key:
+            await reader.expect("[")
+            if await reader.peek() != "]":
+                while True:
+                    yield await reader.value()
+                    if await reader.expect(",", "]") == "]":
+                        break
+            else:
+                reader.position += 1
+        else:
+            await reader.value()
+        if await reader.expect(",", "}") == "}":
+            break
+    if await reader.peek():
+        raise JSONStreamError("Extra data after the end of the object")
+
+
+async def iter_ndjson(chunks: AsyncIterable[bytes]) -> AsyncIterator[Any]:
+    """
+    Yield JSON values of the lines one by one, empty lines are skipped.
+    """
+    # parts of the current line, only new chunks are scanned for line breaks
+    parts: list[bytes] = []
+    size = 0
+    number = 0
+    async for chunk in chunks:
+        start = 0
+        while (end := chunk.find(b"\n", start)) != -1:
+            number += 1
+            _check_line_size(size + end - start, number)
+            line = b"".join(parts) + chunk[start:end] if parts else chunk[start:end]
+            parts.clear()
+            size = 0
+            if line.strip():
+                yield _decode_line(line, number)
+            start = end + 1
+        if start < len(chunk):
+            size += len(chunk) - start
+            _check_line_size(size, number + 1)
+            parts.append(chunk[start:])
+    line = b"".join(parts)
+    if line.strip():
+        yield _decode_line(line, number + 1)
+
+
+def _check_line_size(size: int, number: int) -> None:
+    if size > MAX_VALUE_SIZE:
+        raise JSONStreamError(f"Line {number} is longer than {MAX_VALUE_SIZE} bytes")
+
+
+def _decode_line(line: bytes, number: int) -> Any:
+    if number == 1:
+        line = line.removeprefix(_BOM)
+    try:
+        return orjson.loads(line)
+    except orjson.JSONDecodeError as e:
+        raise JSONStreamError(f"Line {number}: {e}") from e
+
+
+def iter_certificates(chunks: AsyncIterable[bytes], ndjson: bool = False) -> AsyncIterator[dict[str, Any]]:
+    """
+    Raw certificates of the dump (JSON or NDJSON, possibly compressed), validation is done by the importer (invalid
+    certificates are reported, not fatal).
+    """
+    chunks = decompress_chunks(chunks)
+    if ndjson:
+        return iter_ndjson(chunks)
+    return iter_json_array(chunks, "certificates")
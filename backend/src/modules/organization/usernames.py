@@ -0,0 +1,87 @@
+__all__ = ["UsernameResolver", "username_resolver"]
+
+from typing import Any
+
+from beanie import PydanticObjectId
+
+from src.cache import TTLCache, MISSING
+from src.modules.metrics.repository import metrics_repository
+from src.modules.organization.directory import organization_directory
+from src.storages.mongo.models.organization import Organization, USERNAME_ID_INDEX
+
+USERNAMES_MAXSIZE = 50_000
+UNKNOWN_USERNAMES_MAXSIZE = 10_000
+UNKNOWN_USERNAME_TTL = 60  # seconds, unknown usernames are mostly typos and bots
+
+
+class UsernameResolver:
+    """
+    Resolve organization username to id with a covered query on the (`username`, `_id`) index, results (including
+    unknown usernames) are kept in bounded LRU caches.
+
+    Writes of this worker evict entries of changed organizations (via directory listener); a new version of the
+    directory made by another worker clears the caches.
+    """
+
+    version: int | None
+    _ids: TTLCache[str, PydanticObjectId]
+    _unknown: TTLCache[str, bool]
+
+    def __init__(self):
+        self.version = None
+        self._ids = TTLCache(maxsize=USERNAMES_MAXSIZE)
+        self._unknown = TTLCache(maxsize=UNKNOWN_USERNAMES_MAXSIZE, ttl=UNKNOWN_USERNAME_TTL)
+        organization_directory.subscribe(self._on_change)
+
+    async def resolve(self, username: str) -> PydanticObjectId | None:
+        version = (await organization_directory.get()).version
+        if version != self.version:
+            self.clear()
+            self.version = version
+
+        id = self._ids.get(username, MISSING)
+        if id is not MISSING:
+            return id
+        if self._unknown.get(username, MISSING) is not MISSING:
+            return None
+
+        cursor = (
+            Organization.get_motor_collection()
+            .find({"username": username}, projection={"_id": 1})
+            .hint(USERNAME_ID_INDEX)
+            .limit(1)
+        )
+        raws = await cursor.to_list(1)
+        if not raws:
+            self._unknown.set(username, True)
+            return None
+        id = raws[0]["_id"]
+        self._ids.set(username, id)
+        return id
+
+    def forget(self, username: str) -> None:
+        self._ids.pop(username)
+        self._unknown.pop(username)
+
+    def clear(self) -> None:
+        self._ids.clear()
+        self._unknown.clear()
+
+    async def _on_change(self, ids: list[PydanticObjectId], previous_version: int, version: int) -> None:
+        if self.version != previous_version:
+            # will be cleared on the next call
+            return
+        changed = set(ids)
+        for username, id in self._ids.items():
+            if id in changed:
+                self._ids.pop(username)
+        # changed organizations may have taken usernames which were unknown
+        self._unknown.clear()
+        self.version = version
+
+    def stats(self) -> dict[str, Any]:
+        return {"version": self.version, "ids": self._ids.stats(), "unknown": self._unknown.stats()}
+
+
+username_resolver: UsernameResolver = UsernameResolver()
+metrics_repository.register("organization_usernames", username_resolver.stats)
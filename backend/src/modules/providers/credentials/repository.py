@@ -1,19 +1,75 @@
 __all__ = ["CredentialsRepository", "credentials_repository"]
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
 from beanie import PydanticObjectId
 from passlib.context import CryptContext
 
-from src.exceptions import UnauthorizedException
+from src.exceptions import UnauthorizedException, ServiceUnavailable
+from src.modules.metrics.repository import metrics_repository
 from src.modules.providers.credentials.schemas import UserCredentialsFromDB
 
+T = TypeVar("T")
+
+HASHING_WORKERS = 4
+"Threads for bcrypt (it releases the GIL, so threads run in parallel)"
+HASHING_MAX_PENDING = 32
+"Max hashing jobs running or waiting in the pool; logins above this limit fail fast with 503"
+
 
 # noinspection PyMethodMayBeStatic
 class CredentialsRepository:
     PWD_CONTEXT = CryptContext(schemes=["bcrypt"])
 
-    @classmethod
-    def get_password_hash(cls, password: str) -> str:
-        return cls.PWD_CONTEXT.hash(password)
+    _executor: ThreadPoolExecutor
+    _pending: int
+    _completed: int
+    _failed: int
+    _cancelled: int
+    _rejected: int
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=HASHING_WORKERS, thread_name_prefix="bcrypt")
+        self._pending = 0
+        self._completed = 0
+        self._failed = 0
+        self._cancelled = 0
+        self._rejected = 0
+
+    async def _run_in_pool(self, func: Callable[..., T], *args, fail_fast: bool = True) -> T:
+        if fail_fast and self._pending >= HASHING_MAX_PENDING:
+            self._rejected += 1
+            raise ServiceUnavailable("Слишком много одновременных входов, попробуйте позже")
+        self._pending += 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        except asyncio.CancelledError:
+            self._cancelled += 1
+            raise
+        except Exception:
+            self._failed += 1
+            raise
+        finally:
+            self._pending -= 1
+        self._completed += 1
+        return result
+
+    def pool_stats(self) -> dict[str, int]:
+        return {
+            "workers": HASHING_WORKERS,
+            "max_pending": HASHING_MAX_PENDING,
+            "running": min(self._pending, HASHING_WORKERS),
+            "queued": max(self._pending - HASHING_WORKERS, 0),
+            "completed": self._completed,
+            "failed": self._failed,
+            "cancelled": self._cancelled,
+            "rejected": self._rejected,
+        }
+
+    async def get_password_hash(self, password: str, fail_fast: bool = True) -> str:
+        return await self._run_in_pool(self.PWD_CONTEXT.hash, password, fail_fast=fail_fast)
 
     async def authenticate_user(self, login: str, password: str) -> PydanticObjectId:
         user_credentials = await self._get_user(login)
@@ -25,8 +81,7 @@ class CredentialsRepository:
         return user_credentials.user_id
 
     async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        # logger.info(f"verifying password {self.PWD_CONTEXT.hash(plain_password)} hashed={hashed_password}")
-        return self.PWD_CONTEXT.verify(plain_password, hashed_password)
+        return await self._run_in_pool(self.PWD_CONTEXT.verify, plain_password, hashed_password)
 
     async def _get_user(self, login: str) -> UserCredentialsFromDB | None:
         from src.modules.user.repository import user_repository
@@ -39,3 +94,4 @@ class CredentialsRepository:
 
 
 credentials_repository: CredentialsRepository = CredentialsRepository()
+metrics_repository.register("password_hashing", credentials_repository.pool_stats)
@@ -1,6 +1,6 @@
 __all__ = ["router"]
 
-from src.exceptions import UnauthorizedException
+from src.exceptions import UnauthorizedException, ServiceUnavailable
 from src.modules.providers.credentials.schemas import AuthCredentials
 
 from fastapi import APIRouter, Request
@@ -11,7 +11,11 @@ router = APIRouter(prefix="/credentials")
 # by-tag
 @router.post(
     "/credentials",
-    responses={200: {"description": "Авторизация пользователя"}, **UnauthorizedException.responses},
+    responses={
+        200: {"description": "Авторизация пользователя"},
+        **UnauthorizedException.responses,
+        **ServiceUnavailable.responses,
+    },
 )
 async def by_credentials(credentials: AuthCredentials, request: Request) -> None:
     """
@@ -2,6 +2,7 @@ __all__ = ["ReviewRepository", "review_repository"]
 
 from beanie import PydanticObjectId, SortDirection
 
+from src.modules.organization.repository import organization_repository
 from src.modules.review.schemas import CreateReview, ReviewWithOrganizationInfo
 from src.storages.mongo import Organization
 from src.storages.mongo.models.review import Review
@@ -11,13 +12,15 @@ from src.utils import aware_utcnow
 # noinspection PyMethodMayBeStatic
 class ReviewRepository:
     async def create(self, data: CreateReview) -> Review:
-        return await Review(
+        review = await Review(
             organization_id=data.organization_id,
             user_id=data.user_id,
             text=data.text,
             rate=data.rate,
             at=aware_utcnow(),
         ).insert()
+        await organization_repository.add_review_rate(review.organization_id, review.rate, 1)
+        return review
 
     async def read(self, id: PydanticObjectId) -> Review | None:
         return await Review.get(id)
@@ -30,14 +33,16 @@ class ReviewRepository:
     async def read_for_me(self, user_id: PydanticObjectId) -> list[ReviewWithOrganizationInfo]:
         reviews = await Review.find({"user_id": user_id}, sort=[("at", SortDirection.DESCENDING)]).to_list()
         ids = set(review.organization_id for review in reviews)
-        organizations = await Organization.find_many({"_id": {"$in": list(ids)}}).to_list()
-        org_dict = {org.id: org for org in organizations}
+        organizations = Organization.get_motor_collection().find(
+            {"_id": {"$in": list(ids)}}, projection={"name": 1, "username": 1}
+        )
+        org_dict = {org["_id"]: org async for org in organizations}
 
         return [
             ReviewWithOrganizationInfo(
                 **review.model_dump(),
-                organization_name=org_dict[review.organization_id].name,
-                organization_username=org_dict[review.organization_id].username,
+                organization_name=org_dict[review.organization_id]["name"],
+                organization_username=org_dict[review.organization_id]["username"],
             )
             for review in reviews
         ]
@@ -45,8 +50,15 @@ class ReviewRepository:
     # async def update(self, id: PydanticObjectId, data: UpdateReview) -> Review | None:
     #     return await crud.update(id, data)
 
-    # async def delete(self, id: PydanticObjectId) -> bool:
-    #     return await crud.delete(id)
+    async def delete(self, id: PydanticObjectId) -> bool:
+        # rating is updated only by the request which has actually deleted the review
+        raw = await Review.get_motor_collection().find_one_and_delete(
+            {"_id": id}, projection={"organization_id": 1, "rate": 1}
+        )
+        if raw is None:
+            return False
+        await organization_repository.add_review_rate(raw["organization_id"], raw["rate"], -1)
+        return True
 
     async def like_review(self, review_id: PydanticObjectId, user_id: PydanticObjectId, like: bool) -> None | bool:
         review = await Review.get(review_id)
@@ -1,8 +1,8 @@
 from beanie import PydanticObjectId
 from fastapi import APIRouter
 
-from src.api.dependencies import UserIdDep
-from src.exceptions import UnauthorizedException, ObjectNotFound
+from src.api.dependencies import UserIdDep, UserDep
+from src.exceptions import UnauthorizedException, ObjectNotFound, NotEnoughPermissionsException
 from src.modules.review.repository import review_repository
 
 router = APIRouter(prefix="/reviews", tags=["Reviews"])
@@ -29,3 +29,28 @@ async def like_review(review_id: PydanticObjectId, user_id: UserIdDep) -> bool:
     else:
         await review_repository.like_review(review_id, user_id, True)
         return True
+
+
+@router.delete(
+    "/{review_id}",
+    responses={
+        200: {"description": "Отзыв удалён"},
+        **ObjectNotFound.responses,
+        **NotEnoughPermissionsException.responses,
+        **UnauthorizedException.responses,
+    },
+)
+async def delete_review(review_id: PydanticObjectId, user: UserDep) -> None:
+    """
+    Удалить отзыв (автор отзыва или модератор), рейтинг организации пересчитывается
+    """
+    review = await review_repository.read(review_id)
+
+    if review is None:
+        raise ObjectNotFound("Отзыв не найден")
+
+    if review.user_id != user.id and not user.is_moderator_plus:
+        raise NotEnoughPermissionsException("Удалить отзыв может только его автор или модератор")
+
+    if not await review_repository.delete(review_id):
+        raise ObjectNotFound("Отзыв не найден")
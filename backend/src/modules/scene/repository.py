@@ -1,12 +1,16 @@
 __all__ = ["SceneRepository", "scene_repository"]
 
+from typing import cast, Any
+
 from beanie import PydanticObjectId
+from pydantic import BaseModel
 
 from src.config import settings
 from src.logging_ import logger
 from src.modules.scene.schemas import CreateScene, UpdateScene
 from src.storages.mongo.models.scene import Scene
-from src.storages.mongo.crud import crud_factory, CRUD
+from src.storages.mongo.crud import crud_factory, CRUD, Page, BatchItemResult, BatchUpdateItem
+from src.storages.mongo.raw import find_raw
 
 crud: CRUD[Scene, CreateScene, UpdateScene] = crud_factory(Scene)
 
@@ -16,11 +20,22 @@ class SceneRepository:
     async def create(self, data: CreateScene) -> Scene:
         return await crud.create(data)
 
-    async def read(self, id: PydanticObjectId) -> Scene | None:
-        return await crud.read(id)
+    async def read(self, id: PydanticObjectId, *, projection_model: type[BaseModel] | None = None) -> Scene | None:
+        return cast(Scene | None, await crud.read(id, projection_model=projection_model))
+
+    async def read_all(self, *, projection_model: type[BaseModel] | None = None) -> list[Scene]:
+        return cast(list[Scene], await crud.read_all(projection_model=projection_model))
+
+    async def read_all_raw(self, *, projection_model: type[BaseModel] | None = None) -> list[dict[str, Any]]:
+        return await crud.read_all_raw(projection_model=projection_model)
+
+    async def read_page(
+        self, limit: int, after: str | None = None, *, projection_model: type[BaseModel] | None = None
+    ) -> Page[Scene]:
+        return cast(Page[Scene], await crud.read_page(limit, after, projection_model=projection_model))
 
-    async def read_all(self) -> list[Scene]:
-        return await crud.read_all()
+    async def read_version(self, id: PydanticObjectId) -> int | None:
+        return await crud.read_version(id)
 
     async def update(self, id: PydanticObjectId, data: UpdateScene) -> Scene | None:
         return await crud.update(id, data)
@@ -28,13 +43,54 @@ class SceneRepository:
     async def delete(self, id: PydanticObjectId) -> bool:
         return await crud.delete(id)
 
+    async def read_many(self, ids: list[PydanticObjectId]) -> list[Scene | None]:
+        mapping = await crud.read_many(ids)
+        return [mapping[id] for id in ids]
+
+    async def bulk_create(self, data: list[CreateScene]) -> list[BatchItemResult]:
+        return await crud.bulk_create(data)
+
+    async def bulk_update(self, items: list[BatchUpdateItem[UpdateScene]]) -> list[BatchItemResult]:
+        return await crud.bulk_update(items)
+
+    async def bulk_delete(self, ids: list[PydanticObjectId]) -> list[BatchItemResult]:
+        return await crud.bulk_delete(ids)
+
     async def read_for_organization(self, organization_id: PydanticObjectId) -> list[Scene]:
         return await Scene.find({"organization": organization_id}).to_list()
 
+    async def read_for_organization_raw(self, organization_id: PydanticObjectId) -> list[dict[str, Any]]:
+        return await find_raw(Scene, {"organization": organization_id})
+
+    async def read_versions_for_organization(
+        self, organization_id: PydanticObjectId
+    ) -> list[tuple[PydanticObjectId, int]]:
+        cursor = Scene.get_motor_collection().find({"organization": organization_id}, projection={"version": 1})
+        return [(raw["_id"], raw.get("version", 0)) async for raw in cursor]
+
     async def exists(self, scene_id: PydanticObjectId) -> bool:
         scene = await Scene.find({"_id": scene_id}).count()
         return scene > 0
 
+    async def predefined_scenes_exist(self) -> bool:
+        """
+        Whether all predefined scenes are in the database (they may have been deleted since the last seeding). Scenes
+        of missing organizations are not created anyway, so they are not required.
+        """
+        from src.modules.organization.repository import organization_repository
+
+        ids = [scene.id for scene in settings.predefined.scenes]
+        existing = {
+            raw["_id"]
+            for raw in await Scene.get_motor_collection().find({"_id": {"$in": ids}}, {"_id": 1}).to_list(None)
+        }
+        for scene in settings.predefined.scenes:
+            if scene.id not in existing and await organization_repository.read_id_by_username(
+                scene.organization_username
+            ):
+                return False
+        return True
+
     async def create_predefined_scenes(self):
         from src.modules.organization.repository import organization_repository
 
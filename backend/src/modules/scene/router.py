@@ -1,12 +1,14 @@
 __all__ = ["router"]
 
 from beanie import PydanticObjectId
-from fastapi import Depends, APIRouter
+from fastapi import Depends, APIRouter, Request
 
 from src.api.crud_routes_factory import setup_based_on_methods
+from src.api.etag import make_list_etag, is_not_modified, not_modified_response, set_etag
 
 from src.api.dependencies import get_moderator
 from src.modules.scene.repository import scene_repository
+from src.storages.mongo.raw import RawORJSONResponse
 from src.storages.mongo.models.scene import Scene
 
 router = APIRouter(prefix="/scenes", tags=["Scenes"])
@@ -26,10 +28,21 @@ setup_based_on_methods(
 
 @router.get(
     "/for-organization/{id}",
-    responses={200: {"description": "Сцены организации"}},
+    responses={
+        200: {"description": "Сцены организации"},
+        304: {"description": "Сцены не изменились (If-None-Match)"},
+    },
 )
-async def get_scenes_for_organization(id: PydanticObjectId) -> list[Scene]:
+async def get_scenes_for_organization(id: PydanticObjectId, request: Request) -> list[Scene]:
     """
     Получить сцены организации
     """
-    return await scene_repository.read_for_organization(id)
+    if request.headers.get("if-none-match"):
+        etag = make_list_etag(await scene_repository.read_versions_for_organization(id))
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)  # type: ignore[return-value]
+
+    scenes = await scene_repository.read_for_organization_raw(id)
+    response = RawORJSONResponse(scenes)
+    set_etag(response, make_list_etag([(scene["id"], scene["version"]) for scene in scenes]))
+    return response  # type: ignore[return-value]
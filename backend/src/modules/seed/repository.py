@@ -0,0 +1,178 @@
+__all__ = [
+    "SeedRepository",
+    "seed_repository",
+    "fingerprint_data",
+    "fingerprint_file",
+    "fingerprint_directory",
+]
+
+import asyncio
+import datetime
+import hashlib
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+import anyio
+import orjson
+from pymongo.errors import DuplicateKeyError
+
+from src.logging_ import logger
+from src.storages.mongo.models.seed_manifest import SeedManifest
+from src.utils import aware_utcnow
+
+LEASE_DURATION = 60  # seconds, the lease is renewed every third of it while the phase is seeded
+LEASE_POLL_INTERVAL = 1  # seconds, how often a worker waiting for the lease checks the phase
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def fingerprint_data(*values: Any) -> str:
+    """
+    Hash of JSON-serializable values (e.g. predefined settings and fingerprints of phases they depend on).
+    """
+    return _digest(orjson.dumps(values, option=orjson.OPT_SORT_KEYS, default=str))
+
+
+async def fingerprint_file(path: Path | None) -> str:
+    """
+    Hash of the file content, computed in a thread.
+    """
+    if path is None:
+        return fingerprint_data(None)
+
+    def digest() -> str:
+        with open(path, "rb") as f:
+            return hashlib.file_digest(f, lambda: hashlib.blake2b(digest_size=16)).hexdigest()
+
+    return await anyio.to_thread.run_sync(digest)
+
+
+async def fingerprint_directory(path: Path) -> str:
+    """
+    Hash of the directory listing (relative paths, sizes and modification times), files are not read.
+    """
+
+    def listing() -> list[tuple[str, int, int]]:
+        entries = []
+        for root, _, files in os.walk(path):
+            for name in files:
+                stat = os.stat(os.path.join(root, name))
+                entries.append((os.path.relpath(os.path.join(root, name), path), stat.st_size, stat.st_mtime_ns))
+        return sorted(entries)
+
+    return fingerprint_data(await anyio.to_thread.run_sync(listing))
+
+
+# noinspection PyMethodMayBeStatic
+class SeedRepository:
+    """
+    Seed manifest: fingerprint of the source data of each seeding phase (predefined files, users, scenes,
+    organizations), so phases with unchanged data that is still in the database are skipped on restarts.
+
+    Workers start concurrently, so a phase is run under a lease (`lease_owner`, `lease_until` of the manifest
+    document): one worker claims it, renews it while seeding and writes the fingerprint, others wait for the lease to
+    be released and then find the phase up to date. The lease of a crashed worker expires and is claimed again.
+    """
+
+    async def read_fingerprint(self, phase: str) -> str | None:
+        manifest = await SeedManifest.get(phase)
+        return manifest.fingerprint if manifest is not None else None
+
+    async def claim(self, phase: str, owner: str) -> bool:
+        """
+        Take the lease of the phase unless another worker holds it.
+        """
+        now = aware_utcnow()
+        try:
+            await SeedManifest.get_motor_collection().update_one(
+                {"_id": phase, "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]},
+                {"$set": {"lease_owner": owner, "lease_until": now + datetime.timedelta(seconds=LEASE_DURATION)}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # the document exists and the lease is held (not expired)
+            return False
+        return True
+
+    async def renew(self, phase: str, owner: str) -> bool:
+        result = await SeedManifest.get_motor_collection().update_one(
+            {"_id": phase, "lease_owner": owner},
+            {"$set": {"lease_until": aware_utcnow() + datetime.timedelta(seconds=LEASE_DURATION)}},
+        )
+        return result.matched_count > 0
+
+    async def release(self, phase: str, owner: str, fingerprint: str | None = None, duration: float = 0.0) -> bool:
+        """
+        Release the lease, saving the fingerprint if given. Returns False if the lease has been lost (it has expired
+        and was claimed by another worker), then nothing is written.
+        """
+        update: dict[str, Any] = {"lease_owner": None, "lease_until": None}
+        if fingerprint is not None:
+            update |= {"fingerprint": fingerprint, "seeded_at": aware_utcnow(), "duration": duration}
+        result = await SeedManifest.get_motor_collection().update_one(
+            {"_id": phase, "lease_owner": owner}, {"$set": update}
+        )
+        return result.matched_count > 0
+
+    async def _keep_lease(self, phase: str, owner: str) -> None:
+        while True:
+            await asyncio.sleep(LEASE_DURATION / 3)
+            if not await self.renew(phase, owner):
+                logger.warning(f"Seeding {phase}: lease lost")
+                return
+
+    async def run_phase(
+        self,
+        phase: str,
+        fingerprint: Callable[[], Awaitable[str]],
+        seed: Callable[[], Awaitable[Any]],
+        present: Callable[[], Awaitable[bool]] | None = None,
+    ) -> str:
+        """
+        Run `seed` unless the fingerprint of the phase is the same as in the manifest and `present` (cheap check of
+        the database state, e.g. predefined documents still exist) is true; returns the fingerprint. The phase is run
+        by one worker at a time; the fingerprint is saved only after `seed` succeeds, so a failed phase is retried.
+        """
+        start = time.perf_counter()
+        current = await fingerprint()
+        owner = uuid.uuid4().hex
+
+        async def up_to_date() -> bool:
+            return await self.read_fingerprint(phase) == current and (present is None or await present())
+
+        while True:
+            if await up_to_date():
+                logger.info(f"Seeding {phase}: unchanged, skipped in {time.perf_counter() - start:.2f}s")
+                return current
+            if await self.claim(phase, owner):
+                break
+            # another worker is seeding the phase, it is probably up to date when the lease is released
+            await asyncio.sleep(LEASE_POLL_INTERVAL)
+
+        keeping = asyncio.create_task(self._keep_lease(phase, owner))
+        try:
+            # the previous holder may have finished the phase between the check and the claim
+            if await up_to_date():
+                logger.info(f"Seeding {phase}: seeded by another worker, skipped")
+                await self.release(phase, owner)
+                return current
+            await seed()
+        except BaseException:
+            await asyncio.shield(self.release(phase, owner))
+            raise
+        finally:
+            keeping.cancel()
+        duration = time.perf_counter() - start
+        if await self.release(phase, owner, current, duration):
+            logger.info(f"Seeding {phase}: done in {duration:.2f}s")
+        else:
+            logger.warning(f"Seeding {phase}: done in {duration:.2f}s, but the lease was lost, fingerprint not saved")
+        return current
+
+
+seed_repository: SeedRepository = SeedRepository()
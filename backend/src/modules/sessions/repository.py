@@ -0,0 +1,192 @@
+__all__ = [
+    "SessionBackend",
+    "MemorySessionBackend",
+    "MongoSessionBackend",
+    "session_backend",
+    "SESSION_MAX_AGE",
+]
+
+import asyncio
+import datetime
+from abc import ABC, abstractmethod
+from typing import Any
+
+from beanie import PydanticObjectId
+
+from src.cache import TTLCache, MISSING
+from src.config import settings
+from src.config_schema import SessionStorage
+from src.logging_ import logger
+from src.modules.metrics.repository import metrics_repository
+from src.storages.mongo.models.collection_version import CollectionVersion
+from src.storages.mongo.models.session import Session, generate_session_id
+from src.utils import aware_utcnow
+
+SESSION_MAX_AGE = 14 * 24 * 60 * 60  # 14 days, in seconds
+MEMORY_MAXSIZE = 100_000
+MONGO_CACHE_TTL = 60  # seconds
+MONGO_CACHE_MAXSIZE = 10_000
+REVOCATIONS_VERSION_ID = "sessions"
+REVOCATIONS_POLL_INTERVAL = 2  # seconds, bounds how long a revoked session is still accepted by other workers
+REVOCATIONS_KEPT = 1000  # recent revocations kept for polling workers, a worker lagging behind clears its cache
+
+
+class SessionBackend(ABC):
+    """
+    Server-side session storage. Cookie contains only opaque session id.
+    """
+
+    def generate_id(self) -> str:
+        return generate_session_id()
+
+    @abstractmethod
+    async def load(self, session_id: str) -> dict[str, Any] | None:
+        pass
+
+    @abstractmethod
+    async def save(self, session_id: str, data: dict[str, Any]) -> None:
+        pass
+
+    @abstractmethod
+    async def delete(self, session_id: str) -> None:
+        pass
+
+    @abstractmethod
+    async def revoke_user(self, user_id: PydanticObjectId) -> None:
+        """
+        Delete all sessions of the user (e.g. when user is deleted).
+        """
+
+    async def poll_forever(self) -> None:
+        """
+        Apply revocations made by other workers, runs until cancelled (nothing to do for single-worker backends).
+        """
+
+    def stats(self) -> dict[str, Any]:
+        return {}
+
+
+class MemorySessionBackend(SessionBackend):
+    _sessions: TTLCache[str, dict[str, Any]]
+
+    def __init__(self, maxsize: int = MEMORY_MAXSIZE, max_age: int = SESSION_MAX_AGE):
+        self._sessions = TTLCache(maxsize=maxsize, ttl=max_age)
+
+    async def load(self, session_id: str) -> dict[str, Any] | None:
+        data = self._sessions.get(session_id)
+        return dict(data) if data is not None else None
+
+    async def save(self, session_id: str, data: dict[str, Any]) -> None:
+        self._sessions.set(session_id, dict(data))
+
+    async def delete(self, session_id: str) -> None:
+        self._sessions.pop(session_id)
+
+    async def revoke_user(self, user_id: PydanticObjectId) -> None:
+        for session_id, data in self._sessions.items():
+            if data.get("uid") == str(user_id):
+                self._sessions.pop(session_id)
+
+    def stats(self) -> dict[str, Any]:
+        return self._sessions.stats()
+
+
+class MongoSessionBackend(SessionBackend):
+    """
+    Sessions in MongoDB TTL-collection with in-process cache in front of it.
+
+    Revocations (logout, deleted user) are published in the `CollectionVersion` document "sessions": `version` is
+    incremented and the revocation is appended to `revoked` (last `REVOCATIONS_KEPT` entries) in one update. Every
+    worker polls the document and evicts revoked sessions from its cache.
+    """
+
+    _cache: TTLCache[str, dict[str, Any] | None]
+    max_age: int
+    revocations_version: int | None
+
+    def __init__(self, max_age: int = SESSION_MAX_AGE):
+        self._cache = TTLCache(maxsize=MONGO_CACHE_MAXSIZE, ttl=MONGO_CACHE_TTL)
+        self.max_age = max_age
+        self.revocations_version = None
+
+    async def load(self, session_id: str) -> dict[str, Any] | None:
+        data = self._cache.get(session_id, MISSING)
+        if data is MISSING:
+            session = await Session.find_one({"_id": session_id, "expires_at": {"$gt": aware_utcnow()}})
+            data = session.data if session is not None else None
+            self._cache.set(session_id, data)
+        return dict(data) if data is not None else None
+
+    async def save(self, session_id: str, data: dict[str, Any]) -> None:
+        uid = data.get("uid")
+        await Session(
+            id=session_id,
+            data=data,
+            user_id=PydanticObjectId(uid) if uid is not None else None,
+            expires_at=aware_utcnow() + datetime.timedelta(seconds=self.max_age),
+        ).insert()
+        self._cache.set(session_id, dict(data))
+
+    async def delete(self, session_id: str) -> None:
+        await Session.find({"_id": session_id}).delete()
+        await self._publish({"session_id": session_id})
+
+    async def revoke_user(self, user_id: PydanticObjectId) -> None:
+        await Session.find({"user_id": user_id}).delete()
+        await self._publish({"uid": str(user_id)})
+
+    async def _publish(self, revocation: dict[str, str]) -> None:
+        self._apply(revocation)
+        await CollectionVersion.get_motor_collection().update_one(
+            {"_id": REVOCATIONS_VERSION_ID},
+            {"$inc": {"version": 1}, "$push": {"revoked": {"$each": [revocation], "$slice": -REVOCATIONS_KEPT}}},
+            upsert=True,
+        )
+
+    def _apply(self, revocation: dict[str, str]) -> None:
+        if (session_id := revocation.get("session_id")) is not None:
+            self._cache.pop(session_id)
+        if (uid := revocation.get("uid")) is not None:
+            for session_id, data in self._cache.items():
+                if data is not None and data.get("uid") == uid:
+                    self._cache.pop(session_id)
+
+    async def sync_revocations(self) -> None:
+        raw = await CollectionVersion.get_motor_collection().find_one({"_id": REVOCATIONS_VERSION_ID})
+        version = raw["version"] if raw is not None else 0
+        revoked = raw.get("revoked", []) if raw is not None else []
+        if self.revocations_version is None or version - self.revocations_version > len(revoked):
+            # unknown revocations (first sync or too far behind)
+            self._cache.clear()
+        elif version > self.revocations_version:
+            for revocation in revoked[len(revoked) - (version - self.revocations_version) :]:
+                self._apply(revocation)
+        self.revocations_version = version
+
+    async def poll_forever(self) -> None:
+        while True:
+            try:
+                await self.sync_revocations()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Failed to sync session revocations: {e}")
+            await asyncio.sleep(REVOCATIONS_POLL_INTERVAL)
+
+    def stats(self) -> dict[str, Any]:
+        return {**self._cache.stats(), "revocations_version": self.revocations_version}
+
+
+session_backend: SessionBackend | None
+"None if sessions are stored in signed cookies"
+
+match settings.auth.session_storage:
+    case SessionStorage.MEMORY:
+        session_backend = MemorySessionBackend()
+    case SessionStorage.MONGO:
+        session_backend = MongoSessionBackend()
+    case _:
+        session_backend = None
+
+if session_backend is not None:
+    metrics_repository.register("sessions", session_backend.stats)
@@ -1,31 +1,52 @@
 __all__ = ["UserRepository", "user_repository"]
 
+import asyncio
+
 from beanie import PydanticObjectId
 
+from src.cache import TTLCache
 from src.config import settings
 from src.exceptions import AlreadyExists, ObjectNotFound
 from src.logging_ import logger
+from src.modules.metrics.repository import metrics_repository
 from src.modules.organization.repository import organization_repository
 from src.modules.providers.telegram.schemas import TelegramWidgetData
 from src.storages.mongo import User
 from src.storages.mongo.models.user import PendingApprovement, ApprovedApprovement, RejectedApprovement
 from src.utils import aware_utcnow
 
+CACHE_TTL = 30  # seconds, also bounds staleness between workers
+CACHE_MAXSIZE = 10_000
+
 
 # noinspection PyMethodMayBeStatic
 class UserRepository:
+    _cache: TTLCache[PydanticObjectId, User]
+
+    def __init__(self):
+        self._cache = TTLCache(maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL)
+
     async def create_predefined_users(self):
         from src.modules.providers.credentials.repository import credentials_repository
 
+        to_create = []
         for user in settings.predefined.users:
             # check by login
             _user_by_login = await self.read_by_login(user.login)
             if _user_by_login is not None:
                 continue
+            to_create.append(user)
+
+        # hash in parallel through the hashing pool
+        password_hashes = await asyncio.gather(
+            *(credentials_repository.get_password_hash(user.password, fail_fast=False) for user in to_create)
+        )
+
+        for user, password_hash in zip(to_create, password_hashes):
             user_dict = {
                 "login": user.login,
                 "name": user.name,
-                "password_hash": credentials_repository.get_password_hash(user.password),
+                "password_hash": password_hash,
                 "role": user.role,
             }
             if user.student_at_organization_username:
@@ -39,13 +60,20 @@ class UserRepository:
 
             await User.model_validate(user_dict).insert()
 
+    async def predefined_users_exist(self) -> bool:
+        """
+        Whether all predefined users are in the database (they may have been deleted since the last seeding).
+        """
+        logins = {user.login for user in settings.predefined.users}
+        return await User.find({"login": {"$in": list(logins)}}).count() == len(logins)
+
     async def create_superuser(self, login: str, password: str) -> User:
         from src.modules.providers.credentials.repository import credentials_repository
 
         user_dict = {
             "login": login,
             "name": "Superuser",
-            "password_hash": credentials_repository.get_password_hash(password),
+            "password_hash": await credentials_repository.get_password_hash(password, fail_fast=False),
             "role": "admin",
         }
 
@@ -60,6 +88,34 @@ class UserRepository:
         user = await User.find_one({"_id": user_id})
         return user
 
+    async def delete(self, user_id: PydanticObjectId) -> bool:
+        from src.modules.sessions.repository import session_backend
+
+        result = await User.find({"_id": user_id}).delete()
+        self.invalidate(user_id)
+        if session_backend is not None:
+            await session_backend.revoke_user(user_id)
+        return result is not None and result.deleted_count > 0
+
+    async def read_cached(self, user_id: PydanticObjectId) -> User | None:
+        """
+        Read user with cross-request cache, used for session resolution. Returns a copy, so callers may modify it
+        without affecting other requests.
+        """
+        user = self._cache.get(user_id)
+        if user is None:
+            user = await self.read(user_id)
+            if user is None:
+                return None
+            self._cache.set(user_id, user)
+        return user.model_copy(deep=True)
+
+    def invalidate(self, user_id: PydanticObjectId) -> None:
+        self._cache.pop(user_id)
+
+    def cache_stats(self) -> dict[str, int | float]:
+        return self._cache.stats()
+
     async def read_by_login(self, login: str) -> User | None:
         user = await User.find_one({"login": login})
         return user
@@ -76,7 +132,9 @@ class UserRepository:
         user = await self.read(user_id)
         if user is None:
             return None
-        return await user.update({"$set": {"telegram": telegram_data.model_dump()}})
+        updated = await user.update({"$set": {"telegram": telegram_data.model_dump()}})
+        self.invalidate(user_id)
+        return updated
 
     async def read_by_telegram_id(self, telegram_id: int) -> User | None:
         user = await User.find_one({"telegram.id": telegram_id})
@@ -100,7 +158,9 @@ class UserRepository:
         user = await self.read(user_id)
         if user is None:
             return None
-        return await user.update({"$set": {"documents": document_ids}})
+        updated = await user.update({"$set": {"documents": document_ids}})
+        self.invalidate(user_id)
+        return updated
 
     async def request_approvement(
         self, user_id: PydanticObjectId, organization_id: PydanticObjectId, file_obj_id: PydanticObjectId | None = None
@@ -110,7 +170,9 @@ class UserRepository:
             return None
 
         _approvement = PendingApprovement(organization_id=organization_id, attachment=file_obj_id)
-        return await user.update({"$set": {"student_approvement": _approvement}})
+        updated = await user.update({"$set": {"student_approvement": _approvement}})
+        self.invalidate(user_id)
+        return updated
 
     async def approve_user(
         self, user_id: PydanticObjectId, source_user_id: PydanticObjectId, is_approve: bool, comment: str = ""
@@ -143,7 +205,9 @@ class UserRepository:
 
         user.student_approvement = _approvement
         await user.save()
+        self.invalidate(user_id)
         return user
 
 
 user_repository: UserRepository = UserRepository()
+metrics_repository.register("user_cache", user_repository.cache_stats)
@@ -15,6 +15,7 @@ from src.modules.review.repository import review_repository
 from src.modules.review.schemas import ReviewWithOrganizationInfo
 from src.modules.user.repository import user_repository
 from src.modules.user.schemas import ViewUser
+from src.storages.mongo.schemas import UserRole
 from fastapi import Request, UploadFile
 
 router = EnsureAuthenticatedAPIRouter(prefix="/users", tags=["Users"])
@@ -75,7 +76,7 @@ async def request_approvement(
 )
 async def logout(request: Request) -> None:
     """
-    Выход из аккаунта
+    Выход из аккаунта (сессия отзывается на сервере)
     """
     request.session.clear()
 
@@ -129,3 +130,23 @@ async def approve_user(
         is_approve=is_approve, user_id=user_id, source_user_id=moder.id, comment=comment or ""
     )
     return ViewUser.model_validate(target_user.model_dump())
+
+
+@router.delete(
+    "/by-id/{user_id}",
+    responses={
+        200: {"description": "Пользователь удалён, его сессии отозваны"},
+        **NotEnoughPermissionsException.responses,
+        **ObjectNotFound.responses,
+    },
+)
+async def delete_user(user: UserDep, user_id: PydanticObjectId) -> None:
+    """
+    Удалить пользователя и отозвать все его сессии
+    """
+    if user.role != UserRole.ADMIN:
+        raise NotEnoughPermissionsException("У вас недостаточно прав для удаления пользователей")
+
+    deleted = await user_repository.delete(user_id)
+    if not deleted:
+        raise ObjectNotFound(f"Пользователь с ID `{user_id}` не найден")
@@ -8,5 +8,25 @@ from src.storages.mongo.models.user import User
 from src.storages.mongo.models.file import File
 from src.storages.mongo.models.organization import Organization
 from src.storages.mongo.models.scene import Scene
+from src.storages.mongo.models.session import Session
+from src.storages.mongo.models.collection_version import CollectionVersion
+from src.storages.mongo.models.educational_program import EducationalProgram
+from src.storages.mongo.models.job import Job
+from src.storages.mongo.models.seed_manifest import SeedManifest
 
-document_models = cast(list[type[Document] | type[View] | str], [User, File, Organization, Scene, Dialog, Review])
+document_models = cast(
+    list[type[Document] | type[View] | str],
+    [
+        User,
+        File,
+        Organization,
+        Scene,
+        Dialog,
+        Review,
+        Session,
+        CollectionVersion,
+        EducationalProgram,
+        Job,
+        SeedManifest,
+    ],
+)
@@ -1,13 +1,23 @@
+import base64
+from functools import lru_cache
 from typing import TypeVar, Type, Any, Mapping, Union, Generic, cast
+from uuid import uuid4
 
-from beanie import Document, PydanticObjectId
-from beanie.exceptions import RevisionIdWasChanged
+from beanie import Document, PydanticObjectId, SortDirection
 from beanie.odm.operators.find.comparison import In
-from beanie.odm.operators.update.general import Set
-from pydantic import BaseModel
-from pymongo.errors import DuplicateKeyError
+from beanie.odm.utils.dump import get_dict
+from beanie.odm.utils.encoder import Encoder
+from beanie.odm.utils.parsing import parse_obj
+from beanie.odm.utils.projection import get_projection
+from bson import json_util
+from pydantic import BaseModel, create_model
+from pymongo import ReturnDocument, InsertOne, UpdateOne, DeleteOne
+from pymongo.errors import DuplicateKeyError, BulkWriteError
 
 from src.exceptions import unwrap_duplicate_error
+from src.storages.mongo.models.__base__ import VersionedDocument
+from src.storages.mongo.raw import find_raw
+from src.storages.mongo.versions import VersionCache
 
 D = TypeVar("D", bound=Document)
 Projection = TypeVar("Projection", bound=BaseModel)
@@ -15,17 +25,78 @@ Create = TypeVar("Create", bound=BaseModel, contravariant=True)
 Update = TypeVar("Update", bound=BaseModel)
 
 
+T = TypeVar("T")
+
+
 class IdOnlyProjection(BaseModel):
     id: PydanticObjectId
 
 
+class Page(BaseModel, Generic[T]):
+    items: list[T]
+    "Объекты страницы"
+    next_cursor: str | None = None
+    "Курсор для следующей страницы (параметр `after`), null если это последняя страница"
+
+
+class BatchUpdateItem(BaseModel, Generic[Update]):
+    id: PydanticObjectId
+    "ID объекта"
+    data: Update
+    "Изменения объекта"
+
+
+class BatchItemResult(BaseModel):
+    id: PydanticObjectId | None = None
+    "ID объекта"
+    ok: bool
+    "Успешно ли выполнена операция над объектом"
+    error: str | None = None
+    "Описание ошибки, если операция не выполнена"
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(sort_value: Any, id: PydanticObjectId) -> str:
+    raw = json_util.dumps([sort_value, id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[Any, PydanticObjectId]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, id = json_util.loads(raw)
+        return sort_value, PydanticObjectId(id)
+    except Exception as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+
+
 class CRUD(Generic[D, Create, Update]):
     fetch_links: bool
     document_class: Type[D]
+    versions: VersionCache | None
+    "Versions of documents for conditional requests, None if document class is not versioned"
 
     def __init__(self, document_class: Type[D], fetch_links: bool):
         self.document_class = document_class
         self.fetch_links = fetch_links
+        self.versions = VersionCache(document_class) if issubclass(document_class, VersionedDocument) else None
+
+    def _update_operators(self, to_set: dict[str, Any], encoder: Encoder) -> dict[str, Any]:
+        operators: dict[str, Any] = {"$set": encoder.encode(to_set)}
+        if self.versions is not None:
+            operators["$inc"] = {"version": 1}
+        return operators
+
+    async def read_version(self, id: PydanticObjectId) -> int | None:
+        """
+        Version of document (cached or projection-only lookup), None if document does not exist.
+        """
+        if self.versions is None:
+            raise TypeError(f"{self.document_class.__name__} is not versioned")
+        return await self.versions.read(id)
 
     async def create(self, data: Create) -> D:
         _ = self.document_class.model_validate(data, from_attributes=True)
@@ -37,12 +108,109 @@ class CRUD(Generic[D, Create, Update]):
         _ = [self.document_class.model_validate(item, from_attributes=True) for item in data]
         return (await self.document_class.insert_many(_)).inserted_ids
 
+    async def bulk_create(self, data: list[Create]) -> list[BatchItemResult]:
+        """
+        Insert documents with one unordered `bulk_write`, result is reported for each item.
+        """
+        documents = [self.document_class.model_validate(item, from_attributes=True) for item in data]
+        for document in documents:
+            if document.id is None:
+                document.id = PydanticObjectId()
+        keep_nulls = self.document_class.get_settings().keep_nulls
+        operations = [InsertOne(get_dict(document, to_db=True, keep_nulls=keep_nulls)) for document in documents]
+        errors = await self._bulk_write(operations)
+        return [
+            BatchItemResult(id=document.id if i not in errors else None, ok=i not in errors, error=errors.get(i))
+            for i, document in enumerate(documents)
+        ]
+
+    async def bulk_update(self, items: list[BatchUpdateItem[Update]]) -> list[BatchItemResult]:
+        """
+        Update documents with one unordered `bulk_write`, result is reported for each item.
+        """
+        existing = await self._existing_ids([item.id for item in items])
+        encoder = Encoder(custom_encoders=self.document_class.get_settings().bson_encoders)
+        use_revision = self.document_class.get_settings().use_revision
+
+        operations = []
+        operation_item_indexes = []
+        for i, item in enumerate(items):
+            to_set = item.data.model_dump(exclude_unset=True)
+            if item.id not in existing or not to_set:
+                continue
+            if use_revision:
+                to_set["revision_id"] = uuid4()
+            operations.append(UpdateOne({"_id": item.id}, self._update_operators(to_set, encoder)))
+            operation_item_indexes.append(i)
+
+        operation_errors = await self._bulk_write(operations)
+        errors = {operation_item_indexes[i]: error for i, error in operation_errors.items()}
+        if self.versions is not None:
+            for item in items:
+                self.versions.forget(item.id)
+        return [
+            BatchItemResult(
+                id=item.id,
+                ok=item.id in existing and i not in errors,
+                error="Объект не найден" if item.id not in existing else errors.get(i),
+            )
+            for i, item in enumerate(items)
+        ]
+
+    async def bulk_delete(self, ids: list[PydanticObjectId]) -> list[BatchItemResult]:
+        """
+        Delete documents with one unordered `bulk_write`, result is reported for each item.
+        """
+        existing = await self._existing_ids(ids)
+        await self._bulk_write([DeleteOne({"_id": id}) for id in ids if id in existing])
+        if self.versions is not None:
+            for id in ids:
+                self.versions.forget(id)
+        return [
+            BatchItemResult(id=id, ok=id in existing, error=None if id in existing else "Объект не найден")
+            for id in ids
+        ]
+
+    async def _existing_ids(self, ids: list[PydanticObjectId]) -> set[PydanticObjectId]:
+        if not ids:
+            return set()
+        cursor = self.document_class.get_motor_collection().find({"_id": {"$in": ids}}, projection={"_id": 1})
+        return {obj["_id"] async for obj in cursor}
+
+    async def _bulk_write(self, operations: list) -> dict[int, str]:
+        """
+        Run unordered `bulk_write`, return errors by index of operation.
+        """
+        if not operations:
+            return {}
+        try:
+            await self.document_class.get_motor_collection().bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            errors = {}
+            for write_error in e.details.get("writeErrors", []):
+                if write_error.get("code") == 11000:
+                    errors[write_error["index"]] = (
+                        f"Объект с такими свойствами уже существует: {write_error.get('keyValue')}"
+                    )
+                else:
+                    errors[write_error["index"]] = write_error.get("errmsg", "Ошибка записи")
+            return errors
+        return {}
+
     async def read(
         self, id: PydanticObjectId, *, projection_model: type[Projection] | None = None
     ) -> Projection | D | None:
-        return await self.document_class.find_one(
+        obj = await self.document_class.find_one(
             self.document_class.id == id, fetch_links=self.fetch_links, projection_model=projection_model
         )
+        self._remember_version(obj)
+        return obj
+
+    def _remember_version(self, obj: BaseModel | None) -> None:
+        if self.versions is not None and obj is not None:
+            version = getattr(obj, "version", None)
+            if version is not None:
+                self.versions.remember(obj.id, version)  # type: ignore[attr-defined]
 
     async def read_by(
         self, *criterias: Union[Mapping[str, Any], bool], projection_model: type[Projection] | None = None
@@ -68,23 +236,98 @@ class CRUD(Generic[D, Create, Update]):
             return cast(list[D], _res)
         return cast(list[Projection], _res)
 
-    async def update(self, id: PydanticObjectId, data: Update) -> D | None:
-        obj = await self.document_class.find_one({"_id": id})
-        if obj is None:
-            return None
+    async def read_all_raw(self, *, projection_model: type[BaseModel] | None = None) -> list[dict[str, Any]]:
+        """
+        Trusted read mode: response-ready dicts without model validation (see `src.storages.mongo.raw`).
+        """
+        return await find_raw(self.document_class, model=projection_model)
+
+    async def read_page(
+        self,
+        limit: int,
+        after: str | None = None,
+        *,
+        sort_by: str = "_id",
+        projection_model: type[Projection] | None = None,
+        filter_: Mapping[str, Any] | None = None,
+    ) -> Page[D] | Page[Projection]:
+        """
+        Keyset pagination: documents sorted by (`sort_by`, `_id`), `after` is a cursor from the previous page.
+        There should be an index on (`sort_by`, `_id`) for non-id sort keys (prefixed with equality fields of `filter_`).
+        """
+        conditions: list[Mapping[str, Any]] = [filter_] if filter_ else []
+        if after is not None:
+            sort_value, last_id = decode_cursor(after)
+            if sort_by == "_id":
+                conditions.append({"_id": {"$gt": last_id}})
+            else:
+                conditions.append(
+                    {"$or": [{sort_by: {"$gt": sort_value}}, {sort_by: sort_value, "_id": {"$gt": last_id}}]}
+                )
+        query = conditions[0] if len(conditions) == 1 else {"$and": conditions} if conditions else {}
+
+        sort = [("_id", SortDirection.ASCENDING)]
+        if sort_by != "_id":
+            sort.insert(0, (sort_by, SortDirection.ASCENDING))
+            if projection_model is not None and sort_by not in projection_model.model_fields:
+                # sort key is needed for the cursor
+                projection_model = _with_field(projection_model, sort_by, self.document_class)
+
+        items = await self.document_class.find(
+            query, projection_model=projection_model, sort=sort, limit=limit + 1
+        ).to_list()
+
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            last = items[-1]
+            next_cursor = encode_cursor(getattr(last, "id" if sort_by == "_id" else sort_by), last.id)
+        return Page(items=items, next_cursor=next_cursor)
+
+    async def update(
+        self, id: PydanticObjectId, data: Update, *, projection_model: type[Projection] | None = None
+    ) -> Projection | D | None:
+        """
+        Atomically update document with `findOneAndUpdate` and return post-image (or only projected fields).
+        """
+        to_set = data.model_dump(exclude_unset=True)
+        if not to_set:
+            return await self.read(id, projection_model=projection_model)
+        if self.document_class.get_settings().use_revision:
+            to_set["revision_id"] = uuid4()
+        encoder = Encoder(custom_encoders=self.document_class.get_settings().bson_encoders)
         try:
-            updated = await obj.update(Set(data.model_dump(exclude_unset=True)))
-        except (RevisionIdWasChanged, DuplicateKeyError) as e:
+            result = await self.document_class.get_motor_collection().find_one_and_update(
+                {"_id": id},
+                self._update_operators(to_set, encoder),
+                projection=get_projection(projection_model) if projection_model is not None else None,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError as e:
             raise unwrap_duplicate_error(e)
-        return updated
+        if result is None:
+            return None
+        if self.versions is not None:
+            if "version" in result:
+                self.versions.remember(id, result["version"])
+            else:
+                self.versions.forget(id)
+        if projection_model is None:
+            return cast(D, parse_obj(self.document_class, result))
+        return cast(Projection, parse_obj(projection_model, result))
 
     async def delete(self, id: PydanticObjectId) -> bool:
-        obj = await self.document_class.find_one({"_id": id})
-        if obj is None:
-            return False
-        delete_result = await obj.delete()
+        if self.versions is not None:
+            self.versions.forget(id)
+        delete_result = await self.document_class.get_motor_collection().delete_one({"_id": id})
         return delete_result.deleted_count > 0
 
 
+@lru_cache(maxsize=256)
+def _with_field(model: type[Projection], name: str, source: type[BaseModel]) -> type[Projection]:
+    field = source.model_fields[name]
+    return create_model(model.__name__, __base__=model, **{name: (field.annotation, field)})  # type: ignore
+
+
 def crud_factory(document_class: Type[D], fetch_links: bool = False) -> CRUD:
     return CRUD(document_class, fetch_links=fetch_links)
@@ -1,4 +1,4 @@
-__all__ = ["CustomDocument", "CustomLink"]
+__all__ = ["CustomDocument", "VersionedDocument", "CustomLink"]
 
 import datetime
 from typing import Type, Any, TypeVar, Annotated, Union
@@ -62,6 +62,15 @@ class CustomDocument(Document):
         return schema
 
 
+class VersionedDocument(CustomDocument):
+    """
+    Document with version counter, it must be incremented by every write (used for ETag).
+    """
+
+    version: int = 0
+    "Версия документа (увеличивается при каждом изменении)"
+
+
 D = TypeVar("D", bound=Document)
 
 
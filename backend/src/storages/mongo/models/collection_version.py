@@ -0,0 +1,14 @@
+from pydantic import Field
+
+from src.custom_pydantic import CustomModel
+from src.storages.mongo.models.__base__ import CustomDocument
+
+
+class CollectionVersionSchema(CustomModel):
+    version: int = 0
+    "Версия данных (увеличивается при каждом изменении, используется для обновления кэшей во всех воркерах)"
+
+
+class CollectionVersion(CollectionVersionSchema, CustomDocument):
+    id: str = Field(...)  # type: ignore[assignment]
+    "Название набора данных"
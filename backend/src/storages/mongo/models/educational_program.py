@@ -0,0 +1,36 @@
+from beanie import PydanticObjectId
+from pymongo import IndexModel
+
+from src.custom_pydantic import CustomModel
+from src.storages.mongo.models.__base__ import CustomDocument
+
+
+class EducationalProgramSchema(CustomModel):
+    in_registry_id: str
+    "Идентификатор образовательной программы в реестре"
+    edu_level_name: str
+    "Наименование уровня образования"
+    program_name: str
+    "Наименование образовательной программы"
+    program_code: str | None = None
+    "Код образовательной программы"
+    ugs_name: str | None = None
+    "Наименование направления подготовки"
+    ugs_code: str | None = None
+    "Код направления подготовки"
+    edu_normative_period: str | None = None
+    "Нормативный срок обучения"
+    qualification: str | None = None
+    "Квалификация выпускника"
+
+
+class EducationalProgram(EducationalProgramSchema, CustomDocument):
+    organization_id: PydanticObjectId
+    "Идентификатор организации, которой принадлежит программа"
+
+    class Settings:
+        indexes = [
+            IndexModel([("organization_id", 1), ("_id", 1)]),
+            IndexModel([("ugs_code", 1)]),
+            IndexModel([("edu_level_name", 1)]),
+        ]
@@ -1,7 +1,7 @@
 import datetime
 
 from src.custom_pydantic import CustomModel
-from src.storages.mongo.models.__base__ import CustomDocument
+from src.storages.mongo.models.__base__ import VersionedDocument
 
 
 class FileSchema(CustomModel):
@@ -17,5 +17,5 @@ class FileSchema(CustomModel):
     "Дата последнего обновления файла"
 
 
-class File(FileSchema, CustomDocument):
+class File(FileSchema, VersionedDocument):
     pass
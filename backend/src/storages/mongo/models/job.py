@@ -0,0 +1,58 @@
+import datetime
+from enum import StrEnum
+from typing import Any
+
+from beanie import PydanticObjectId
+from pymongo import IndexModel
+
+from src.custom_pydantic import CustomModel
+from src.storages.mongo.models.__base__ import CustomDocument
+
+
+class JobKind(StrEnum):
+    ORGANIZATION_IMPORT = "organization_import"
+    RATING_REPAIR = "rating_repair"
+
+
+class JobStatus(StrEnum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class JobSchema(CustomModel):
+    kind: JobKind
+    "Тип задачи (одновременно выполняется не больше одной задачи каждого типа)"
+    status: JobStatus = JobStatus.QUEUED
+    "Состояние задачи"
+    created_by: PydanticObjectId | None = None
+    "Пользователь, создавший задачу"
+    created_at: datetime.datetime
+    "Время создания"
+    started_at: datetime.datetime | None = None
+    "Время начала выполнения"
+    finished_at: datetime.datetime | None = None
+    "Время завершения"
+    heartbeat_at: datetime.datetime | None = None
+    "Последний признак жизни копии сервера, выполняющей задачу или ожидающей её запуска"
+    progress: dict[str, Any] = {}
+    "Счётчики прогресса (зависят от типа задачи)"
+    result: dict[str, Any] | None = None
+    "Результат выполнения"
+    error: str | None = None
+    "Причина ошибки, если задача не выполнена"
+
+
+class Job(JobSchema, CustomDocument):
+    class Settings:
+        indexes = [
+            # at most one running job of each kind per deployment
+            IndexModel(
+                [("kind", 1)],
+                name="one_running_job_per_kind",
+                unique=True,
+                partialFilterExpression={"status": JobStatus.RUNNING.value},
+            ),
+            IndexModel([("status", 1), ("created_at", 1)]),
+        ]
@@ -1,30 +1,11 @@
 from typing import Any
 
 from beanie import PydanticObjectId
-from pydantic import ConfigDict
+from pydantic import ConfigDict, Field
 from pymongo import IndexModel
 
 from src.custom_pydantic import CustomModel
-from src.storages.mongo.models.__base__ import CustomDocument
-
-
-class EducationalProgramSchema(CustomModel):
-    in_registry_id: str
-    "Идентификатор образовательной программы в реестре"
-    edu_level_name: str
-    "Наименование уровня образования"
-    program_name: str
-    "Наименование образовательной программы"
-    program_code: str | None = None
-    "Код образовательной программы"
-    ugs_name: str | None = None
-    "Наименование направления подготовки"
-    ugs_code: str | None = None
-    "Код направления подготовки"
-    edu_normative_period: str | None = None
-    "Нормативный срок обучения"
-    qualification: str | None = None
-    "Квалификация выпускника"
+from src.storages.mongo.models.__base__ import VersionedDocument
 
 
 class ContactsSchema(CustomModel):
@@ -48,6 +29,21 @@ class ContactsSchema(CustomModel):
     "КПП"
 
 
+USERNAME_ID_INDEX = "username_id"
+"Covers username -> id lookups (the unique `username` index does not contain `_id`)"
+
+
+class RatingSchema(CustomModel):
+    count: int = 0
+    "Количество отзывов"
+    sum: int = 0
+    "Сумма оценок"
+    histogram: dict[str, int] = {}
+    "Количество отзывов по оценкам (ключи от 1 до 5)"
+    average: float | None = None
+    "Средняя оценка (None, если отзывов нет)"
+
+
 class OrganizationSchema(CustomModel):
     username: str
     "Псевдоним организации (уникальный)"
@@ -69,13 +65,18 @@ class OrganizationSchema(CustomModel):
     "Наименование региона"
     federal_district_name: str | None = None
     "Наименование федерального округа"
-    educational_programs: list[EducationalProgramSchema] = []
-    "Образовательные программы организации"
 
 
-class Organization(OrganizationSchema, CustomDocument):
+class Organization(OrganizationSchema, VersionedDocument):
+    registry_hash: str | None = Field(None, exclude=True)
+    "Хэш данных организации из реестра на момент последнего импорта (для пересинхронизации, не отдаётся в ответах)"
+    rating: RatingSchema = RatingSchema()
+    "Агрегаты оценок из отзывов (обновляются вместе с отзывами)"
+
     class Settings:
         indexes = [
             IndexModel([("username", 1)], unique=True),
+            IndexModel([("username", 1), ("_id", 1)], name=USERNAME_ID_INDEX),
             IndexModel([("in_registry_id", 1)]),
+            IndexModel([("name", 1), ("_id", 1)]),
         ]
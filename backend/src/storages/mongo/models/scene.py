@@ -3,7 +3,7 @@ from typing import Any
 from beanie import PydanticObjectId
 
 from src.custom_pydantic import CustomModel
-from src.storages.mongo.models.__base__ import CustomDocument
+from src.storages.mongo.models.__base__ import VersionedDocument
 
 
 class SceneSchema(CustomModel):
@@ -13,5 +13,5 @@ class SceneSchema(CustomModel):
     meta: Any | None = None
 
 
-class Scene(SceneSchema, CustomDocument):
+class Scene(SceneSchema, VersionedDocument):
     pass
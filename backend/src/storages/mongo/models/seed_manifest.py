@@ -0,0 +1,24 @@
+import datetime
+
+from pydantic import Field
+
+from src.custom_pydantic import CustomModel
+from src.storages.mongo.models.__base__ import CustomDocument
+
+
+class SeedManifestSchema(CustomModel):
+    fingerprint: str | None = None
+    "Хэш исходных данных этапа, с которыми он был выполнен последний раз (None, если этап ещё не выполнялся)"
+    seeded_at: datetime.datetime | None = None
+    "Время выполнения"
+    duration: float | None = None
+    "Длительность выполнения, секунд"
+    lease_owner: str | None = None
+    "Идентификатор воркера, выполняющего этап сейчас"
+    lease_until: datetime.datetime | None = None
+    "Срок аренды этапа воркером (продлевается во время выполнения); после него этап может взять другой воркер"
+
+
+class SeedManifest(SeedManifestSchema, CustomDocument):
+    id: str = Field(...)  # type: ignore[assignment]
+    "Название этапа начального заполнения базы"
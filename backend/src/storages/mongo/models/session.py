@@ -0,0 +1,33 @@
+import datetime
+import secrets
+from typing import Any
+
+from beanie import PydanticObjectId
+from pydantic import Field
+from pymongo import IndexModel
+
+from src.custom_pydantic import CustomModel
+from src.storages.mongo.models.__base__ import CustomDocument
+
+
+def generate_session_id() -> str:
+    return secrets.token_urlsafe(16)
+
+
+class SessionSchema(CustomModel):
+    data: dict[str, Any] = {}
+    "Данные сессии"
+    user_id: PydanticObjectId | None = None
+    "ID пользователя сессии (для отзыва всех сессий пользователя)"
+    expires_at: datetime.datetime
+    "Дата истечения сессии"
+
+
+class Session(SessionSchema, CustomDocument):
+    id: str = Field(default_factory=generate_session_id)  # type: ignore[assignment]
+
+    class Settings:
+        indexes = [
+            IndexModel("expires_at", name="expires_at_ttl_index", expireAfterSeconds=0),
+            IndexModel("user_id", name="user_id_index"),
+        ]
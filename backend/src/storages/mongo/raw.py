@@ -0,0 +1,97 @@
+"""
+Trusted read mode: documents are fetched from Motor as raw dicts and serialized straight to JSON, without construction
+and validation of pydantic models. Use it only for read-only endpoints over data written by the application itself.
+"""
+
+__all__ = ["RawORJSONResponse", "find_raw", "find_one_raw", "to_response_dict"]
+
+import datetime
+from functools import lru_cache
+from typing import Any, Mapping
+
+import orjson
+from beanie import Document
+from beanie.odm.utils.projection import get_projection
+from bson import ObjectId, DBRef
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, DBRef):
+        return {"id": str(obj.id), "collection": obj.collection}
+    if isinstance(obj, datetime.time):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class RawORJSONResponse(ORJSONResponse):
+    """
+    ORJSON response for raw Mongo documents (ObjectIds are nested anywhere, so they are serialized by `default`).
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+@lru_cache(maxsize=128)
+def _defaults(model: type[BaseModel]) -> dict[str, Any]:
+    """
+    Defaults of top-level fields (optional ones are missing in the stored document because of `keep_nulls=False`).
+    Output keys follow the order of model fields, `id` goes first.
+    """
+    defaults: dict[str, Any] = {"id": None}
+    for name, field in model.model_fields.items():
+        if name in ("id", "revision_id") or field.exclude:
+            continue
+        default = None if field.is_required() else field.get_default(call_default_factory=True)
+        defaults[field.serialization_alias or name] = default
+    return defaults
+
+
+@lru_cache(maxsize=128)
+def _projection(model: type[BaseModel]) -> Mapping[str, int]:
+    # fields excluded from serialization (internal ones) are not returned as well
+    excluded = {name: 0 for name, field in model.model_fields.items() if field.exclude}
+    if issubclass(model, Document):
+        return {"revision_id": 0, **excluded}
+    return get_projection(model) or {"revision_id": 0, **excluded}
+
+
+def to_response_dict(raw: dict[str, Any], model: type[BaseModel]) -> dict[str, Any]:
+    """
+    Apply transforms of `CustomDocument` serialization: `_id` -> `id`, fill top-level defaults.
+    Nested models are returned as stored (null fields of nested models may be absent).
+    """
+    result = _defaults(model).copy()
+    result["id"] = raw.pop("_id", None)
+    result.update(raw)
+    return result
+
+
+async def find_raw(
+    document_class: type[Document],
+    filter_: Mapping[str, Any] | None = None,
+    *,
+    model: type[BaseModel] | None = None,
+    projection: Mapping[str, Any] | None = None,
+    sort: list[tuple[str, int]] | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Find documents as response-ready dicts, `model` is a projection model (whole document by default).
+    Explicit `projection` may be used to fetch only parts of nested fields.
+    """
+    model = model or document_class
+    projection = projection or _projection(model)
+    cursor = document_class.get_motor_collection().find(filter_ or {}, projection=projection, sort=sort)
+    return [to_response_dict(raw, model) async for raw in cursor]
+
+
+async def find_one_raw(
+    document_class: type[Document], filter_: Mapping[str, Any], *, model: type[BaseModel] | None = None
+) -> dict[str, Any] | None:
+    model = model or document_class
+    raw = await document_class.get_motor_collection().find_one(filter_, projection=_projection(model))
+    return to_response_dict(raw, model) if raw is not None else None
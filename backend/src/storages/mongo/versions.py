@@ -0,0 +1,44 @@
+__all__ = ["VersionCache", "VERSION_CACHE_TTL"]
+
+from beanie import PydanticObjectId
+
+from src.cache import TTLCache
+from src.storages.mongo.models.__base__ import VersionedDocument
+
+VERSION_CACHE_TTL = 10  # seconds, bounds staleness of versions changed by other workers
+VERSION_CACHE_MAXSIZE = 50_000
+
+
+class VersionCache:
+    """
+    Versions of documents by id, to answer conditional requests without reading the whole document.
+    """
+
+    document_class: type[VersionedDocument]
+    _versions: TTLCache[PydanticObjectId, int]
+
+    def __init__(self, document_class: type[VersionedDocument]):
+        self.document_class = document_class
+        self._versions = TTLCache(maxsize=VERSION_CACHE_MAXSIZE, ttl=VERSION_CACHE_TTL)
+
+    def remember(self, id: PydanticObjectId, version: int) -> None:
+        self._versions.set(id, version)
+
+    def forget(self, id: PydanticObjectId) -> None:
+        self._versions.pop(id)
+
+    async def read(self, id: PydanticObjectId) -> int | None:
+        """
+        Version from cache or projection-only lookup, None if document does not exist.
+        """
+        version = self._versions.get(id)
+        if version is None:
+            raw = await self.document_class.get_motor_collection().find_one({"_id": id}, projection={"version": 1})
+            if raw is None:
+                return None
+            version = raw.get("version", 0)
+            self._versions.set(id, version)
+        return version
+
+    def stats(self) -> dict[str, int | float]:
+        return self._versions.stats()